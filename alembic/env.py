@@ -4,6 +4,7 @@ from sqlalchemy import engine_from_config
 from sqlalchemy import pool
 
 from alembic import context
+from alembic.operations import MigrateOperation, Operations
 from app.models import Base
 from app.config import settings
 # this is the Alembic Config object, which provides
@@ -22,6 +23,43 @@ if config.config_file_name is not None:
 # target_metadata = mymodel.Base.metadata
 target_metadata = Base.metadata
 
+
+# CREATE/DROP INDEX CONCURRENTLY cannot run inside a transaction block,
+# so migrations on live tables use these ops, which run each one in its own autocommit block
+@Operations.register_operation("create_index_concurrently")
+class CreateIndexConcurrentlyOp(MigrateOperation):
+    def __init__(self, index_name, table_name, columns, **kw):
+        self.index_name, self.table_name, self.columns, self.kw = index_name, table_name, columns, kw
+
+    @classmethod
+    def create_index_concurrently(cls, operations, index_name, table_name, columns, **kw):
+        return operations.invoke(cls(index_name, table_name, columns, **kw))
+
+
+@Operations.register_operation("drop_index_concurrently")
+class DropIndexConcurrentlyOp(MigrateOperation):
+    def __init__(self, index_name, table_name):
+        self.index_name, self.table_name = index_name, table_name
+
+    @classmethod
+    def drop_index_concurrently(cls, operations, index_name, table_name):
+        return operations.invoke(cls(index_name, table_name))
+
+
+@Operations.implementation_for(CreateIndexConcurrentlyOp)
+def create_index_concurrently(operations, operation):
+    with operations.get_context().autocommit_block():
+        operations.create_index(operation.index_name, operation.table_name, operation.columns,
+                                postgresql_concurrently=True, if_not_exists=True, **operation.kw)
+
+
+@Operations.implementation_for(DropIndexConcurrentlyOp)
+def drop_index_concurrently(operations, operation):
+    with operations.get_context().autocommit_block():
+        operations.drop_index(operation.index_name, table_name=operation.table_name,
+                              postgresql_concurrently=True, if_exists=True)
+
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
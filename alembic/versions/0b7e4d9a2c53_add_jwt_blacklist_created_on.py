@@ -0,0 +1,31 @@
+"""add JWT_blacklist created_on
+
+Revision ID: 0b7e4d9a2c53
+Revises: f2a6d3c81b94
+Create Date: 2026-10-17 23:12:08.417530
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0b7e4d9a2c53'
+down_revision: Union[str, Sequence[str], None] = 'f2a6d3c81b94'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('JWT_blacklist', sa.Column('created_on', sa.DateTime(), server_default=sa.text("timezone('utc', clock_timestamp())"), nullable=False))
+
+    op.create_index_concurrently('ix_JWT_blacklist_created_on', 'JWT_blacklist', ['created_on'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index_concurrently('ix_JWT_blacklist_created_on', 'JWT_blacklist')
+    op.drop_column('JWT_blacklist', 'created_on')
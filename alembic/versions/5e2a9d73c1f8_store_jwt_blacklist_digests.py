@@ -0,0 +1,45 @@
+"""store jwt blacklist digests
+
+Revision ID: 5e2a9d73c1f8
+Revises: c4d81f0a2b6e
+Create Date: 2026-10-17 14:48:12.093561
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.config import settings
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e2a9d73c1f8'
+down_revision: Union[str, Sequence[str], None] = 'c4d81f0a2b6e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('JWT_blacklist', sa.Column('jti_digest', sa.LargeBinary(length=32), nullable=True))
+    # existing tokens have no jti, they are keyed by the digest of the whole token.
+    # expired_on held the logout time, the token expired at most access_token_expire_min later
+    op.execute(sa.text("""
+        UPDATE "JWT_blacklist"
+        SET jti_digest = sha256(convert_to(token, 'UTF8')),
+            expired_on = expired_on + make_interval(mins => :minutes)
+    """).bindparams(minutes=settings.access_token_expire_min))
+    op.alter_column('JWT_blacklist', 'jti_digest', nullable=False)
+    op.create_unique_constraint('JWT_blacklist_jti_digest_key', 'JWT_blacklist', ['jti_digest'])
+    op.drop_column('JWT_blacklist', 'token')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # the tokens can't be recovered from their digests
+    op.execute('DELETE FROM "JWT_blacklist"')
+    op.add_column('JWT_blacklist', sa.Column('token', sa.String(), nullable=False))
+    op.create_unique_constraint('JWT_blacklist_token_key', 'JWT_blacklist', ['token'])
+    op.drop_constraint('JWT_blacklist_jti_digest_key', 'JWT_blacklist', type_='unique')
+    op.drop_column('JWT_blacklist', 'jti_digest')
@@ -0,0 +1,37 @@
+"""add task indexes
+
+Revision ID: 63b3ff2b20c7
+Revises: efb1d80370fd
+Create Date: 2026-10-17 10:12:41.208315
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '63b3ff2b20c7'
+down_revision: Union[str, Sequence[str], None] = 'efb1d80370fd'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+indexes = {
+    'ix_tasks_user_id_created_on_id': ['user_id', 'created_on', 'id'],
+    'ix_tasks_user_id_due_date': ['user_id', 'due_date'],
+    'ix_tasks_user_id_state': ['user_id', 'state'],
+    'ix_tasks_user_id_tag': ['user_id', 'tag'],
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for name, columns in indexes.items():
+        op.create_index_concurrently(name, 'tasks', columns, unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name in indexes:
+        op.drop_index_concurrently(name, 'tasks')
@@ -0,0 +1,34 @@
+"""add task versions
+
+Revision ID: 7b4e0c92d5a3
+Revises: d1f3b8e65a27
+Create Date: 2026-10-17 17:40:12.381042
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7b4e0c92d5a3'
+down_revision: Union[str, Sequence[str], None] = 'd1f3b8e65a27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # users without a row are at version 0, until their first change
+    op.create_table('task_versions',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('version', sa.BigInteger(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('task_versions')
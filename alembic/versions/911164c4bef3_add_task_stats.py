@@ -0,0 +1,42 @@
+"""add task stats
+
+Revision ID: 911164c4bef3
+Revises: 92c010e1b3fe
+Create Date: 2026-10-17 11:48:03.672105
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '911164c4bef3'
+down_revision: Union[str, Sequence[str], None] = '92c010e1b3fe'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('task_stats',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('state', postgresql.ENUM('todo', 'doing', 'done', name='state', create_type=False), nullable=False),
+    sa.Column('tag', sa.String(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'state', 'tag')
+    )
+    op.execute("""
+        INSERT INTO task_stats (user_id, state, tag, count)
+        SELECT user_id, state, coalesce(tag::text, ''), count(*)
+        FROM tasks
+        GROUP BY user_id, state, tag
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('task_stats')
@@ -0,0 +1,43 @@
+"""add task search indexes
+
+Revision ID: 92c010e1b3fe
+Revises: 63b3ff2b20c7
+Create Date: 2026-10-17 11:02:19.551870
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '92c010e1b3fe'
+down_revision: Union[str, Sequence[str], None] = '63b3ff2b20c7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.add_column('tasks', sa.Column('search_vector', postgresql.TSVECTOR(), sa.Computed(
+        "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+        "setweight(to_tsvector('english', coalesce(description, '')), 'B')",
+        persisted=True
+    ), nullable=True))
+
+    op.create_index_concurrently('ix_tasks_search_vector', 'tasks', ['search_vector'], unique=False,
+                                 postgresql_using='gin')
+    op.create_index_concurrently('ix_tasks_title_trgm', 'tasks', ['title'], unique=False,
+                                 postgresql_using='gin', postgresql_ops={'title': 'gin_trgm_ops'})
+    op.create_index_concurrently('ix_tasks_description_trgm', 'tasks', ['description'], unique=False,
+                                 postgresql_using='gin', postgresql_ops={'description': 'gin_trgm_ops'})
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name in ('ix_tasks_description_trgm', 'ix_tasks_title_trgm', 'ix_tasks_search_vector'):
+        op.drop_index_concurrently(name, 'tasks')
+    op.drop_column('tasks', 'search_vector')
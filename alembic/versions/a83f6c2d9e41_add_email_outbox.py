@@ -0,0 +1,50 @@
+"""add email outbox
+
+Revision ID: a83f6c2d9e41
+Revises: 5e2a9d73c1f8
+Create Date: 2026-10-17 15:32:08.274916
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a83f6c2d9e41'
+down_revision: Union[str, Sequence[str], None] = '5e2a9d73c1f8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('email_outbox',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('subject', sa.String(), nullable=False),
+    sa.Column('recipients', postgresql.ARRAY(sa.String()), nullable=False),
+    sa.Column('template', sa.Enum('ResetPassword', 'ConfirmAccount', 'PayslipsMail', name='emailtemplate'), nullable=False),
+    sa.Column('email', sa.String(), nullable=True),
+    sa.Column('code', sa.String(), nullable=True),
+    sa.Column('message', sa.String(), nullable=False),
+    sa.Column('status', sa.Enum('Pending', 'Sent', 'Failed', name='emailstatus'), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('last_error', sa.String(), nullable=True),
+    sa.Column('created_on', sa.DateTime(), nullable=False),
+    sa.Column('next_attempt_on', sa.DateTime(), nullable=False),
+    sa.Column('sent_on', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_email_outbox_pending', 'email_outbox', ['next_attempt_on'], unique=False, postgresql_where=sa.text("status = 'Pending'"))
+    op.create_index('ix_email_outbox_created_on', 'email_outbox', ['created_on'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_email_outbox_created_on', table_name='email_outbox')
+    op.drop_index('ix_email_outbox_pending', table_name='email_outbox')
+    op.drop_table('email_outbox')
+    sa.Enum(name='emailstatus').drop(op.get_bind(), checkfirst=True)
+    sa.Enum(name='emailtemplate').drop(op.get_bind(), checkfirst=True)
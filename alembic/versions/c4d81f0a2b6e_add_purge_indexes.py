@@ -0,0 +1,37 @@
+"""add purge indexes
+
+Revision ID: c4d81f0a2b6e
+Revises: 911164c4bef3
+Create Date: 2026-10-17 14:05:37.518204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4d81f0a2b6e'
+down_revision: Union[str, Sequence[str], None] = '911164c4bef3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+indexes = {
+    'ix_JWT_blacklist_expired_on': ('JWT_blacklist', ['expired_on']),
+    'ix_reset_codes_created_on': ('reset_codes', ['created_on']),
+    'ix_confirmation_codes_created_on': ('confirmation_codes', ['created_on']),
+    'ix_errors_created_on': ('errors', ['created_on']),
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for name, (table, columns) in indexes.items():
+        op.create_index_concurrently(name, table, columns, unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name, (table, _) in indexes.items():
+        op.drop_index_concurrently(name, table)
@@ -0,0 +1,38 @@
+"""add error fingerprints
+
+Revision ID: d1f3b8e65a27
+Revises: a83f6c2d9e41
+Create Date: 2026-10-17 16:48:21.603519
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd1f3b8e65a27'
+down_revision: Union[str, Sequence[str], None] = 'a83f6c2d9e41'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # existing errors keep a null fingerprint, they were stored once each
+    op.add_column('errors', sa.Column('fingerprint', sa.String(), nullable=True))
+    op.add_column('errors', sa.Column('count', sa.Integer(), server_default='1', nullable=False))
+    op.add_column('errors', sa.Column('last_seen', sa.DateTime(), nullable=True))
+    op.execute('UPDATE errors SET last_seen = created_on')
+    op.create_unique_constraint('errors_fingerprint_key', 'errors', ['fingerprint'])
+    op.create_index('ix_errors_last_seen', 'errors', ['last_seen'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_errors_last_seen', table_name='errors')
+    op.drop_constraint('errors_fingerprint_key', 'errors', type_='unique')
+    op.drop_column('errors', 'last_seen')
+    op.drop_column('errors', 'count')
+    op.drop_column('errors', 'fingerprint')
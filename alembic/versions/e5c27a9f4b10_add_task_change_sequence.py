@@ -0,0 +1,62 @@
+"""add task change sequence
+
+Revision ID: e5c27a9f4b10
+Revises: 7b4e0c92d5a3
+Create Date: 2026-10-17 18:26:45.917305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5c27a9f4b10'
+down_revision: Union[str, Sequence[str], None] = '7b4e0c92d5a3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+UTC_NOW = sa.text("timezone('utc', now())")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # the defaults were evaluated once when the app started, the database sets them now
+    op.alter_column('tasks', 'created_on', server_default=UTC_NOW)
+    op.alter_column('tasks', 'updated_on', server_default=UTC_NOW)
+
+    op.add_column('tasks', sa.Column('change_seq', sa.BigInteger(), server_default='0', nullable=False))
+    # the existing tasks become the users' next change, so a sync since any earlier version returns them
+    op.execute("""
+        INSERT INTO task_versions (user_id, version)
+        SELECT DISTINCT user_id, 1 FROM tasks
+        ON CONFLICT (user_id) DO UPDATE SET version = task_versions.version + 1
+    """)
+    op.execute("""
+        UPDATE tasks SET change_seq = task_versions.version
+        FROM task_versions
+        WHERE task_versions.user_id = tasks.user_id
+    """)
+
+    op.create_table('task_tombstones',
+    sa.Column('task_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('change_seq', sa.BigInteger(), nullable=False),
+    sa.Column('deleted_on', sa.DateTime(), server_default=UTC_NOW, nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('task_id')
+    )
+    op.create_index('ix_task_tombstones_user_id_change_seq_task_id', 'task_tombstones', ['user_id', 'change_seq', 'task_id'], unique=False)
+
+    op.create_index_concurrently('ix_tasks_user_id_change_seq_id', 'tasks', ['user_id', 'change_seq', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index_concurrently('ix_tasks_user_id_change_seq_id', 'tasks')
+    op.drop_index('ix_task_tombstones_user_id_change_seq_task_id', table_name='task_tombstones')
+    op.drop_table('task_tombstones')
+    op.drop_column('tasks', 'change_seq')
+    op.alter_column('tasks', 'updated_on', server_default=None)
+    op.alter_column('tasks', 'created_on', server_default=None)
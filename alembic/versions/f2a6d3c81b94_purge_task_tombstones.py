@@ -0,0 +1,31 @@
+"""purge task tombstones
+
+Revision ID: f2a6d3c81b94
+Revises: e5c27a9f4b10
+Create Date: 2026-10-17 21:05:33.604218
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2a6d3c81b94'
+down_revision: Union[str, Sequence[str], None] = 'e5c27a9f4b10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('task_versions', sa.Column('tombstones_purged_seq', sa.BigInteger(), server_default='0', nullable=False))
+
+    op.create_index_concurrently('ix_task_tombstones_deleted_on', 'task_tombstones', ['deleted_on'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index_concurrently('ix_task_tombstones_deleted_on', 'task_tombstones')
+    op.drop_column('task_versions', 'tombstones_purged_seq')
@@ -0,0 +1,60 @@
+import argparse
+import asyncio
+from .database import SessionLocal, AsyncSessionLocal, async_engine
+from .maintenance import purge_expired
+from .emailOutbox import deliver_emails
+from .routers.emailUtil import mail_client
+from .routers.taskStats import rebuild_task_stats
+
+async def purge(batch_size):
+    try:
+        async with AsyncSessionLocal() as db:
+            return await purge_expired(db, batch_size=batch_size)
+    finally:
+        await async_engine.dispose()
+
+async def send_emails(batch_size):
+    try:
+        async with AsyncSessionLocal() as db:
+            return await deliver_emails(db, batch_size=batch_size)
+    finally:
+        await mail_client.close()
+        await async_engine.dispose()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    rebuild = commands.add_parser("rebuild-task-stats", help="recompute the task_stats counters from the tasks table")
+    rebuild.add_argument("--user-id", type=int, default=None, help="only rebuild this user's counters")
+
+    purge_parser = commands.add_parser("purge-expired", help="delete expired blacklisted tokens, codes and old errors")
+    purge_parser.add_argument("--batch-size", type=int, default=None, help="rows deleted per transaction")
+
+    send_parser = commands.add_parser("send-emails", help="send one batch of the queued emails that are due")
+    send_parser.add_argument("--batch-size", type=int, default=None, help="emails sent in this batch")
+
+    args = parser.parse_args(argv)
+    if args.command == "purge-expired":
+        for table, purged in asyncio.run(purge(args.batch_size)).items():
+            print(f"{table}: {purged} rows purged")
+        return
+    if args.command == "send-emails":
+        delivered = asyncio.run(send_emails(args.batch_size))
+        print(f"{delivered['sent']} emails sent, {delivered['failed']} failed")
+        return
+
+    db = SessionLocal()
+    try:
+        if args.command == "rebuild-task-stats":
+            rebuild_task_stats(args.user_id, db)
+            db.commit()
+            print("task_stats rebuilt" + (f" for user {args.user_id}" if args.user_id is not None else ""))
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
+from typing import Literal, Optional
 from pydantic import computed_field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 class Settings(BaseSettings):
@@ -18,9 +19,52 @@ class Settings(BaseSettings):
     allow_insecure_http: bool = False
     test_database_name: str
 
+    database_pool_size: int = 5
+    database_max_overflow: int = 10
+    database_pool_timeout: float = 30
+    database_pool_recycle: int = 1800
+    database_pool_pre_ping: bool = True
+    database_pooling_mode: Literal["session", "transaction"] = "session"
+    database_replica_hostname: str = ""
+    read_your_writes_seconds: int = 5
+
     frontend_url: str = "http://localhost:4200"
     backend_url: str = "https://localhost:8001"
 
+    redis_url: str = "redis://localhost:6379/0"
+    user_cache_backend: str = "memory"
+    user_cache_ttl_seconds: int = 60
+    user_cache_max_size: int = 10000
+    task_page_cache_max_size: int = 1000
+    task_page_cache_ttl_seconds: int = 300
+    task_page_cache_redis: bool = False
+    token_blacklist_refresh_seconds: float = 1
+    token_blacklist_commit_skew_seconds: float = 5
+    token_blacklist_reload_seconds: float = 300
+
+    password_hash_time_cost: int = 3
+    password_hash_memory_cost: int = 65536
+    password_hash_parallelism: int = 4
+    password_hash_workers: Optional[int] = None
+    password_hash_max_concurrency: int = 32
+
+    purge_interval_seconds: int = 3600
+    purge_batch_size: int = 1000
+    confirmation_code_retention_days: int = 30
+    error_retention_days: int = 30
+    error_flush_interval_seconds: float = 5
+    error_sink_max_pending: int = 1000
+    error_flush_timeout_seconds: float = 2
+
+    smtp_pool_size: int = 4
+    email_template_cache_dir: str = ""
+    email_worker_interval_seconds: float = 5
+    email_batch_size: int = 20
+    email_max_attempts: int = 5
+    email_retry_base_seconds: int = 30
+    email_outbox_retention_days: int = 7
+    tombstone_retention_days: int = 30
+
     env: str
 
     model_config = SettingsConfigDict(
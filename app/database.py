@@ -1,12 +1,72 @@
+import time
+from uuid import uuid4
+from fastapi import Request
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
 from .config import settings
+from .poolMetrics import PoolMetrics, metered_pool
 
 SQLALCHEMY_DATABASE_URL = f'postgresql://{settings.database_username}:{settings.database_password}@{settings.database_hostname}/{settings.database_name}'
+ASYNC_SQLALCHEMY_DATABASE_URL = f'postgresql+asyncpg://{settings.database_username}:{settings.database_password}@{settings.database_hostname}/{settings.database_name}'
+ASYNC_REPLICA_DATABASE_URL = f'postgresql+asyncpg://{settings.database_username}:{settings.database_password}@{settings.database_replica_hostname}/{settings.database_name}'
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+TRANSACTION_POOLING = "transaction"
+# set on the responses to writes so the client's next reads go to the primary
+LAST_WRITE_COOKIE = "last_write"
+LAST_WRITE_HEADER = "X-Last-Write"
+
+def pool_options(pool_class, metrics: PoolMetrics, pooling_mode: str, **sizing):
+    """Behind a transaction pooler (PgBouncer pool_mode=transaction) the pooler owns the server connections,
+    so each session opens its own client connection and closes it when the session ends"""
+    if pooling_mode == TRANSACTION_POOLING:
+        return {"poolclass": metered_pool(NullPool, metrics)}
+
+    return {
+        "poolclass": metered_pool(pool_class, metrics),
+        "pool_size": settings.database_pool_size,
+        "max_overflow": settings.database_max_overflow,
+        "pool_timeout": settings.database_pool_timeout,
+        "pool_recycle": settings.database_pool_recycle,
+        "pool_pre_ping": settings.database_pool_pre_ping,
+        **sizing,
+    }
+
+def build_engine(url, metrics: PoolMetrics, pooling_mode: str = settings.database_pooling_mode):
+    return create_engine(url, **pool_options(QueuePool, metrics, pooling_mode))
+
+def build_async_engine(url, metrics: PoolMetrics, pooling_mode: str = settings.database_pooling_mode, **sizing):
+    connect_args = {}
+    if pooling_mode == TRANSACTION_POOLING:
+        # consecutive transactions may run on different server connections, so no prepared
+        # statement is reused and each one gets a name no other client can have taken
+        connect_args = {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+        }
+    return create_async_engine(url, connect_args=connect_args, **pool_options(AsyncAdaptedQueuePool, metrics, pooling_mode, **sizing))
+
+pool_metrics = PoolMetrics()
+async_pool_metrics = PoolMetrics()
+replica_pool_metrics = PoolMetrics()
+error_pool_metrics = PoolMetrics()
+
+engine = build_engine(SQLALCHEMY_DATABASE_URL, pool_metrics)
+async_engine = build_async_engine(ASYNC_SQLALCHEMY_DATABASE_URL, async_pool_metrics)
+# the error flusher's own connection, so errors are still stored when the requests exhaust their pool
+error_engine = build_async_engine(
+    ASYNC_SQLALCHEMY_DATABASE_URL, error_pool_metrics, pool_size=1, max_overflow=0, pool_timeout=settings.error_flush_timeout_seconds
+)
+# without a replica, reads go to the primary
+replica_engine = build_async_engine(ASYNC_REPLICA_DATABASE_URL, replica_pool_metrics) if settings.database_replica_hostname else None
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# objects stay loaded after commit, an expired attribute cannot be lazy loaded from async code
+AsyncSessionLocal = async_sessionmaker(autoflush=False, expire_on_commit=False, bind=async_engine, class_=AsyncSession)
+ErrorSessionLocal = async_sessionmaker(autoflush=False, expire_on_commit=False, bind=error_engine, class_=AsyncSession)
+AsyncReadSessionLocal = async_sessionmaker(autoflush=False, expire_on_commit=False, bind=replica_engine or async_engine, class_=AsyncSession)
 
 Base = declarative_base()
 
@@ -16,3 +76,20 @@ def get_db():
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def wrote_recently(request: Request):
+    """Whether the client wrote within read_your_writes_seconds, so a lagging replica may miss its write"""
+    last_write = request.headers.get(LAST_WRITE_HEADER) or request.cookies.get(LAST_WRITE_COOKIE)
+    try:
+        return time.time() - float(last_write) < settings.read_your_writes_seconds
+    except (TypeError, ValueError):
+        return False
+
+async def get_read_db(request: Request):
+    session_factory = AsyncSessionLocal if wrote_recently(request) else AsyncReadSessionLocal
+    async with session_factory() as db:
+        yield db
@@ -0,0 +1,70 @@
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Optional
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from . import models
+from .config import settings
+from .enums import EmailStatus
+from .routers import emailUtil
+
+logger = logging.getLogger(__name__)
+
+def retry_delay(attempts: int) -> timedelta:
+    return timedelta(seconds=settings.email_retry_base_seconds * 2 ** (attempts - 1))
+
+async def claim_emails(db: AsyncSession, now: datetime, batch_size: int):
+    """Take the due emails and push their next attempt back by the retry delay, then commit.
+    Other workers skip them meanwhile, and if this one dies they are retried once the delay is over."""
+    emails = (await db.scalars(
+        select(models.EmailOutbox)
+        .where(models.EmailOutbox.status == EmailStatus.Pending, models.EmailOutbox.next_attempt_on <= now)
+        .order_by(models.EmailOutbox.next_attempt_on)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )).all()
+    for email in emails:
+        email.attempts += 1
+        email.next_attempt_on = now + retry_delay(email.attempts)
+    await db.commit()
+    return emails
+
+async def deliver_emails(db: AsyncSession, now: Optional[datetime] = None, batch_size: Optional[int] = None):
+    """Send one batch of due emails outside of any transaction over the pooled connections, then record the outcomes.
+    An email that can't be built counts as a failed attempt of its own, the rest of the batch is still sent."""
+    now = now or datetime.now(timezone.utc)
+    emails = await claim_emails(db, now, batch_size or settings.email_batch_size)
+    messages, errors = {}, {}
+    for email in emails:
+        try:
+            messages[email.id] = emailUtil.build_email(email.subject, email.recipients, email.template, email.email, email.code, msg=email.message)
+        except Exception as e:
+            errors[email.id] = e
+    errors.update(zip(messages, await emailUtil.mail_client.send_messages(list(messages.values()))))
+
+    delivered = {"sent": 0, "failed": 0}
+    for email in emails:
+        error = errors[email.id]
+        if error is None:
+            values = {"status": EmailStatus.Sent, "sent_on": now, "last_error": None}
+            delivered["sent"] += 1
+        else:
+            logger.warning("sending email %s failed: %s", email.id, error)
+            values = {"last_error": str(error)}
+            if email.attempts >= settings.email_max_attempts:
+                values["status"] = EmailStatus.Failed
+            delivered["failed"] += 1
+        await db.execute(update(models.EmailOutbox).where(models.EmailOutbox.id == email.id).values(values))
+    await db.commit()
+    return delivered
+
+async def drain_outbox(
+    session_factory: async_sessionmaker,
+    clock: Callable[[], datetime] = lambda: datetime.now(timezone.utc),
+):
+    """One run of the email worker: deliver batches until the due emails are all sent or failed"""
+    async with session_factory() as db:
+        while True:
+            delivered = await deliver_emails(db, clock())
+            if delivered["sent"] + delivered["failed"] < settings.email_batch_size:
+                return
@@ -0,0 +1,80 @@
+import re
+from functools import lru_cache
+from typing import List, Optional, Tuple
+from jinja2 import Environment, FileSystemBytecodeCache, PackageLoader, Template, select_autoescape
+from markupsafe import escape
+from .config import settings
+from .enums import EmailTemplate
+
+env = Environment(
+    loader=PackageLoader('app', 'templates'),
+    autoescape=select_autoescape(['html', 'xml']),
+    # templates only change with a deploy, don't stat them before every render
+    auto_reload=False,
+    bytecode_cache=FileSystemBytecodeCache(settings.email_template_cache_dir) if settings.email_template_cache_dir else None,
+)
+
+file_per_template = {
+    EmailTemplate.ResetPassword: 'reset_pass_mail.html',
+    EmailTemplate.ConfirmAccount: 'confirm_mail.html',
+    EmailTemplate.PayslipsMail: 'payslip_mail.html',
+}
+
+# compiled once at startup
+templates = {
+    email_template: env.get_template(file_name)
+    for email_template, file_name in file_per_template.items()
+    if file_name in env.list_templates()
+}
+
+RECIPIENT_FIELDS = ("name", "code")
+
+def get_template(email_template: EmailTemplate) -> Template:
+    return templates.get(email_template) or env.get_template(file_per_template[email_template])
+
+def recipient_name(email: str) -> str:
+    return email.split("@")[0] if email else "User"
+
+def split_on_markers(html: str, delimiter: str):
+    """Static fragments and the recipient fields between them"""
+    parts = re.split(f"{delimiter}({'|'.join(RECIPIENT_FIELDS)}){delimiter}", html)
+    return tuple(parts[0::2]), tuple(parts[1::2])
+
+@lru_cache(maxsize=64)
+def static_fragments(email_template: EmailTemplate, subject: str, msg: str) -> Optional[Tuple[tuple, tuple]]:
+    """Render the campaign once with markers in place of the recipient fields and split the output around them.
+    None when a field is not output as is (filtered, tested in a condition...), those templates are rendered per recipient."""
+    template = get_template(email_template)
+    renders = [
+        split_on_markers(template.render(subject=subject, message=msg, **{field: f"{delimiter}{field}{delimiter}" for field in RECIPIENT_FIELDS}), delimiter)
+        for delimiter in ("\x00", "\x01")
+    ]
+    if renders[0] != renders[1]:
+        return None
+    fragments, fields = renders[0]
+    if "".join(fragments) != template.render(subject=subject, message=msg, **{field: "" for field in RECIPIENT_FIELDS}):
+        return None
+    return fragments, fields
+
+def render_many(email_template: EmailTemplate, recipients: List[Tuple[str, str]], subject: str, msg: str = "") -> List[str]:
+    """Render the email for each (email, code) recipient, joining the cached static fragments with the escaped fields"""
+    cached = static_fragments(email_template, subject, msg)
+    if cached is None:
+        template = get_template(email_template)
+        return [template.render(name=recipient_name(email), code=code, subject=subject, message=msg) for email, code in recipients]
+
+    fragments, fields = cached
+    autoescape = env.autoescape(file_per_template[email_template]) if callable(env.autoescape) else env.autoescape
+    html = []
+    for email, code in recipients:
+        values = {"name": recipient_name(email), "code": code}
+        values = {field: str(escape(value) if autoescape else value) for field, value in values.items()}
+        parts = [fragments[0]]
+        for field, fragment in zip(fields, fragments[1:]):
+            parts.append(values[field])
+            parts.append(fragment)
+        html.append("".join(parts))
+    return html
+
+def render_email(email_template: EmailTemplate, email: str, code: str, subject: str, msg: str = "") -> str:
+    return render_many(email_template, [(email, code)], subject, msg)[0]
@@ -3,4 +3,5 @@ from .emailTemplate import EmailTemplate
 from .codeStatus import CodeStatus
 from .state import State
 from .basicEnum import BasicEnum
-from .tag import Tag
\ No newline at end of file
+from .tag import Tag
+from .emailStatus import EmailStatus
@@ -0,0 +1,6 @@
+from enum import Enum
+
+class EmailStatus(str, Enum):
+    Pending = "Pending"
+    Sent = "Sent"
+    Failed = "Failed"
@@ -1,26 +1,13 @@
-from fastapi import Depends, status
-from . import models, schemas
-from .database import get_db
-from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy.orm import Session
+from fastapi import status
+from . import schemas
+from .errorSink import error_sink
 
-def add_error(e: SQLAlchemyError, db: Session = Depends(get_db)):
-    error = models.Error(
-        error=str(e)
-    )
-    try:
-        db.add(error)
-        db.commit()
-        db.refresh(error)
-    except Exception as e:
-        db.rollback()
-        return schemas.ErrorOut(
-            status=status.HTTP_400_BAD_REQUEST,
-            message="something went wrong"
-        )
-    return schemas.ErrorOut(**error.__dict__,
-        status=status.HTTP_201_CREATED,
-        message="error added successfully"
+def add_error(e: Exception):
+    """Record the error in the sink, the failing request's session is left alone and nothing is written here"""
+    error_sink.record(e)
+    return schemas.ErrorOut(
+        status=status.HTTP_202_ACCEPTED,
+        message="error recorded"
     )
 
 def get_error_message(error_message, error_keys):
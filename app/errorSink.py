@@ -0,0 +1,97 @@
+import hashlib
+import logging
+import re
+import threading
+import traceback
+from datetime import datetime, timezone
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from . import models
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+LITERALS = re.compile(r"'[^']*'|\"[^\"]*\"|\b\d+(\.\d+)?\b")
+
+def fingerprint(e: Exception) -> str:
+    """Same fingerprint for the same failure whatever the ids, values and parameters involved"""
+    if isinstance(e, DBAPIError) and e.orig is not None:
+        kind = type(e.orig).__name__
+        message = f"{str(e.orig).splitlines()[0] if str(e.orig) else ''} {e.statement or ''}"
+    else:
+        kind = type(e).__name__
+        message = str(e).splitlines()[0] if str(e) else ""
+    frames = traceback.extract_tb(e.__traceback__)
+    location = f"{frames[-1].filename}:{frames[-1].name}" if frames else ""
+    normalized = LITERALS.sub("?", message)
+    return hashlib.sha256(f"{kind}|{location}|{normalized}".encode()).hexdigest()
+
+class ErrorSink:
+    """Collects the errors of failing requests and writes them in batches from a background task,
+    so a database incident doesn't get one more write per failing request.
+    Repeated errors are merged by fingerprint and counted, distinct errors past max_pending are only logged."""
+    def __init__(self, max_pending: int):
+        self.max_pending = max_pending
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self.lock:
+            self.pending = {}
+            self.dropped = 0
+
+    def record(self, e: Exception):
+        key = fingerprint(e)
+        now = datetime.now(timezone.utc)
+        with self.lock:
+            entry = self.pending.get(key)
+            if entry:
+                entry["count"] += 1
+                entry["last_seen"] = now
+                return
+            if len(self.pending) >= self.max_pending:
+                self.dropped += 1
+                logger.error("error sink full, not stored: %s", e)
+                return
+            self.pending[key] = {"fingerprint": key, "error": str(e), "count": 1, "created_on": now, "last_seen": now}
+
+    async def flush(self, db: AsyncSession) -> int:
+        """Upsert the pending errors in one statement, logging them instead when the database is unavailable"""
+        with self.lock:
+            entries, self.pending = list(self.pending.values()), {}
+        if not entries:
+            return 0
+
+        statement = insert(models.Error).values(entries)
+        statement = statement.on_conflict_do_update(
+            index_elements=[models.Error.fingerprint],
+            set_={
+                "count": models.Error.count + statement.excluded.count,
+                "last_seen": func.greatest(models.Error.last_seen, statement.excluded.last_seen),
+            },
+        )
+        try:
+            await db.execute(statement)
+            await db.commit()
+        except Exception as flush_error:
+            await db.rollback()
+            logger.error("could not store %s errors: %s", len(entries), flush_error)
+            for entry in entries:
+                logger.error("%s (x%s, last seen %s)", entry["error"], entry["count"], entry["last_seen"].isoformat())
+            return 0
+        return len(entries)
+
+    def stats(self):
+        return {
+            "pending": len(self.pending),
+            "dropped": self.dropped,
+        }
+
+async def flush_errors(session_factory: async_sessionmaker):
+    """One run of the error flusher, in a session of its own"""
+    async with session_factory() as db:
+        await error_sink.flush(db)
+
+error_sink = ErrorSink(settings.error_sink_max_pending)
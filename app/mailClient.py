@@ -0,0 +1,157 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from email.message import EmailMessage
+from email.utils import formataddr, formatdate, make_msgid
+from typing import Dict, List, Optional
+import aiosmtplib
+from fastapi_mail import ConnectionConfig, FastMail, MessageSchema
+from fastapi_mail.fastmail import email_dispatched
+from fastapi_mail.schemas import MessageType
+
+async def build_mime(message: MessageSchema, config: ConnectionConfig) -> EmailMessage:
+    """The MIME message for a MessageSchema with a body, its alternative body and attachments"""
+    mime = EmailMessage()
+    sender = message.from_email or config.MAIL_FROM
+    from_name = message.from_name or config.MAIL_FROM_NAME
+    mime["From"] = formataddr((from_name, sender)) if from_name else sender
+    mime["To"] = ", ".join(message.recipients)
+    for header, addresses in (("Cc", message.cc), ("Bcc", message.bcc), ("Reply-To", message.reply_to)):
+        if addresses:
+            mime[header] = ", ".join(addresses)
+    if message.subject:
+        mime["Subject"] = message.subject
+    mime["Date"] = formatdate(localtime=True)
+    mime["Message-ID"] = make_msgid()
+    for header, value in (message.headers or {}).items():
+        mime[header] = value
+
+    mime.set_content(message.body or "", subtype=message.subtype.value, charset=message.charset)
+    if message.alternative_body is not None:
+        subtype = MessageType.plain if message.subtype == MessageType.html else MessageType.html
+        mime.add_alternative(message.alternative_body, subtype=subtype.value, charset=message.charset)
+    for file, meta in message.attachments:
+        if meta and "mime_type" in meta and "mime_subtype" in meta:
+            maintype, subtype = meta["mime_type"], meta["mime_subtype"]
+        else:
+            maintype, _, subtype = (file.content_type or "application/octet-stream").partition("/")
+        mime.add_attachment(await file.read(), maintype=maintype, subtype=subtype, filename=file.filename)
+        await file.close()
+    return mime
+
+class SMTPPool:
+    """Up to size authenticated SMTP connections kept open between messages.
+    Connections belong to the event loop that opened them, a pool used from another loop starts over.
+    A connection idle for more than check_after seconds is checked with a NOOP before it is reused."""
+    def __init__(self, config: ConnectionConfig, size: int, check_after: float = 1.0):
+        self.config = config
+        self.size = size
+        self.check_after = check_after
+        self.loop = None
+        self.connections_opened = 0
+
+    def bind(self):
+        loop = asyncio.get_running_loop()
+        if loop is not self.loop:
+            self.loop = loop
+            self.idle: List[aiosmtplib.SMTP] = []
+            self.released: Dict[aiosmtplib.SMTP, float] = {}
+            self.slots = asyncio.Semaphore(self.size)
+
+    async def open(self, smtp: aiosmtplib.SMTP):
+        await smtp.connect()
+        try:
+            if self.config.USE_CREDENTIALS:
+                await smtp.login(self.config.MAIL_USERNAME, self.config.MAIL_PASSWORD.get_secret_value())
+        except Exception:
+            smtp.close()
+            raise
+        self.connections_opened += 1
+
+    async def connect(self) -> aiosmtplib.SMTP:
+        smtp = aiosmtplib.SMTP(
+            hostname=self.config.MAIL_SERVER,
+            port=self.config.MAIL_PORT,
+            timeout=self.config.TIMEOUT,
+            use_tls=self.config.MAIL_SSL_TLS,
+            start_tls=self.config.MAIL_STARTTLS,
+            validate_certs=self.config.VALIDATE_CERTS,
+            local_hostname=self.config.LOCAL_HOSTNAME,
+        )
+        await self.open(smtp)
+        return smtp
+
+    async def reusable(self, smtp: aiosmtplib.SMTP) -> bool:
+        """Whether an idle connection still answers, the server may have dropped it meanwhile"""
+        if not smtp.is_connected:
+            return False
+        if time.monotonic() - self.released.pop(smtp, 0) < self.check_after:
+            return True
+        try:
+            await smtp.noop()
+        except aiosmtplib.SMTPException:
+            smtp.close()
+            return False
+        return True
+
+    @asynccontextmanager
+    async def connection(self):
+        self.bind()
+        async with self.slots:
+            smtp = self.idle.pop() if self.idle else None
+            if smtp is None or not await self.reusable(smtp):
+                smtp = await self.connect()
+            try:
+                yield smtp
+            except aiosmtplib.SMTPResponseException:
+                # the server refused this message, the connection is reusable once the transaction is reset
+                try:
+                    await smtp.rset()
+                except aiosmtplib.SMTPException:
+                    smtp.close()
+                raise
+            finally:
+                if smtp.is_connected:
+                    self.released[smtp] = time.monotonic()
+                    self.idle.append(smtp)
+
+    async def send(self, message):
+        """Send over a pooled connection checked before the message starts.
+        A disconnect during the send is not retried here, the server may have accepted the message already."""
+        async with self.connection() as smtp:
+            return await smtp.send_message(message)
+
+    async def close(self):
+        if self.loop is not asyncio.get_running_loop():
+            return
+        idle, self.idle, self.released = self.idle, [], {}
+        for smtp in idle:
+            try:
+                await smtp.quit()
+            except aiosmtplib.SMTPException:
+                smtp.close()
+
+class MailClient(FastMail):
+    """FastMail sending over a pool of SMTP connections instead of one new connection per message"""
+    def __init__(self, config: ConnectionConfig, pool_size: int):
+        super().__init__(config)
+        self.pool = SMTPPool(config, pool_size)
+
+    async def send_message(self, message: MessageSchema):
+        error = (await self.send_messages([message]))[0]
+        if error:
+            raise error
+
+    async def send_messages(self, messages: List[MessageSchema]) -> List[Optional[Exception]]:
+        """Send the messages concurrently over the pool, returning the error of each message or None"""
+        async def send(message: MessageSchema):
+            msg = await build_mime(message, self.config)
+            if not self.config.SUPPRESS_SEND:
+                await self.pool.send(msg)
+            email_dispatched.send(msg)
+
+        results = await asyncio.gather(*(send(message) for message in messages), return_exceptions=True)
+        return [result if isinstance(result, Exception) else None for result in results]
+
+    async def close(self):
+        await self.pool.close()
@@ -1,8 +1,46 @@
-from fastapi import FastAPI
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from functools import partial
+from fastapi import FastAPI, Request
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from app import routers
-app = FastAPI()
+from app.config import settings
+from app.database import LAST_WRITE_COOKIE, LAST_WRITE_HEADER, AsyncSessionLocal, ErrorSessionLocal, error_engine
+from app.maintenance import run_purge
+from app.emailOutbox import drain_outbox
+from app.periodic import run_periodically
+from app.routers.emailUtil import mail_client
+from app.passwordHasher import password_hasher
+from app.errorSink import error_sink, flush_errors
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Purge expired rows, send the queued emails and store the recorded errors in the background, an interval of 0 leaves it to the cli.
+    The errors still pending are flushed and the mail connections and password hashing processes released on shutdown."""
+    workers = [
+        asyncio.create_task(run_periodically(interval, partial(run, session_factory)))
+        for interval, run, session_factory in (
+            (settings.purge_interval_seconds, run_purge, AsyncSessionLocal),
+            (settings.email_worker_interval_seconds, drain_outbox, AsyncSessionLocal),
+            (settings.error_flush_interval_seconds, flush_errors, ErrorSessionLocal),
+        )
+        if interval > 0
+    ]
+    yield
+    for worker in workers:
+        worker.cancel()
+    if settings.error_flush_interval_seconds > 0:
+        async with ErrorSessionLocal() as db:
+            await error_sink.flush(db)
+    await error_engine.dispose()
+    await mail_client.close()
+    password_hasher.shutdown()
+
+# responses are serialized with orjson rather than the standard json module
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 
 origins = [
     "*"
@@ -16,12 +54,24 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[LAST_WRITE_HEADER],
 )
 
+@app.middleware("http")
+async def mark_writes(request: Request, call_next):
+    """Tell the client when it last wrote, its reads stick to the primary for a few seconds after"""
+    response = await call_next(request)
+    if request.method not in ("GET", "HEAD", "OPTIONS"):
+        last_write = str(time.time())
+        response.headers[LAST_WRITE_HEADER] = last_write
+        response.set_cookie(LAST_WRITE_COOKIE, last_write, max_age=settings.read_your_writes_seconds, httponly=True, samesite="lax")
+    return response
+
 app.include_router(routers.user.router)
 app.include_router(routers.auth.router)
 app.include_router(routers.task.router)
 app.include_router(routers.resetCode.router)
+app.include_router(routers.metrics.router)
 
 
 
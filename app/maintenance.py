@@ -0,0 +1,106 @@
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Optional
+from sqlalchemy import and_, bindparam, delete, func, inspect, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from . import models
+from .enums import EmailStatus
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+def expired_rows(now: datetime):
+    """Rows nothing reads anymore, keyed by table name.
+    Blacklisted tokens are kept until they expire, reset codes expire after access_token_expire_min,
+    and so do blacklist rows the digest migration left without an expired_on.
+    Tombstones are kept for tombstone_retention_days, a client syncing from before then must resync in full."""
+    token_lifetime = timedelta(minutes=settings.access_token_expire_min)
+    return {
+        models.JWTblacklist.__tablename__: (
+            models.JWTblacklist,
+            or_(
+                models.JWTblacklist.expired_on < now,
+                and_(models.JWTblacklist.expired_on.is_(None), models.JWTblacklist.created_on < now - token_lifetime),
+            ),
+        ),
+        models.ResetCode.__tablename__: (
+            models.ResetCode,
+            models.ResetCode.created_on < now - token_lifetime,
+        ),
+        models.ConfirmationCode.__tablename__: (
+            models.ConfirmationCode,
+            models.ConfirmationCode.created_on < now - timedelta(days=settings.confirmation_code_retention_days),
+        ),
+        models.Error.__tablename__: (
+            models.Error,
+            models.Error.last_seen < now - timedelta(days=settings.error_retention_days),
+        ),
+        models.EmailOutbox.__tablename__: (
+            models.EmailOutbox,
+            and_(
+                models.EmailOutbox.status != EmailStatus.Pending,
+                models.EmailOutbox.created_on < now - timedelta(days=settings.email_outbox_retention_days),
+            ),
+        ),
+        models.TaskTombstone.__tablename__: (
+            models.TaskTombstone,
+            models.TaskTombstone.deleted_on < now - timedelta(days=settings.tombstone_retention_days),
+        ),
+    }
+
+async def record_purged_tombstones(rows, db: AsyncSession):
+    """Raise the users' tombstones_purged_seq to the highest change_seq of their purged tombstones"""
+    purged_seq = {}
+    for user_id, change_seq in rows:
+        purged_seq[user_id] = max(change_seq, purged_seq.get(user_id, 0))
+    if not purged_seq:
+        return
+    task_versions = models.TaskVersion.__table__
+    await db.execute(
+        task_versions.update()
+        .where(task_versions.c.user_id == bindparam("purged_user_id"))
+        .values(tombstones_purged_seq=func.greatest(task_versions.c.tombstones_purged_seq, bindparam("purged_seq"))),
+        [{"purged_user_id": user_id, "purged_seq": seq} for user_id, seq in purged_seq.items()],
+    )
+
+async def purge_table(model, condition, db: AsyncSession, batch_size: int):
+    """Delete the matching rows batch_size at a time, committing between batches so locks stay short"""
+    key = inspect(model).primary_key[0]
+    purged = 0
+    while True:
+        batch = (
+            select(key)
+            .where(condition)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        statement = delete(model).where(key.in_(batch))
+        if model is models.TaskTombstone:
+            rows = (await db.execute(statement.returning(model.user_id, model.change_seq))).all()
+            await record_purged_tombstones(rows, db)
+            deleted = len(rows)
+        else:
+            deleted = (await db.execute(statement)).rowcount
+        await db.commit()
+        purged += deleted
+        if deleted < batch_size:
+            return purged
+
+async def purge_expired(db: AsyncSession, now: Optional[datetime] = None, batch_size: Optional[int] = None):
+    """Purge every expired table and return the number of rows deleted per table"""
+    now = now or datetime.now(timezone.utc)
+    batch_size = batch_size or settings.purge_batch_size
+    purged = {}
+    for table, (model, condition) in expired_rows(now).items():
+        purged[table] = await purge_table(model, condition, db, batch_size)
+    return purged
+
+async def run_purge(
+    session_factory: async_sessionmaker,
+    clock: Callable[[], datetime] = lambda: datetime.now(timezone.utc),
+):
+    """One run of the purge scheduler, in a session of its own"""
+    async with session_factory() as db:
+        purged = await purge_expired(db, clock())
+    logger.info("purged expired rows: %s", purged)
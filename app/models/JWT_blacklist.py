@@ -1,8 +1,11 @@
-from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy import Column, Integer, LargeBinary, text
 from ..database import Base
+from .types import UTCDateTime
 
 class JWTblacklist(Base):
     __tablename__ = "JWT_blacklist"
     id = Column(Integer, primary_key=True)
-    token = Column(String, unique=True)
-    expired_on = Column(DateTime)
+    jti_digest = Column(LargeBinary(32), unique=True, nullable=False)
+    expired_on = Column(UTCDateTime, index=True)
+    # clock_timestamp rather than now(), so it is the insert time and not the start of the transaction
+    created_on = Column(UTCDateTime, server_default=text("timezone('utc', clock_timestamp())"), nullable=False, index=True)
@@ -5,3 +5,7 @@ from .confirmationCode import ConfirmationCode
 from .error import Error
 from .JWT_blacklist import JWTblacklist
 from .task import Task
+from .taskStats import TaskStats
+from .emailOutbox import EmailOutbox
+from .taskVersion import TaskVersion
+from .taskTombstone import TaskTombstone
@@ -1,8 +1,9 @@
 from datetime import datetime ,timezone
-from sqlalchemy import Column, Integer, String, DateTime, Enum, ForeignKey, func
+from sqlalchemy import Column, Integer, String, Enum, ForeignKey, func
 from sqlalchemy.orm import relationship
 from ..enums import CodeStatus
 from ..database import Base
+from .types import UTCDateTime
 
 class ConfirmationCode(Base):
     __tablename__ = "confirmation_codes"
@@ -12,6 +13,6 @@ class ConfirmationCode(Base):
     email = Column(String, nullable=False)
     code = Column(String, nullable=False)
     status = Column(Enum(CodeStatus), nullable=False)
-    created_on = Column(DateTime, default = datetime.now(timezone.utc), nullable=False)
+    created_on = Column(UTCDateTime, default = lambda: datetime.now(timezone.utc), nullable=False, index=True)
     user = relationship("User", foreign_keys=[user_id])
 
@@ -0,0 +1,26 @@
+from datetime import datetime, timezone
+from sqlalchemy import Column, Enum, Index, Integer, String, text
+from sqlalchemy.dialects.postgresql import ARRAY
+from ..database import Base
+from ..enums import EmailStatus, EmailTemplate
+from .types import UTCDateTime
+
+class EmailOutbox(Base):
+    __tablename__ = "email_outbox"
+    __table_args__ = (
+        Index("ix_email_outbox_pending", "next_attempt_on", postgresql_where=text("status = 'Pending'")),
+    )
+
+    id = Column(Integer, primary_key=True)
+    subject = Column(String, nullable=False)
+    recipients = Column(ARRAY(String), nullable=False)
+    template = Column(Enum(EmailTemplate), nullable=False)
+    email = Column(String)
+    code = Column(String)
+    message = Column(String, nullable=False, default="")
+    status = Column(Enum(EmailStatus), nullable=False, default=EmailStatus.Pending)
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(String)
+    created_on = Column(UTCDateTime, default=lambda: datetime.now(timezone.utc), nullable=False, index=True)
+    next_attempt_on = Column(UTCDateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+    sent_on = Column(UTCDateTime)
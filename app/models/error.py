@@ -1,10 +1,14 @@
 from datetime import datetime ,timezone
-from sqlalchemy import Column, Integer, DateTime, String
+from sqlalchemy import Column, Integer, String
 from ..database import Base
+from .types import UTCDateTime
 
 class Error(Base):
     __tablename__ = "errors"
 
     id = Column(Integer, primary_key = True, nullable = False)
     error = Column(String, nullable = False)
-    created_on = Column(DateTime, default = datetime.now(timezone.utc))
+    fingerprint = Column(String, unique = True)
+    count = Column(Integer, nullable = False, default = 1, server_default = "1")
+    created_on = Column(UTCDateTime, default = lambda: datetime.now(timezone.utc), index = True)
+    last_seen = Column(UTCDateTime, default = lambda: datetime.now(timezone.utc), index = True)
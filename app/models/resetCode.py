@@ -1,7 +1,8 @@
 from datetime import datetime, timezone
-from sqlalchemy import Integer, String, Column, DateTime, Enum
+from sqlalchemy import Integer, String, Column, Enum
 from ..enums import CodeStatus
 from ..database import Base
+from .types import UTCDateTime
 
 class ResetCode(Base):
     __tablename__ = "reset_codes"
@@ -9,4 +10,4 @@ class ResetCode(Base):
     email = Column(String, nullable = False)
     reset_code = Column(String, nullable = False)
     status = Column(Enum(CodeStatus), nullable = False)
-    created_on = Column(DateTime, default = datetime.now(timezone.utc))
+    created_on = Column(UTCDateTime, default = lambda: datetime.now(timezone.utc), index = True)
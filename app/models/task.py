@@ -1,22 +1,39 @@
-from datetime import datetime, timezone
-from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, Enum
-from sqlalchemy.orm import relationship
+from sqlalchemy import BigInteger, Column, Computed, ForeignKey, Index, Integer, String, Enum, func, text
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import deferred, relationship
 from app.database import Base
+from app.models.types import UTCDateTime
 from app.enums.state import State
 from app.enums.tag import Tag
 
 class Task(Base):
     __tablename__ = "tasks"
+    __table_args__ = (
+        Index("ix_tasks_user_id_created_on_id", "user_id", "created_on", "id"),
+        Index("ix_tasks_user_id_due_date", "user_id", "due_date"),
+        Index("ix_tasks_user_id_state", "user_id", "state"),
+        Index("ix_tasks_user_id_tag", "user_id", "tag"),
+        Index("ix_tasks_search_vector", "search_vector", postgresql_using="gin"),
+        Index("ix_tasks_user_id_change_seq_id", "user_id", "change_seq", "id"),
+    )
 
     id = Column(Integer, primary_key=True)
     title = Column(String, nullable=False)
     description = Column(String)
-    due_date = Column(DateTime)
+    due_date = Column(UTCDateTime)
     state = Column(Enum(State), nullable=False, default=State.todo)
     tag = Column(Enum(Tag), nullable=True, default=Tag.optional)
 
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    created_on = Column(DateTime, default=datetime.now(timezone.utc))
-    updated_on = Column(DateTime, default=datetime.now(timezone.utc), onupdate=datetime.now(timezone.utc))
+    # set by the database, UTC like every UTCDateTime
+    created_on = Column(UTCDateTime, server_default=text("timezone('utc', now())"))
+    updated_on = Column(UTCDateTime, server_default=text("timezone('utc', now())"), onupdate=func.timezone("utc", func.now()))
+    # the user's task version of the last write, GET /task/changes pages on it
+    change_seq = Column(BigInteger, nullable=False, server_default="0")
+    search_vector = deferred(Column(TSVECTOR, Computed(
+        "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+        "setweight(to_tsvector('english', coalesce(description, '')), 'B')",
+        persisted=True
+    )))
 
-    user = relationship("User", lazy="joined")
+    user = relationship("User", lazy="raise")
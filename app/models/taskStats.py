@@ -0,0 +1,11 @@
+from sqlalchemy import Column, Enum, ForeignKey, Integer, String
+from app.database import Base
+from app.enums.state import State
+
+class TaskStats(Base):
+    __tablename__ = "task_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    state = Column(Enum(State), primary_key=True)
+    tag = Column(String, primary_key=True, default="")
+    count = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,15 @@
+from sqlalchemy import BigInteger, Column, ForeignKey, Index, Integer, text
+from app.database import Base
+from app.models.types import UTCDateTime
+
+class TaskTombstone(Base):
+    """A deleted task, so GET /task/changes can tell the clients to drop it"""
+    __tablename__ = "task_tombstones"
+    __table_args__ = (
+        Index("ix_task_tombstones_user_id_change_seq_task_id", "user_id", "change_seq", "task_id"),
+    )
+
+    task_id = Column(Integer, primary_key=True, autoincrement=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    change_seq = Column(BigInteger, nullable=False)
+    deleted_on = Column(UTCDateTime, server_default=text("timezone('utc', now())"), index=True)
@@ -0,0 +1,11 @@
+from sqlalchemy import BigInteger, Column, ForeignKey, Integer
+from app.database import Base
+
+class TaskVersion(Base):
+    """Bumped with every change to the user's tasks, the ETags of the task endpoints are built from it"""
+    __tablename__ = "task_versions"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+    # the highest change_seq of the purged tombstones, a sync since an earlier version may miss deletes
+    tombstones_purged_seq = Column(BigInteger, nullable=False, server_default="0")
@@ -0,0 +1,13 @@
+from datetime import timezone
+from sqlalchemy import DateTime, TypeDecorator
+
+class UTCDateTime(TypeDecorator):
+    """A timestamp without time zone holding UTC.
+    asyncpg refuses aware datetimes for these columns, so they are converted to naive UTC first."""
+    impl = DateTime
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is not None and value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
@@ -1,6 +1,7 @@
 from datetime import datetime, timezone
-from sqlalchemy import Integer, ForeignKey, String, Column, DateTime, Boolean
+from sqlalchemy import Integer, ForeignKey, String, Column, Boolean
 from ..database import Base
+from .types import UTCDateTime
 
 class User(Base):
     __tablename__ = "users"
@@ -12,4 +13,4 @@ class User(Base):
     password = Column(String, nullable = False)
     active = Column(Boolean, nullable = False, default = True)
     confirmed = Column(Boolean, nullable = False, default = False)
-    created_on = Column(DateTime, default = datetime.now(timezone.utc))
+    created_on = Column(UTCDateTime, default = datetime.now(timezone.utc))
@@ -1,11 +1,14 @@
-from sqlalchemy import and_
+from uuid import uuid4
+from sqlalchemy import and_, select
 from jose import JWTError, jwt
 from datetime import datetime, timedelta, timezone
 from . import schemas, database, models
 from fastapi import Depends, status, HTTPException
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from .config import settings
+from .userCache import user_cache
+from .tokenBlacklist import token_blacklist, token_digest
 
 SECRET_KEY = settings.secret_key
 ALGORITHM = settings.algorithm
@@ -16,7 +19,7 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl = 'login')
 def create_access_token(data: dict):
     to_encode = data.copy()
     expire = datetime.now(timezone.utc) + timedelta(minutes= ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp" : expire})
+    to_encode.update({"exp" : expire, "jti": uuid4().hex})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm = ALGORITHM)
     return encoded_jwt
 
@@ -26,7 +29,7 @@ def verify_access_token(token: str, credentials_exception):
         id = payload['user']['id']
         if not id:
             raise credentials_exception
-        token_data = schemas.TokenData(id = id)
+        token_data = schemas.TokenData(id = id, jti = payload.get('jti'))
 
     except JWTError:
         raise credentials_exception
@@ -40,10 +43,21 @@ def get_exception(msg: str):
         headers={"WWW-Authenticate": "Bearer"},
     )
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)):
-    token = verify_access_token(token, get_exception("Could not validate credentials"))
-    user = db.query(models.User).filter(and_(models.User.id == token.id, models.User.confirmed)).first()
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(database.get_async_db)):
+    raw_token = token
+    token = verify_access_token(raw_token, get_exception("Could not validate credentials"))
+    await token_blacklist.refresh(db)
+    if token_blacklist.is_revoked(token_digest(raw_token, token.jti)):
+        raise get_exception("Could not validate credentials")
+
+    cached_user = await user_cache.get(token.id)
+    if cached_user:
+        return schemas.CurrentUser(**cached_user)
+
+    user = await db.scalar(select(models.User).where(and_(models.User.id == token.id, models.User.confirmed)))
     if not user:
         raise get_exception("Please validate your account !")
 
-    return user
+    current_user = schemas.CurrentUser.model_validate(user)
+    await user_cache.set(user.id, current_user.model_dump())
+    return current_user
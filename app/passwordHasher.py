@@ -0,0 +1,49 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from . import utils
+from .config import settings
+
+class PasswordHasher:
+    """Runs argon2 in a pool of worker processes so hashing never blocks the event loop.
+    At most max_concurrency passwords are queued for the pool, later callers wait for a slot.
+    With workers = 0 argon2 runs in the loop's default thread pool instead, it releases the GIL while hashing."""
+    def __init__(self, workers: int, max_concurrency: int):
+        self.workers = workers
+        self.max_concurrency = max_concurrency
+        self.executor = None
+        self.loop = None
+
+    def bind(self):
+        loop = asyncio.get_running_loop()
+        if loop is not self.loop:
+            self.loop = loop
+            self.slots = asyncio.Semaphore(self.max_concurrency)
+        if self.workers and self.executor is None:
+            # spawn, forking a process running the event loop and its threads is unsafe
+            self.executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+
+    async def run(self, func, *args):
+        self.bind()
+        async with self.slots:
+            return await self.loop.run_in_executor(self.executor, func, *args)
+
+    async def hash(self, password: str) -> str:
+        return await self.run(utils.hash_password, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self.run(utils.verify, plain_password, hashed_password)
+
+    def shutdown(self):
+        if self.executor:
+            self.executor.shutdown(cancel_futures=True)
+            self.executor = None
+
+def default_workers():
+    """password_hash_workers, one process per core when unset"""
+    if settings.password_hash_workers is None:
+        return os.cpu_count() or 1
+    return settings.password_hash_workers
+
+password_hasher = PasswordHasher(default_workers(), settings.password_hash_max_concurrency)
@@ -0,0 +1,20 @@
+import asyncio
+from typing import Awaitable, Callable, Optional
+from .error import add_error
+
+async def run_periodically(
+    interval: float,
+    fn: Callable[[], Awaitable],
+    sleep=asyncio.sleep,
+    runs: Optional[int] = None,
+):
+    """Await fn every interval seconds, forever or for the given number of runs.
+    A failing run is recorded like a failing request and the next one still happens."""
+    while runs is None or runs > 0:
+        await sleep(interval)
+        try:
+            await fn()
+        except Exception as e:
+            add_error(e)
+        if runs is not None:
+            runs -= 1
@@ -0,0 +1,73 @@
+import threading
+import time
+from bisect import bisect_left
+from sqlalchemy import exc
+from sqlalchemy.pool import NullPool
+
+# upper bounds, in seconds, of the checkout wait time histogram buckets
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+class PoolMetrics:
+    """Counts connection checkouts and how long they waited for a free connection"""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_buckets = [0] * (len(WAIT_BUCKETS) + 1)
+
+    def observe(self, seconds: float, timed_out: bool = False):
+        with self.lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_seconds_total += seconds
+            self.wait_buckets[bisect_left(WAIT_BUCKETS, seconds)] += 1
+
+    def stats(self):
+        cumulative = 0
+        buckets = {}
+        for bound, count in zip([*WAIT_BUCKETS, "+Inf"], self.wait_buckets):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        return {
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "wait_seconds_total": round(self.wait_seconds_total, 6),
+            "wait_seconds_buckets": buckets,
+        }
+
+def metered_pool(pool_class, metrics: PoolMetrics):
+    """Subclass pool_class so every checkout records its wait time in metrics.
+    The subclass survives engine.dispose(), which recreates the pool from its class."""
+    class MeteredPool(pool_class):
+        def _do_get(self):
+            start = time.perf_counter()
+            try:
+                connection = super()._do_get()
+            except exc.TimeoutError:
+                metrics.observe(time.perf_counter() - start, timed_out=True)
+                raise
+            metrics.observe(time.perf_counter() - start)
+            return connection
+
+    MeteredPool.__name__ = f"Metered{pool_class.__name__}"
+    return MeteredPool
+
+def pool_status(engine, metrics: PoolMetrics):
+    """Current occupancy of the engine's pool, with its checkout metrics"""
+    pool = engine.pool
+    status = {"pool": type(pool).__name__, **metrics.stats()}
+    if isinstance(pool, NullPool):
+        return status
+    return {
+        **status,
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": max(pool.overflow(), 0),
+    }
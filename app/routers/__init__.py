@@ -3,3 +3,4 @@ from .auth import router
 from .user import router
 from .task import router
 from .resetCode import router
+from .metrics import router
@@ -5,14 +5,17 @@ from fastapi import APIRouter, Depends, status, Header, HTTPException, Request
 from fastapi.responses import RedirectResponse
 from fastapi_sso.sso.google import GoogleSSO
 import httpx
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.error import add_error
 from app.routers.user import register_user
-from app.utils import hash_password
+from app.passwordHasher import password_hasher
 from .resetCode import add_reset_code, send_reset_code_email, get_reset_password_code, reset_password, disable_reset_code
 from .confirmationCode import get_confirmation_code, confirm_account, disable_confirmation_code
-from ..database import get_db
+from ..database import get_async_db
+from ..tokenBlacklist import token_blacklist, blacklist_entry
+from ..userCache import user_cache
 from .. import schemas, models,oauth2, enums
 from fastapi.security.oauth2 import OAuth2PasswordRequestForm
 from datetime import timedelta, datetime, timezone
@@ -32,9 +35,9 @@ google_sso = GoogleSSO(
 )
 
 @router.post('/login', response_model=schemas.Token)
-def login_user(user_credentials: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = db.query(models.User).filter(
-                models.User.email == user_credentials.username).first()
+async def login_user(user_credentials: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)):
+    user = await db.scalar(select(models.User).where(
+                models.User.email == user_credentials.username))
 
     if not user:
         return schemas.Token(
@@ -71,8 +74,8 @@ def login_user(user_credentials: OAuth2PasswordRequestForm = Depends(), db: Sess
     )
 
 @router.patch('/resetPassword', response_model=schemas.ResetPasswordOut)
-def resetPassword(request: schemas.ResetPassword, db: Session = Depends(get_db)):
-    reset_code = get_reset_password_code(request.reset_password_token, db)
+async def resetPassword(request: schemas.ResetPassword, db: AsyncSession = Depends(get_async_db)):
+    reset_code = await get_reset_password_code(request.reset_password_token, db)
     if not reset_code:
         return schemas.ResetPasswordOut(
             message="Reset link does not exist",
@@ -98,13 +101,14 @@ def resetPassword(request: schemas.ResetPassword, db: Session = Depends(get_db))
             status=status.HTTP_400_BAD_REQUEST
         )
     try:
-        new_hashed_password = hash_password(request.new_password)
-        reset_password(reset_code.email, new_hashed_password, db)
-        disable_reset_code(request.reset_password_token, db)
-        db.commit()
+        new_hashed_password = await password_hasher.hash(request.new_password)
+        await reset_password(reset_code.email, new_hashed_password, db)
+        await disable_reset_code(request.reset_password_token, db)
+        await db.commit()
+        await user_cache.invalidate_committed(db)
     except Exception as e:
-        db.rollback()
-        add_error(e, db)
+        await db.rollback()
+        add_error(e)
         return schemas.ResetPasswordOut(
             message="Something went wrong!",
             status=status.HTTP_400_BAD_REQUEST
@@ -117,8 +121,8 @@ def resetPassword(request: schemas.ResetPassword, db: Session = Depends(get_db))
 
 
 @router.patch('/confirmAccount', response_model=schemas.ConfirmAccountOut)
-def confirmAccount(request: schemas.ConfirmAccount, db: Session = Depends(get_db)):
-    confirmation_code = get_confirmation_code(request.code, db)
+async def confirmAccount(request: schemas.ConfirmAccount, db: AsyncSession = Depends(get_async_db)):
+    confirmation_code = await get_confirmation_code(request.code, db)
     if not confirmation_code:
         return schemas.ConfirmAccountOut(
             message="Confirmation code does not exist",
@@ -131,12 +135,13 @@ def confirmAccount(request: schemas.ConfirmAccount, db: Session = Depends(get_db
             status=status.HTTP_400_BAD_REQUEST
         )
     try:
-        confirm_account(confirmation_code.email, db)
-        disable_confirmation_code(request.code, db)
-        db.commit()
+        await confirm_account(confirmation_code.email, db)
+        await disable_confirmation_code(request.code, db)
+        await db.commit()
+        await user_cache.invalidate_committed(db)
     except Exception as e:
-        db.rollback()
-        add_error(e, db)
+        await db.rollback()
+        add_error(e)
         return schemas.UserOut(
             message="There is a problem, try again",
             status=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -149,14 +154,15 @@ def confirmAccount(request: schemas.ConfirmAccount, db: Session = Depends(get_db
 
 
 @router.get('/logout', response_model=schemas.Logout)
-def logout_user(db: Session = Depends(get_db), current_user=Depends(oauth2.get_current_user), token: str = Depends(oauth2.oauth2_scheme)):
+async def logout_user(db: AsyncSession = Depends(get_async_db), current_user=Depends(oauth2.get_current_user), token: str = Depends(oauth2.oauth2_scheme)):
     try:
-        blacklisted_token = models.JWTblacklist(token=token, expired_on=datetime.now(timezone.utc))
+        blacklisted_token = blacklist_entry(token)
         db.add(blacklisted_token)
-        db.commit()
+        await db.commit()
+        token_blacklist.add(blacklisted_token.jti_digest, blacklisted_token.expired_on)
     except Exception as e:
-        db.rollback()
-        add_error(e, db)
+        await db.rollback()
+        add_error(e)
         return schemas.Logout(
             message="There is a problem, try again",
             status=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -172,11 +178,11 @@ async def google_login(request: Request):
     return await google_sso.get_login_redirect()
 
 @router.get('/auth/google/callback')
-async def google_callback(request: Request, db: Session = Depends(get_db)):
+async def google_callback(request: Request, db: AsyncSession = Depends(get_async_db)):
     try:
         user = await google_sso.verify_and_process(request)
         
-        db_user = db.query(models.User).filter(models.User.email == user.email).first()
+        db_user = await db.scalar(select(models.User).where(models.User.email == user.email))
         
         if not db_user:
             registration_data = {
@@ -185,10 +191,10 @@ async def google_callback(request: Request, db: Session = Depends(get_db)):
                 "last_name": user.last_name or ""
             }
 
-            has_pending_invitation = db.query(models.Invitation).filter(
+            has_pending_invitation = await db.scalar(select(models.Invitation).where(
                 models.Invitation.athlete_email == user.email,
                 models.Invitation.status == enums.InvitationStatus.pending
-            ).first() is not None
+            )) is not None
 
             if has_pending_invitation:
                 registration_data["has_pending_invitation"]=True
@@ -199,8 +205,8 @@ async def google_callback(request: Request, db: Session = Depends(get_db)):
             entry=schemas.User(
                 **registration_data
             )
-            user = register_user(entry,True,db)
-            db.commit()
+            user = await register_user(entry,True,db)
+            await db.commit()
             data = {
                 "user": {
                     "first_name": user.first_name ,
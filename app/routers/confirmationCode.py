@@ -1,35 +1,42 @@
 from fastapi import Depends, status
-from sqlalchemy.orm import Session
-from ..database import get_db 
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..database import get_async_db
 from .. import schemas, models, enums
+from ..userCache import user_cache
 
-def get_confirmation_code(confirmation_code: str, db: Session = Depends(get_db)):
-    return db.query(models.ConfirmationCode).filter(models.ConfirmationCode.code == confirmation_code).first()
+async def get_confirmation_code(confirmation_code: str, db: AsyncSession = Depends(get_async_db)):
+    return await db.scalar(select(models.ConfirmationCode).where(models.ConfirmationCode.code == confirmation_code))
 
-def confirm_account(email: str, db: Session = Depends(get_db)):
-    user_query = db.query(models.User).filter(models.User.email == email)
-    user = user_query.first()
+async def confirm_account(email: str, db: AsyncSession = Depends(get_async_db)):
+    user = await db.scalar(select(models.User).where(models.User.email == email))
     if not user:
         return schemas.ConfirmAccountOut(
             message = "User with this email does not exist",
             status = status.HTTP_404_NOT_FOUND
         )
     fields_to_update = schemas.UserConfirm(confirmed=True)
-    user_query.update(fields_to_update.model_dump(), synchronize_session=False)
+    await db.execute(
+        update(models.User).where(models.User.email == email).values(fields_to_update.model_dump()),
+        execution_options={"synchronize_session": False}
+    )
+    user_cache.invalidate_on_commit(db, user.id)
 
-def disable_confirmation_code(confirmation_code: str, db: Session = Depends(get_db)):
-    confirmation_code_query = db.query(models.ConfirmationCode).filter(models.ConfirmationCode.code == confirmation_code)
-    code = confirmation_code_query.first()
+async def disable_confirmation_code(confirmation_code: str, db: AsyncSession = Depends(get_async_db)):
+    code = await get_confirmation_code(confirmation_code, db)
     if not code:
         return schemas.ConfirmAccountOut(
             message = "Confirmation code does not exist",
             status = status.HTTP_404_NOT_FOUND
         )
     fields_to_update = schemas.ConfirmationCodeDeactivate(status=enums.CodeStatus.Used)
-    confirmation_code_query.update(fields_to_update.model_dump(), synchronize_session = False)
+    await db.execute(
+        update(models.ConfirmationCode).where(models.ConfirmationCode.code == confirmation_code).values(fields_to_update.model_dump()),
+        execution_options={"synchronize_session": False}
+    )
 
-def add_confirmation_code(confirmation_code: schemas.ConfirmationCode, db: Session = Depends(get_db)):
+async def add_confirmation_code(confirmation_code: schemas.ConfirmationCode, db: AsyncSession = Depends(get_async_db)):
     confirmation_code = models.ConfirmationCode(**confirmation_code.model_dump())
     db.add(confirmation_code)
-    db.flush()
+    await db.flush()
     return confirmation_code
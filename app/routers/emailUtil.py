@@ -1,7 +1,10 @@
 from typing import List
-from fastapi_mail import FastMail, MessageSchema, ConnectionConfig
+from fastapi_mail import MessageSchema, ConnectionConfig
+from sqlalchemy.ext.asyncio import AsyncSession
+from .. import models
 from ..config import settings
-from jinja2 import Environment, select_autoescape, PackageLoader
+from ..mailClient import MailClient
+from ..emailTemplates import render_email
 from ..enums import EmailTemplate
 from fastapi import UploadFile
 from io import BytesIO
@@ -17,27 +20,10 @@ conf = ConnectionConfig(
     USE_CREDENTIALS = True,
     VALIDATE_CERTS  = True,
 )
-env = Environment(
-    loader=PackageLoader('app', 'templates'),
-    autoescape=select_autoescape(['html', 'xml'])
-)
-
-file_per_template = {
-    EmailTemplate.ResetPassword: 'reset_pass_mail.html',
-    EmailTemplate.ConfirmAccount: 'confirm_mail.html',
-    EmailTemplate.PayslipsMail: 'payslip_mail.html',
-}
-
-async def send_email(subject: str, recipients: List, email_template: EmailTemplate, email: str, code: str, attachments: list[dict] = [], msg: str = ""):
-    template = env.get_template(file_per_template[email_template])
-    name = email.split("@")[0] if email else "User"
+mail_client = MailClient(conf, settings.smtp_pool_size)
 
-    html = template.render(
-        name=name,
-        code=code,
-        subject=subject,
-        message=msg
-    )
+def build_email(subject: str, recipients: List, email_template: EmailTemplate, email: str, code: str, attachments: list[dict] = [], msg: str = ""):
+    html = render_email(email_template, email, code, subject, msg)
     upload_files = [
         UploadFile(
             filename=attachment["filename"],
@@ -47,7 +33,7 @@ async def send_email(subject: str, recipients: List, email_template: EmailTempla
         for attachment in attachments
     ]
 
-    message = MessageSchema(
+    return MessageSchema(
         subject=subject,
         recipients=recipients,
         body=html,
@@ -55,5 +41,16 @@ async def send_email(subject: str, recipients: List, email_template: EmailTempla
         attachments=upload_files,
     )
 
-    fm = FastMail(conf)
-    await fm.send_message(message)
+async def send_email(subject: str, recipients: List, email_template: EmailTemplate, email: str, code: str, attachments: list[dict] = [], msg: str = ""):
+    await mail_client.send_message(build_email(subject, recipients, email_template, email, code, attachments, msg))
+
+def queue_email(subject: str, recipients: List, email_template: EmailTemplate, email: str, code: str, db: AsyncSession, msg: str = ""):
+    """Add the email to the outbox, it is sent once the caller's transaction commits"""
+    db.add(models.EmailOutbox(
+        subject=subject,
+        recipients=recipients,
+        template=email_template,
+        email=email,
+        code=code,
+        message=msg,
+    ))
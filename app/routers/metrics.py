@@ -0,0 +1,36 @@
+from fastapi import APIRouter, Depends, status
+from .. import oauth2
+from ..database import engine, async_engine, replica_engine, error_engine, pool_metrics, async_pool_metrics, replica_pool_metrics, error_pool_metrics
+from ..poolMetrics import pool_status
+from ..userCache import user_cache
+from ..taskPageCache import task_page_cache
+from ..tokenBlacklist import token_blacklist
+from ..errorSink import error_sink
+
+router = APIRouter(
+    prefix="/metrics",
+    tags=["metrics"]
+)
+
+@router.get("/", response_model=dict)
+def get_metrics(current_user=Depends(oauth2.get_current_user)):
+    """Connection pool occupancy and checkout wait times, user and task page cache hit rates, revoked tokens and errors waiting to be stored"""
+    pools = {
+        "sync": pool_status(engine, pool_metrics),
+        "async": pool_status(async_engine, async_pool_metrics),
+        "errors": pool_status(error_engine, error_pool_metrics),
+    }
+    if replica_engine:
+        pools["replica"] = pool_status(replica_engine, replica_pool_metrics)
+
+    return {
+        "status": status.HTTP_200_OK,
+        "message": "Metrics retrieved successfully",
+        "data": {
+            "database": pools,
+            "user_cache": user_cache.stats(),
+            "task_page_cache": task_page_cache.stats(),
+            "token_blacklist": token_blacklist.stats(),
+            "error_sink": error_sink.stats(),
+        }
+    }
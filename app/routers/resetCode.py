@@ -1,42 +1,43 @@
 from datetime import datetime, timedelta, timezone
 from fastapi import APIRouter, Depends, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app import utils
 from app.config import Settings
 from app.error import add_error
 from app.routers.confirmationCode import confirm_account, disable_confirmation_code, get_confirmation_code
-from ..database import get_db 
+from ..database import get_async_db
 from .. import schemas, models, enums
+from ..userCache import user_cache
+from ..passwordHasher import password_hasher
 import uuid
-from ..routers.emailUtil import send_email
+from ..routers.emailUtil import queue_email
 
 router = APIRouter(
     tags=['Authentication']
 )
 
 
-async def send_reset_code_email(email: str, reset_code: str):
+def send_reset_code_email(email: str, reset_code: str, db: AsyncSession):
     subject = "Reset Password"
     recipients = [email]
-    await send_email(subject, recipients, enums.EmailTemplate.ResetPassword, email, reset_code)
+    queue_email(subject, recipients, enums.EmailTemplate.ResetPassword, email, reset_code, db)
 
-def add_reset_code(email: str, db: Session = Depends(get_db)):
+async def add_reset_code(email: str, db: AsyncSession = Depends(get_async_db)):
     reset_code = models.ResetCode(
         email = email,
         reset_code = str(uuid.uuid1()),
         status = enums.CodeStatus.Pending
     )
     db.add(reset_code)
-    db.flush()
+    await db.flush()
     return reset_code
 
-def get_reset_password_code(reset_code: str, db: Session = Depends(get_db)):
-    return db.query(models.ResetCode).filter(models.ResetCode.reset_code == reset_code).first()
+async def get_reset_password_code(reset_code: str, db: AsyncSession = Depends(get_async_db)):
+    return await db.scalar(select(models.ResetCode).where(models.ResetCode.reset_code == reset_code))
 
-def reset_password(email: str, new_hashed_password: str, db: Session = Depends(get_db)):
-    user_query = db.query(models.User).filter(models.User.email == email)
-    user = user_query.first()
+async def reset_password(email: str, new_hashed_password: str, db: AsyncSession = Depends(get_async_db)):
+    user = await db.scalar(select(models.User).where(models.User.email == email))
     if not user: 
         return schemas.ResetPasswordOut(
             message = "No user with this email",
@@ -46,30 +47,35 @@ def reset_password(email: str, new_hashed_password: str, db: Session = Depends(g
         email = user.email,
         password = new_hashed_password
     )
-    user_query.update(fields_to_update.model_dump(), synchronize_session=False)
+    await db.execute(
+        update(models.User).where(models.User.email == email).values(fields_to_update.model_dump()),
+        execution_options={"synchronize_session": False}
+    )
+    user_cache.invalidate_on_commit(db, user.id)
 
-def disable_reset_code(reset_code: str, db: Session = Depends(get_db)):
-    reset_code_query = db.query(models.ResetCode).filter(models.ResetCode.reset_code == reset_code)
+async def disable_reset_code(reset_code: str, db: AsyncSession = Depends(get_async_db)):
     fields_to_update = schemas.ResetCodeDeactivate(status=enums.CodeStatus.Used)
-    reset_code_query.update(fields_to_update.model_dump(), synchronize_session = False)
+    await db.execute(
+        update(models.ResetCode).where(models.ResetCode.reset_code == reset_code).values(fields_to_update.model_dump()),
+        execution_options={"synchronize_session": False}
+    )
 
    
 @router.post('/forgotPassword', response_model=schemas.ForgotPasswordOut)
-async def forgot_password(input: schemas.ForgotPassword, db: Session = Depends(get_db)):
-    user = db.query(models.User).filter(models.User.email == input.email).first()
+async def forgot_password(input: schemas.ForgotPassword, db: AsyncSession = Depends(get_async_db)):
+    user = await db.scalar(select(models.User).where(models.User.email == input.email))
     if not user:
         return schemas.ForgotPasswordOut(
             message="No account with this email",
             status=status.HTTP_404_NOT_FOUND
         )
     try:
-        reset_code = add_reset_code(input.email, db)
-        db.flush()
-        await send_reset_code_email(input.email, reset_code.reset_code)
-        db.commit()
+        reset_code = await add_reset_code(input.email, db)
+        send_reset_code_email(input.email, reset_code.reset_code, db)
+        await db.commit()
     except Exception as e:
-        db.rollback()
-        add_error(e,db)
+        await db.rollback()
+        add_error(e)
         return schemas.ForgotPasswordOut(
             message="Something went wrong",
             status=status.HTTP_400_BAD_REQUEST
@@ -81,8 +87,8 @@ async def forgot_password(input: schemas.ForgotPassword, db: Session = Depends(g
     )
 
 @router.patch('/resetPassword', response_model=schemas.ResetPasswordOut)
-def resetPassword(request: schemas.ResetPassword, db: Session = Depends(get_db)):
-    reset_code = get_reset_password_code(request.reset_password_token, db)
+async def resetPassword(request: schemas.ResetPassword, db: AsyncSession = Depends(get_async_db)):
+    reset_code = await get_reset_password_code(request.reset_password_token, db)
     if not reset_code:
         return schemas.ResetPasswordOut(
             message="Reset link does not exist",
@@ -108,13 +114,14 @@ def resetPassword(request: schemas.ResetPassword, db: Session = Depends(get_db))
             status_code=status.HTTP_400_BAD_REQUEST
         )
     try:
-        new_hashed_password = utils.hash_password(request.new_password)
-        reset_password(reset_code.email, new_hashed_password, db)
-        disable_reset_code(request.reset_password_token, db)
-        db.commit()
+        new_hashed_password = await password_hasher.hash(request.new_password)
+        await reset_password(reset_code.email, new_hashed_password, db)
+        await disable_reset_code(request.reset_password_token, db)
+        await db.commit()
+        await user_cache.invalidate_committed(db)
     except Exception as e:
-        db.rollback()
-        add_error(e, db)
+        await db.rollback()
+        add_error(e)
         return schemas.ResetPasswordOut(
             message="Something went wrong!",
             status_code=status.HTTP_400_BAD_REQUEST
@@ -127,8 +134,8 @@ def resetPassword(request: schemas.ResetPassword, db: Session = Depends(get_db))
 
 
 @router.patch('/confirmAccount', response_model=schemas.ConfirmAccountOut)
-def confirmAccount(request: schemas.ConfirmAccount, db: Session = Depends(get_db)):
-    code = get_confirmation_code(request.code, db)
+async def confirmAccount(request: schemas.ConfirmAccount, db: AsyncSession = Depends(get_async_db)):
+    code = await get_confirmation_code(request.code, db)
     if not code:
         return schemas.ConfirmAccountOut(
             message="Confirmation code does not exist",
@@ -148,12 +155,13 @@ def confirmAccount(request: schemas.ConfirmAccount, db: Session = Depends(get_db
                 status_code=status.HTTP_403_FORBIDDEN
             )
     try:
-        confirm_account(code.email, db)
-        disable_confirmation_code(request.code, db)
-        db.commit()
+        await confirm_account(code.email, db)
+        await disable_confirmation_code(request.code, db)
+        await db.commit()
+        await user_cache.invalidate_committed(db)
     except Exception as e:
-        db.rollback()
-        add_error(e, db)
+        await db.rollback()
+        add_error(e)
         return schemas.UserOut(
             message="There is a problem, try again",
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
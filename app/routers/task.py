@@ -1,33 +1,53 @@
-from fastapi import APIRouter, Depends, status, Query
-from sqlalchemy.orm import Session
-from typing import Optional
-from datetime import datetime
+from fastapi import APIRouter, Body, Depends, Request, Response, status, Query
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import Boolean, Float, Integer, and_, case, cast, column, delete, func, insert, or_, select, tuple_, update, values
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from datetime import datetime, timedelta
+import re
 
 from app import enums
 
-from ..database import get_db
-from .. import schemas, models, utils, oauth2
+from ..database import get_async_db, get_read_db
+from .. import database, schemas, models, utils, oauth2
 from ..error import add_error
+from ..taskPageCache import task_page_cache
+from .taskStats import update_task_stats, move_task_stats, get_task_stats_counters, bump_task_version, get_task_version, get_task_sync_state, add_tombstones
 
 router = APIRouter(
     prefix="/task",
     tags=["task"]
 )
 
+BULK_MAX_SIZE = 1000
+BULK_FIELDS = ["title", "description", "due_date", "state", "tag"]
+
+def cache_headers(etag: str):
+    # the payloads belong to the user, and clients revalidate them on every request
+    return {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+def not_modified(request: Request, etag: str):
+    """An empty 304 when the client already has this version of the payload, None otherwise"""
+    if utils.etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers(etag))
+
 @router.post("/", response_model=schemas.taskOut)
-def add(task: schemas.taskIn, db: Session = Depends(get_db), current_user=Depends(oauth2.get_current_user)):
+async def add(task: schemas.taskIn, db: AsyncSession = Depends(get_async_db), current_user=Depends(oauth2.get_current_user)):
     """Create a new task"""
     try:
         task_dict = task.model_dump() 
         task_dict["user_id"] = current_user.id
+        task_dict["change_seq"] = await bump_task_version(current_user.id, db)
         new_task = models.Task(**task_dict)  
         db.add(new_task)
-        db.commit()
-        db.refresh(new_task)
+        await db.flush()
+        await update_task_stats(current_user.id, [(new_task.state, new_task.tag, 1)], db)
+        await db.commit()
+        await db.refresh(new_task)
 
     except Exception as e:
-        db.rollback()
-        add_error(e, db)
+        await db.rollback()
+        add_error(e)
         print(e)
         return schemas.taskOut(
             status=status.HTTP_400_BAD_REQUEST,
@@ -40,20 +60,290 @@ def add(task: schemas.taskIn, db: Session = Depends(get_db), current_user=Depend
         message="Task added successfully"
     )
 
+def check_bulk_size(count: int):
+    if not 0 < count <= BULK_MAX_SIZE:
+        return schemas.tasksOut(
+            list=[],
+            status=status.HTTP_400_BAD_REQUEST,
+            message=f"Send between 1 and {BULK_MAX_SIZE} tasks"
+        )
+
+@router.post("/bulk", response_model=schemas.tasksOut)
+async def add_bulk(tasks: List[schemas.taskIn], db: AsyncSession = Depends(get_async_db), current_user=Depends(oauth2.get_current_user)):
+    """Create many tasks with a single INSERT ... RETURNING"""
+    error = check_bulk_size(len(tasks))
+    if error:
+        return error
+
+    try:
+        change_seq = await bump_task_version(current_user.id, db)
+        new_tasks = (await db.scalars(
+            insert(models.Task).returning(models.Task, sort_by_parameter_order=True),
+            [{**task.model_dump(), "user_id": current_user.id, "change_seq": change_seq} for task in tasks]
+        )).all()
+        await update_task_stats(current_user.id, [(task.state, task.tag, 1) for task in new_tasks], db)
+        results = [
+            schemas.taskOut(**task.__dict__, status=status.HTTP_201_CREATED, message="Task added successfully")
+            for task in new_tasks
+        ]
+        await db.commit()
+
+    except Exception as e:
+        await db.rollback()
+        add_error(e)
+        return schemas.tasksOut(
+            list=[],
+            status=status.HTTP_400_BAD_REQUEST,
+            message="Failed to add tasks"
+        )
+
+    return schemas.tasksOut(
+        list=results,
+        total_records=len(results),
+        status=status.HTTP_201_CREATED,
+        message="Tasks added successfully"
+    )
+
+@router.patch("/bulk", response_model=schemas.tasksOut)
+async def update_bulk(tasks: List[schemas.taskBulkUpdate], db: AsyncSession = Depends(get_async_db), current_user=Depends(oauth2.get_current_user)):
+    """Update many tasks with a single UPDATE ... FROM (VALUES ...) RETURNING.
+    Only the fields sent for an item are changed."""
+    error = check_bulk_size(len(tasks))
+    if error:
+        return error
+
+    ids = [task.id for task in tasks]
+    if len(set(ids)) != len(ids):
+        return schemas.tasksOut(
+            list=[],
+            status=status.HTTP_400_BAD_REQUEST,
+            message="Each task can only be updated once per request"
+        )
+
+    columns = models.Task.__table__.c
+    changes = values(
+        column("id", Integer),
+        *[column(field, columns[field].type) for field in BULK_FIELDS],
+        *[column(f"set_{field}", Boolean) for field in BULK_FIELDS],
+        name="changes"
+    ).data([
+        (
+            task.id,
+            *[getattr(task, field) for field in BULK_FIELDS],
+            *[field in task.model_fields_set for field in BULK_FIELDS]
+        )
+        for task in tasks
+    ])
+    # the old state and tag are read with a row lock so the counters stay exact
+    old = (
+        select(models.Task.id, models.Task.state, models.Task.tag)
+        .where(models.Task.user_id == current_user.id, models.Task.id.in_(ids))
+        .with_for_update()
+        .subquery("old")
+    )
+
+    try:
+        change_seq = await bump_task_version(current_user.id, db)
+        rows = (await db.execute(
+            update(models.Task)
+            .where(models.Task.id == changes.c.id, models.Task.id == old.c.id)
+            .values({
+                **{
+                    field: case(
+                        (changes.c[f"set_{field}"], cast(changes.c[field], columns[field].type)),
+                        else_=getattr(models.Task, field)
+                    )
+                    for field in BULK_FIELDS
+                },
+                "change_seq": change_seq,
+            })
+            .returning(models.Task, old.c.state, old.c.tag)
+            .execution_options(synchronize_session=False, populate_existing=True)
+        )).all()
+
+        stats_changes = []
+        updated = {}
+        for task, old_state, old_tag in rows:
+            stats_changes += [(old_state, old_tag, -1), (task.state, task.tag, 1)]
+            updated[task.id] = schemas.taskOut(**task.__dict__, status=status.HTTP_200_OK, message="Task updated successfully")
+        await update_task_stats(current_user.id, stats_changes, db)
+        await db.commit()
+
+    except Exception as e:
+        await db.rollback()
+        add_error(e)
+        return schemas.tasksOut(
+            list=[],
+            status=status.HTTP_400_BAD_REQUEST,
+            message="Failed to update tasks"
+        )
+
+    return schemas.tasksOut(
+        list=[
+            updated[id] if id in updated else
+            schemas.taskOut(id=id, status=status.HTTP_404_NOT_FOUND, message=f"Task with id: {id} does not exist")
+            for id in ids
+        ],
+        total_records=len(updated),
+        status=status.HTTP_200_OK,
+        message="Tasks updated successfully"
+    )
+
+@router.delete("/bulk", response_model=schemas.tasksOut)
+async def delete_bulk(ids: List[int] = Body(...), db: AsyncSession = Depends(get_async_db), current_user=Depends(oauth2.get_current_user)):
+    """Delete many tasks with a single DELETE ... RETURNING"""
+    error = check_bulk_size(len(ids))
+    if error:
+        return error
+
+    try:
+        change_seq = await bump_task_version(current_user.id, db)
+        rows = (await db.execute(
+            delete(models.Task)
+            .where(models.Task.user_id == current_user.id, models.Task.id.in_(ids))
+            .returning(models.Task.id, models.Task.state, models.Task.tag)
+        )).all()
+        await update_task_stats(current_user.id, [(row.state, row.tag, -1) for row in rows], db)
+        await add_tombstones([row.id for row in rows], current_user.id, change_seq, db)
+        await db.commit()
+
+    except Exception as e:
+        await db.rollback()
+        add_error(e)
+        return schemas.tasksOut(
+            list=[],
+            status=status.HTTP_400_BAD_REQUEST,
+            message="Failed to delete tasks"
+        )
+
+    deleted = {row.id for row in rows}
+    return schemas.tasksOut(
+        list=[
+            schemas.taskOut(id=id, status=status.HTTP_200_OK, message="Task deleted successfully")
+            if id in deleted else
+            schemas.taskOut(id=id, status=status.HTTP_404_NOT_FOUND, message=f"Task with id: {id} does not exist")
+            for id in ids
+        ],
+        total_records=len(deleted),
+        status=status.HTTP_200_OK,
+        message="Tasks deleted successfully"
+    )
+
+# the columns of schemas.taskOut, so list pages are built from plain rows
+list_columns = [
+    models.Task.id,
+    models.Task.title,
+    models.Task.description,
+    models.Task.due_date,
+    models.Task.tag,
+    models.Task.state,
+    models.Task.user_id,
+    models.Task.created_on,
+    models.Task.updated_on,
+]
+list_fields = [column.key for column in list_columns]
+
+def task_list_item(row):
+    """schemas.taskOut of a list_columns row as plain data, extra columns such as the relevance are left out"""
+    return {"message": None, "status": None, **dict(zip(list_fields, row))}
+
+sort_columns = {
+    "created_on": models.Task.created_on,
+    "due_date": models.Task.due_date,
+    "title": models.Task.title,
+    "state": models.Task.state,
+}
+
+def decode_task_cursor(cursor: str, sort_by: str, sort_order: str):
+    """Return the (value, id) position encoded in a cursor, or None if it does not match the requested sort"""
+    position = utils.decode_cursor(cursor)
+    if not position or position.get("sort_by") != sort_by or position.get("sort_order") != sort_order:
+        return None
+
+    try:
+        last_id = int(position["id"])
+        value = position.get("value")
+        if value is not None:
+            if sort_by in ("created_on", "due_date"):
+                value = datetime.fromisoformat(value)
+            elif sort_by == "state":
+                value = enums.State(value)
+            elif sort_by == "relevance":
+                value = float(value)
+            else:
+                value = str(value)
+    except (KeyError, TypeError, ValueError):
+        return None
+
+    return value, last_id
+
+def get_search_query(search: str, search_mode: str):
+    """Build the tsquery matched against Task.search_vector for a prefix or fulltext search"""
+    if search_mode == "fulltext":
+        return func.websearch_to_tsquery("english", search)
+
+    words = re.findall(r"\w+", search)
+    if not words:
+        return func.to_tsquery("english", "")
+    return func.to_tsquery("english", " & ".join(words[:-1] + [f"{words[-1]}:*"]))
+
+def seek_after(query, order_column, sort_order: str, value, last_id: int):
+    """Keep only the rows that come after (value, last_id) in the page order.
+    Postgres puts NULLs last in ascending order and first in descending order."""
+    position = tuple_(order_column, models.Task.id)
+    if sort_order == "asc":
+        if value is None:
+            return query.filter(order_column.is_(None), models.Task.id > last_id)
+        return query.filter(or_(position > tuple_(value, last_id), order_column.is_(None)))
+
+    if value is None:
+        return query.filter(or_(
+            and_(order_column.is_(None), models.Task.id < last_id),
+            order_column.isnot(None)
+        ))
+    return query.filter(position < tuple_(value, last_id))
+
 @router.get("/", response_model=schemas.tasksOut)
-def get_all(
+async def get_all(
+    request: Request,
     page_size: int = Query(10, ge=1, le=100),
     page_number: int = Query(1, ge=1),
     state: Optional[str] = None,
     tag: Optional[str] = None,
     search: Optional[str] = None,
-    sort_by: Optional[str] = Query("created_on", pattern="^(created_on|due_date|title|state)$"),
+    sort_by: Optional[str] = Query("created_on", pattern="^(created_on|due_date|title|state|relevance)$"),
     sort_order: Optional[str] = Query("desc", pattern="^(asc|desc)$"),
-    db: Session = Depends(get_db),
+    search_mode: Optional[str] = Query("substring", pattern="^(prefix|substring|fulltext)$"),
+    cursor: Optional[str] = None,
+    include_total: bool = True,
+    db: AsyncSession = Depends(get_read_db),
     current_user=Depends(oauth2.get_current_user)
 ):
     try:
-        query = db.query(models.Task).filter(models.Task.user_id == current_user.id)
+        # read before the tasks, a write in between makes the ETag and the cached page older than the page, never newer
+        version = await get_task_version(current_user.id, db)
+        etag = utils.weak_etag(current_user.id, version)
+        unchanged = not_modified(request, etag)
+        if unchanged:
+            return unchanged
+
+        cache_key = task_page_cache.key(current_user.id, version, {
+            "page_size": page_size,
+            "page_number": page_number,
+            "state": state,
+            "tag": tag,
+            "search": search,
+            "sort_by": sort_by,
+            "sort_order": sort_order,
+            "search_mode": search_mode,
+            "cursor": cursor,
+            "include_total": include_total,
+        })
+        cached = await task_page_cache.get(cache_key)
+        if cached is not None:
+            return Response(cached, media_type="application/json", headers=cache_headers(etag))
+
+        query = select(*list_columns).where(models.Task.user_id == current_user.id)
 
         if state:
             try:
@@ -84,42 +374,72 @@ def get_all(
                     message=f"Invalid tag: {tag}"
                 )
 
-        if search:
+        rank = None
+        if search and search_mode == "substring":
             search_term = f"%{search}%"
             query = query.filter(
                 (models.Task.title.ilike(search_term)) | 
                 (models.Task.description.ilike(search_term))
             )
+        elif search:
+            search_query = get_search_query(search, search_mode)
+            query = query.filter(models.Task.search_vector.op("@@")(search_query))
+            rank = cast(func.ts_rank(models.Task.search_vector, search_query), Float)
+
+        if sort_by == "relevance" and rank is None:
+            return schemas.tasksOut(
+                list=[],
+                page_size=page_size,
+                status=status.HTTP_400_BAD_REQUEST,
+                message="Sorting by relevance requires a prefix or fulltext search"
+            )
+
+        total_records = None
+        total_pages = None
+        if include_total:
+            total_records = await db.scalar(select(func.count()).select_from(query.subquery()))
+            total_pages = utils.div_ceil(total_records, page_size)
 
-        if sort_by == "created_on":
-            order_column = models.Task.created_on
-        elif sort_by == "due_date":
-            order_column = models.Task.due_date
-        elif sort_by == "title":
-            order_column = models.Task.title
-        elif sort_by == "state":
-            order_column = models.Task.state
+        if sort_by == "relevance":
+            order_column = rank
+            query = query.add_columns(rank.label("relevance"))
         else:
-            order_column = models.Task.created_on
+            order_column = sort_columns.get(sort_by, models.Task.created_on)
+
+        if cursor:
+            position = decode_task_cursor(cursor, sort_by, sort_order)
+            if not position:
+                return schemas.tasksOut(
+                    list=[],
+                    page_size=page_size,
+                    status=status.HTTP_400_BAD_REQUEST,
+                    message="Invalid cursor"
+                )
+            query = seek_after(query, order_column, sort_order, *position)
 
         if sort_order == "asc":
-            query = query.order_by(order_column.asc())
+            query = query.order_by(order_column.asc(), models.Task.id.asc())
         else:
-            query = query.order_by(order_column.desc())
+            query = query.order_by(order_column.desc(), models.Task.id.desc())
 
+        if not cursor:
+            query = query.offset((page_number - 1) * page_size)
 
-        total_records = query.count()
-        total_pages = utils.div_ceil(total_records, page_size)
+        rows = (await db.execute(query.limit(page_size + 1))).all()
 
-        tasks = (
-            query
-            .limit(page_size)
-            .offset((page_number - 1) * page_size)
-            .all()
-        )
+        next_cursor = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            last_row = rows[-1]
+            next_cursor = utils.encode_cursor({
+                "sort_by": sort_by,
+                "sort_order": sort_order,
+                "value": getattr(last_row, sort_by),
+                "id": last_row.id,
+            })
 
     except Exception as e:
-        add_error(e, db)
+        add_error(e)
         return schemas.tasksOut(
             list=[],
             total_pages=0,
@@ -130,23 +450,137 @@ def get_all(
             message="Failed to retrieve tasks"
         )
 
-    return schemas.tasksOut(
-        total_pages=total_pages,
-        total_records=total_records,
-        page_number=page_number,
-        page_size=page_size,
-        list=[schemas.taskOut.from_orm(task) for task in tasks],
-        status=status.HTTP_200_OK,
-        message="Tasks retrieved successfully"
+    # schemas.tasksOut as plain data: the rows come from list_columns, so the page skips the response_model
+    # validation and orjson dumps their datetimes and enums as is
+    response = ORJSONResponse({
+        "message": "Tasks retrieved successfully",
+        "status": status.HTTP_200_OK,
+        "page_number": None if cursor else page_number,
+        "page_size": page_size,
+        "total_pages": total_pages,
+        "total_records": total_records,
+        "list": [task_list_item(row) for row in rows],
+        "next_cursor": next_cursor,
+    }, headers=cache_headers(etag))
+    await task_page_cache.set(cache_key, response.body)
+    return response
+
+def decode_changes_cursor(cursor: str):
+    """Return the (change_seq, id, full, version) position encoded in a GET /task/changes cursor, or None"""
+    position = utils.decode_cursor(cursor)
+    try:
+        return int(position["seq"]), int(position["id"]), bool(position["full"]), int(position["version"])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+def after_change(seq_column, id_column, seq: int, last_id: Optional[int]):
+    if last_id is None:
+        return seq_column > seq
+    return tuple_(seq_column, id_column) > tuple_(seq, last_id)
+
+async def read_changes(user_id: int, since: Optional[int], last_id: Optional[int], full: bool, version: Optional[int], page_size: int, db: AsyncSession, sync_state=None):
+    """The version paged up to and up to page_size + 1 tasks and tombstones after the position, as (change_seq, id, row or None for a delete).
+    None when tombstones after since were purged, the client has to sync again without since."""
+    current_version, purged_seq = sync_state or await get_task_sync_state(user_id, db)
+    if not full and since < purged_seq:
+        return None
+    if version is None:
+        version = current_version
+
+    tasks = select(*list_columns, models.Task.change_seq).where(
+        models.Task.user_id == user_id,
+        models.Task.change_seq <= version,
     )
+    if since is not None:
+        tasks = tasks.where(after_change(models.Task.change_seq, models.Task.id, since, last_id))
+    tasks = tasks.order_by(models.Task.change_seq, models.Task.id).limit(page_size + 1)
+    changes = [(row.change_seq, row.id, row) for row in (await db.execute(tasks)).all()]
+
+    if not full:
+        tombstones = select(models.TaskTombstone.task_id, models.TaskTombstone.change_seq).where(
+            models.TaskTombstone.user_id == user_id,
+            models.TaskTombstone.change_seq <= version,
+            after_change(models.TaskTombstone.change_seq, models.TaskTombstone.task_id, since, last_id),
+        ).order_by(models.TaskTombstone.change_seq, models.TaskTombstone.task_id).limit(page_size + 1)
+        changes += [(row.change_seq, row.task_id, None) for row in (await db.execute(tombstones)).all()]
+    return version, changes
+
+@router.get("/changes", response_model=schemas.taskChangesOut)
+async def get_changes(
+    since: Optional[int] = Query(None, ge=0),
+    cursor: Optional[str] = None,
+    page_size: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_read_db),
+    current_user=Depends(oauth2.get_current_user)
+):
+    """The tasks created, updated or deleted after the since of the previous sync, by change_seq.
+    Without since every task is returned, without tombstones. Follow next_cursor until it is null,
+    the last page's since is the one to send next time.
+    Every page only returns the changes up to the version read for the first page, and that version is the
+    since returned on the last page. The user's changes commit in change_seq order, so all of them are visible,
+    and whatever changes while the client pages, deletes included, comes back in the next sync.
+    A replica behind the version or since the client already has is skipped for the primary.
+    A since older than the tombstones still kept gets a 410, the client has to sync again without since."""
+    full = since is None
+    last_id = None
+    version = None
+    if cursor:
+        position = decode_changes_cursor(cursor)
+        if not position:
+            return schemas.taskChangesOut(
+                status=status.HTTP_400_BAD_REQUEST,
+                message="Invalid cursor"
+            )
+        since, last_id, full, version = position
+
+    try:
+        sync_state = await get_task_sync_state(current_user.id, db)
+        if sync_state[0] < (version if version is not None else since or 0):
+            async with database.AsyncSessionLocal() as primary:
+                page = await read_changes(current_user.id, since, last_id, full, version, page_size, primary)
+        else:
+            page = await read_changes(current_user.id, since, last_id, full, version, page_size, db, sync_state)
+    except Exception as e:
+        add_error(e)
+        return schemas.taskChangesOut(
+            status=status.HTTP_400_BAD_REQUEST,
+            message="Failed to retrieve changes"
+        )
+    if page is None:
+        return schemas.taskChangesOut(
+            status=status.HTTP_410_GONE,
+            message="Changes since this version are no longer kept, sync again without since"
+        )
+
+    version, changes = page
+    changes.sort(key=lambda change: change[:2])
+    next_cursor = None
+    if len(changes) > page_size:
+        changes = changes[:page_size]
+        last_seq, last_task_id, _ = changes[-1]
+        next_cursor = utils.encode_cursor({"seq": last_seq, "id": last_task_id, "full": full, "version": version})
+
+    # schemas.taskChangesOut as plain data, like the task list pages
+    return ORJSONResponse({
+        "message": "Changes retrieved successfully",
+        "status": status.HTTP_200_OK,
+        "tasks": [task_list_item(row) for _, _, row in changes if row is not None],
+        "deleted": [task_id for _, task_id, row in changes if row is None],
+        "since": None if next_cursor else version,
+        "next_cursor": next_cursor,
+    })
 
 @router.get("/{id}", response_model=schemas.taskOut)
-def get_task(id: int, db: Session = Depends(get_db), current_user=Depends(oauth2.get_current_user)):
+async def get_task(id: int, request: Request, response: Response, db: AsyncSession = Depends(get_read_db), current_user=Depends(oauth2.get_current_user)):
     """Get a single task by ID"""
-    task = (
-        db.query(models.Task)
-        .filter(models.Task.id == id, models.Task.user_id == current_user.id)
-        .first()
+    etag = utils.weak_etag(current_user.id, await get_task_version(current_user.id, db))
+    unchanged = not_modified(request, etag)
+    if unchanged:
+        return unchanged
+
+    task = await db.scalar(
+        select(models.Task)
+        .where(models.Task.id == id, models.Task.user_id == current_user.id)
     )
 
     if not task:
@@ -155,34 +589,56 @@ def get_task(id: int, db: Session = Depends(get_db), current_user=Depends(oauth2
             message=f"Task with id: {id} does not exist"
         )
 
+    response.headers.update(cache_headers(etag))
     return schemas.taskOut(
         **task.__dict__,
         status=status.HTTP_200_OK,
         message="Task retrieved successfully"
     )
 
-@router.delete("/{id}", response_model=schemas.taskOut)
-def delete_task(id: int, db: Session = Depends(get_db), current_user=Depends(oauth2.get_current_user)):
-    """Delete a task"""
-    task = (
-        db.query(models.Task)
-        .filter(models.Task.id == id, models.Task.user_id == current_user.id)
-        .first()
+async def update_task_returning(id: int, user_id: int, fields: dict, db: AsyncSession = Depends(get_async_db)):
+    """Update one of the user's tasks with a single UPDATE ... RETURNING.
+    Returns (task, old_state, old_tag), or None when the task does not exist."""
+    fields = {**fields, "change_seq": await bump_task_version(user_id, db)}
+    old = (
+        select(models.Task.id, models.Task.state, models.Task.tag)
+        .where(models.Task.id == id, models.Task.user_id == user_id)
+        .with_for_update()
+        .subquery("old")
     )
+    result = await db.execute(
+        update(models.Task)
+        .where(models.Task.id == old.c.id)
+        .values(fields)
+        .returning(models.Task, old.c.state, old.c.tag)
+        .execution_options(synchronize_session=False, populate_existing=True)
+    )
+    return result.first()
 
-    if not task:
-        return schemas.taskOut(
-            status=status.HTTP_404_NOT_FOUND,
-            message=f"Task with id: {id} does not exist"
-        )
-
+@router.delete("/{id}", response_model=schemas.taskOut)
+async def delete_task(id: int, db: AsyncSession = Depends(get_async_db), current_user=Depends(oauth2.get_current_user)):
+    """Delete a task"""
     try:
-        db.delete(task)
-        db.commit()
+        change_seq = await bump_task_version(current_user.id, db)
+        task = (await db.execute(
+            delete(models.Task)
+            .where(models.Task.id == id, models.Task.user_id == current_user.id)
+            .returning(models.Task.state, models.Task.tag)
+        )).first()
+
+        if not task:
+            return schemas.taskOut(
+                status=status.HTTP_404_NOT_FOUND,
+                message=f"Task with id: {id} does not exist"
+            )
+
+        await update_task_stats(current_user.id, [(task.state, task.tag, -1)], db)
+        await add_tombstones([id], current_user.id, change_seq, db)
+        await db.commit()
 
     except Exception as e:
-        db.rollback()
-        add_error(e, db)
+        await db.rollback()
+        add_error(e)
         return schemas.taskOut(
             status=status.HTTP_400_BAD_REQUEST,
             message="Failed to delete task"
@@ -194,148 +650,169 @@ def delete_task(id: int, db: Session = Depends(get_db), current_user=Depends(oau
     )
 
 @router.put('/mark_as_done/{id}', response_model=schemas.taskOut)
-def mark_task_as_done(id: int, db: Session = Depends(get_db), current_user=Depends(oauth2.get_current_user)):
+async def mark_task_as_done(id: int, db: AsyncSession = Depends(get_async_db), current_user=Depends(oauth2.get_current_user)):
     """Mark a task as done"""
-    task_query = db.query(models.Task).filter(models.Task.id == id, models.Task.user_id == current_user.id)
-    db_task = task_query.first()
+    try:
+        row = await update_task_returning(id, current_user.id, {"state": enums.State.done}, db)
 
-    if not db_task:
-        return schemas.taskOut(
-            status=status.HTTP_404_NOT_FOUND,
-            message=f"Task with id: {id} does not exist"
-        )
+        if not row:
+            return schemas.taskOut(
+                status=status.HTTP_404_NOT_FOUND,
+                message=f"Task with id: {id} does not exist"
+            )
 
-    try:
-        task_query.update({"state": enums.State.done})
-        db.commit()
-        db.refresh(db_task)
+        db_task, old_state, old_tag = row
+        await move_task_stats(current_user.id, old_state, old_tag, db_task.state, db_task.tag, db)
+        result = schemas.taskOut(
+            **db_task.__dict__,
+            status=status.HTTP_200_OK,
+            message="Task marked as done successfully"
+        )
+        await db.commit()
 
     except Exception as e:
-        db.rollback()
-        add_error(e, db)
+        await db.rollback()
+        add_error(e)
         return schemas.taskOut(
             status=status.HTTP_400_BAD_REQUEST,
             message="Failed to mark task as done"
         )
 
-    return schemas.taskOut(
-        **db_task.__dict__,
-        status=status.HTTP_200_OK,
-        message="Task marked as done successfully"
-    )
+    return result
 
 @router.put('/toggle_state/{id}', response_model=schemas.taskOut)
-def toggle_task_state(id: int, db: Session = Depends(get_db), current_user=Depends(oauth2.get_current_user)):
+async def toggle_task_state(id: int, db: AsyncSession = Depends(get_async_db), current_user=Depends(oauth2.get_current_user)):
     """Toggle task state: todo -> doing -> done -> todo"""
-    task_query = db.query(models.Task).filter(models.Task.id == id, models.Task.user_id == current_user.id)
-    db_task = task_query.first()
-
-    if not db_task:
-        return schemas.taskOut(
-            status=status.HTTP_404_NOT_FOUND,
-            message=f"Task with id: {id} does not exist"
-        )
-
+    next_state = cast(case(
+        (models.Task.state == enums.State.todo, enums.State.doing.value),
+        (models.Task.state == enums.State.doing, enums.State.done.value),
+        else_=enums.State.todo.value
+    ), models.Task.state.type)
     try:
-        if db_task.state == enums.State.todo:
-            new_state = enums.State.doing
-        elif db_task.state == enums.State.doing:
-            new_state = enums.State.done
-        else:
-            new_state = enums.State.todo
+        row = await update_task_returning(id, current_user.id, {"state": next_state}, db)
 
-        task_query.update({"state": new_state})
-        db.commit()
-        db.refresh(db_task)
+        if not row:
+            return schemas.taskOut(
+                status=status.HTTP_404_NOT_FOUND,
+                message=f"Task with id: {id} does not exist"
+            )
+
+        db_task, old_state, old_tag = row
+        await move_task_stats(current_user.id, old_state, old_tag, db_task.state, db_task.tag, db)
+        result = schemas.taskOut(
+            **db_task.__dict__,
+            status=status.HTTP_200_OK,
+            message=f"Task state changed to {db_task.state.value}"
+        )
+        await db.commit()
 
     except Exception as e:
-        db.rollback()
-        add_error(e, db)
+        await db.rollback()
+        add_error(e)
         return schemas.taskOut(
             status=status.HTTP_400_BAD_REQUEST,
             message="Failed to toggle task state"
         )
 
-    return schemas.taskOut(
-        **db_task.__dict__,
-        status=status.HTTP_200_OK,
-        message=f"Task state changed to {new_state.value}"
-    )
+    return result
                    
 @router.put("/{id}", response_model=schemas.taskOut)
-def update_task(id: int, task: schemas.taskIn, db: Session = Depends(get_db), current_user=Depends(oauth2.get_current_user)):
+async def update_task(id: int, task: schemas.taskIn, db: AsyncSession = Depends(get_async_db), current_user=Depends(oauth2.get_current_user)):
     """Update a task"""
-    query = db.query(models.Task).filter(models.Task.id == id, models.Task.user_id == current_user.id)
-    db_task = query.first()
+    try:
+        row = await update_task_returning(id, current_user.id, task.model_dump(exclude_unset=True), db)
 
-    if not db_task:
-        return schemas.taskOut(
-            status=status.HTTP_404_NOT_FOUND,
-            message=f"Task with id: {id} does not exist"
-        )
+        if not row:
+            return schemas.taskOut(
+                status=status.HTTP_404_NOT_FOUND,
+                message=f"Task with id: {id} does not exist"
+            )
 
-    try:
-        query.update(task.model_dump(exclude_unset=True))
-        db.commit()
-        db.refresh(db_task)
+        db_task, old_state, old_tag = row
+        await move_task_stats(current_user.id, old_state, old_tag, db_task.state, db_task.tag, db)
+        result = schemas.taskOut(
+            **db_task.__dict__,
+            status=status.HTTP_200_OK,
+            message="Task updated successfully"
+        )
+        await db.commit()
 
     except Exception as e:
-        db.rollback()
-        add_error(e, db)
+        await db.rollback()
+        add_error(e)
         return schemas.taskOut(
             status=status.HTTP_400_BAD_REQUEST,
             message="Failed to update task"
         )
 
-    return schemas.taskOut(
-        **db_task.__dict__,
-        status=status.HTTP_200_OK,
-        message="Task updated successfully"
-    )
+    return result
 
 @router.get("/stats/summary", response_model=dict)
-def get_task_stats(db: Session = Depends(get_db), current_user=Depends(oauth2.get_current_user)):
-    """Get task statistics for the current user"""
+async def get_task_stats(request: Request, response: Response, db: AsyncSession = Depends(get_read_db), current_user=Depends(oauth2.get_current_user)):
+    """Get task statistics for the current user.
+    Tasks are counted as overdue by the minute, so the ETag holds the minute along with the version."""
     try:
-        total_tasks = db.query(models.Task).filter(models.Task.user_id == current_user.id).count()
-        
-        todo_count = db.query(models.Task).filter(
-            models.Task.user_id == current_user.id,
-            models.Task.state == enums.State.todo
-        ).count()
-        
-        doing_count = db.query(models.Task).filter(
-            models.Task.user_id == current_user.id,
-            models.Task.state == enums.State.doing
-        ).count()
-        
-        done_count = db.query(models.Task).filter(
-            models.Task.user_id == current_user.id,
-            models.Task.state == enums.State.done
-        ).count()
-        
-        overdue_count = db.query(models.Task).filter(
-            models.Task.user_id == current_user.id,
-            models.Task.due_date < datetime.now(),
-            models.Task.state != enums.State.done
-        ).count()
-
+        now = datetime.now().replace(second=0, microsecond=0)
+        etag = utils.weak_etag(current_user.id, await get_task_version(current_user.id, db), f"{now:%Y%m%d%H%M}")
+        unchanged = not_modified(request, etag)
+        if unchanged:
+            return unchanged
+
+        week_start = datetime.combine(now.date() - timedelta(days=now.weekday()), datetime.min.time())
+        week_end = week_start + timedelta(days=7)
+        not_done = models.Task.state != enums.State.done
+
+        counters = await get_task_stats_counters(current_user.id, db)
+        due_counts = (await db.execute(
+            select(
+                models.Task.tag,
+                func.count(models.Task.id).filter(models.Task.due_date < now),
+                func.count(models.Task.id).filter(models.Task.due_date >= week_start),
+            ).where(
+                models.Task.user_id == current_user.id,
+                models.Task.due_date < week_end,
+                not_done
+            ).group_by(models.Task.tag)
+        )).all()
+
+        states = {state.value: 0 for state in enums.State}
+        tags = {
+            tag.value: {"total": 0, **{state.value: 0 for state in enums.State}, "overdue": 0}
+            for tag in enums.Tag
+        }
+        total_tasks = overdue_count = due_this_week_count = 0
+        for state, tag, count in counters:
+            total_tasks += count
+            states[state.value] += count
+            if tag:
+                tags[tag]["total"] += count
+                tags[tag][state.value] += count
+
+        for tag, overdue, due_this_week in due_counts:
+            overdue_count += overdue
+            due_this_week_count += due_this_week
+            if tag:
+                tags[tag.value]["overdue"] += overdue
+
+        done_count = states[enums.State.done.value]
+
+        response.headers.update(cache_headers(etag))
         return {
             "status": status.HTTP_200_OK,
             "message": "Statistics retrieved successfully",
             "data": {
                 "total": total_tasks,
-                "todo": todo_count,
-                "doing": doing_count,
-                "done": done_count,
+                **states,
                 "overdue": overdue_count,
-                "completion_rate": round((done_count / total_tasks * 100) if total_tasks > 0 else 0, 2)
+                "due_this_week": due_this_week_count,
+                "completion_rate": round((done_count / total_tasks * 100) if total_tasks > 0 else 0, 2),
+                "tags": tags
             }
         }
 
     except Exception as e:
-        add_error(e, db)
+        add_error(e)
         return {
             "status": status.HTTP_400_BAD_REQUEST,
             "message": "Failed to retrieve statistics"
-        }
\ No newline at end of file
+        }
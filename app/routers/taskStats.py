@@ -0,0 +1,87 @@
+from typing import Optional
+from fastapi import Depends
+from sqlalchemy import String, cast, func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from ..database import get_db, get_async_db
+from .. import models, enums
+
+async def update_task_stats(user_id: int, changes: list, db: AsyncSession = Depends(get_async_db)):
+    """Apply (state, tag, delta) changes to the user's counters in a single upsert"""
+    deltas = {}
+    for state, tag, delta in changes:
+        key = (enums.State(state), enums.Tag(tag).value if tag else "")
+        deltas[key] = deltas.get(key, 0) + delta
+
+    values = [
+        {"user_id": user_id, "state": state, "tag": tag, "count": delta}
+        for (state, tag), delta in deltas.items() if delta
+    ]
+    if not values:
+        return
+
+    statement = insert(models.TaskStats).values(values)
+    await db.execute(statement.on_conflict_do_update(
+        index_elements=["user_id", "state", "tag"],
+        set_={"count": models.TaskStats.count + statement.excluded["count"]}
+    ))
+
+async def move_task_stats(user_id: int, old_state, old_tag, new_state, new_tag, db: AsyncSession = Depends(get_async_db)):
+    await update_task_stats(user_id, [(old_state, old_tag, -1), (new_state, new_tag, 1)], db)
+
+async def bump_task_version(user_id: int, db: AsyncSession = Depends(get_async_db)) -> int:
+    """Count a change to the user's tasks in the same transaction, the clients' ETags stop matching.
+    Returns the new version, the change_seq of the rows the change writes. The version row stays locked
+    until the transaction ends, so the user's changes commit in change_seq order."""
+    statement = insert(models.TaskVersion).values(user_id=user_id, version=1)
+    return await db.scalar(statement.on_conflict_do_update(
+        index_elements=["user_id"],
+        set_={"version": models.TaskVersion.version + 1}
+    ).returning(models.TaskVersion.version))
+
+async def add_tombstones(task_ids: list, user_id: int, change_seq: int, db: AsyncSession = Depends(get_async_db)):
+    """Remember the deleted tasks, GET /task/changes returns them to the clients still holding them"""
+    if not task_ids:
+        return
+    await db.execute(insert(models.TaskTombstone).values([
+        {"task_id": task_id, "user_id": user_id, "change_seq": change_seq}
+        for task_id in task_ids
+    ]))
+
+async def get_task_version(user_id: int, db: AsyncSession = Depends(get_async_db)) -> int:
+    version = await db.scalar(select(models.TaskVersion.version).where(models.TaskVersion.user_id == user_id))
+    return version or 0
+
+async def get_task_sync_state(user_id: int, db: AsyncSession = Depends(get_async_db)):
+    """The user's (version, tombstones_purged_seq), (0, 0) before the first change"""
+    row = (await db.execute(
+        select(models.TaskVersion.version, models.TaskVersion.tombstones_purged_seq).where(models.TaskVersion.user_id == user_id)
+    )).first()
+    return (row.version, row.tombstones_purged_seq) if row else (0, 0)
+
+async def get_task_stats_counters(user_id: int, db: AsyncSession = Depends(get_async_db)):
+    result = await db.execute(
+        select(models.TaskStats.state, models.TaskStats.tag, models.TaskStats.count)
+        .where(models.TaskStats.user_id == user_id)
+    )
+    return result.all()
+
+def rebuild_task_stats(user_id: Optional[int], db: Session = Depends(get_db)):
+    """Recompute the counters from the tasks table, for one user or for everyone.
+    This is a maintenance job, so it runs on the sync engine"""
+    counters = db.query(models.TaskStats)
+    tasks = select(
+        models.Task.user_id,
+        models.Task.state,
+        func.coalesce(cast(models.Task.tag, String), ""),
+        func.count(models.Task.id)
+    ).group_by(models.Task.user_id, models.Task.state, models.Task.tag)
+
+    if user_id is not None:
+        counters = counters.filter(models.TaskStats.user_id == user_id)
+        tasks = tasks.where(models.Task.user_id == user_id)
+
+    db.flush()
+    counters.delete(synchronize_session=False)
+    db.execute(insert(models.TaskStats).from_select(["user_id", "state", "tag", "count"], tasks))
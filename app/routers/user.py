@@ -1,14 +1,18 @@
 from operator import and_
+from anyio import from_thread
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app import utils
 
 from .confirmationCode import add_confirmation_code
-from ..database import get_db
+from ..database import get_db, get_async_db, get_read_db
 from .. import schemas, models, enums, oauth2
-from sqlalchemy import func
-from .emailUtil import send_email
+from ..userCache import user_cache
+from ..passwordHasher import password_hasher
+from sqlalchemy import func, select
+from .emailUtil import queue_email
 from typing import Optional
 from datetime import datetime, timedelta, timezone
 import uuid
@@ -23,7 +27,7 @@ error_keys = {
 }
 
 
-async def sendConfirmationMail(email: str, user_id: int, db: any):
+async def sendConfirmationMail(email: str, user_id: int, db: AsyncSession):
     confirmation_code = schemas.Code(
         email=email,
         code=str(uuid.uuid1()),
@@ -31,37 +35,38 @@ async def sendConfirmationMail(email: str, user_id: int, db: any):
         user_id=user_id
     )
 
-    add_confirmation_code(confirmation_code, db)
+    await add_confirmation_code(confirmation_code, db)
 
     subject = "Account Confirmation"
     recipients = [email]
 
-    await send_email(
+    queue_email(
         subject=subject,
         recipients=recipients,
         email_template=enums.EmailTemplate.ConfirmAccount,
         email=email,
-        code=confirmation_code.code
+        code=confirmation_code.code,
+        db=db
     )
     
 
-def register_user(entry: schemas.User,confirm_account:bool, db:Session=Depends(get_db)):
+async def register_user(entry: schemas.User,confirm_account:bool, db:AsyncSession=Depends(get_async_db)):
     if not entry.password:
         entry.password=str(uuid.uuid1()) 
 
-    entry.password = utils.hash_password(entry.password)
+    entry.password = await password_hasher.hash(entry.password)
     user = entry.model_dump()
     user.pop('confirm_password')
 
     user = models.User(**user)
     user.confirmed=confirm_account
     db.add(user)
-    db.flush()
+    await db.flush()
     return user
 
 @router.post('/', response_model=schemas.UserOut, status_code=status.HTTP_201_CREATED)
-async def create_user(entry: schemas.User, db: Session = Depends(get_db)):
-    user_in_db = db.query(models.User).filter(models.User.email == entry.email).first()
+async def create_user(entry: schemas.User, db: AsyncSession = Depends(get_async_db)):
+    user_in_db = await db.scalar(select(models.User).where(models.User.email == entry.email))
     if user_in_db:
         return schemas.UserOut(
             status=status.HTTP_400_BAD_REQUEST,
@@ -75,17 +80,17 @@ async def create_user(entry: schemas.User, db: Session = Depends(get_db)):
         )
 
     try:
-        registeration_result=register_user(entry,False,db)
+        registeration_result=await register_user(entry,False,db)
         if isinstance( registeration_result, schemas.ErrorOut):
             return registeration_result
         
         user = registeration_result
         
         await sendConfirmationMail(user.email, user.id, db) 
-        db.commit()
+        await db.commit()
     except Exception as e:
         print(e)
-        db.rollback()
+        await db.rollback()
         return schemas.UserOut(
             status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             message='error',
@@ -97,10 +102,10 @@ async def create_user(entry: schemas.User, db: Session = Depends(get_db)):
     )
 
 @router.post('/registerWithGoogle', response_model=schemas.UserOut, status_code=status.HTTP_201_CREATED)
-async def create_user_with_google(entry: schemas.User, db: Session = Depends(get_db)):
+async def create_user_with_google(entry: schemas.User, db: AsyncSession = Depends(get_async_db)):
     try:
-        user=register_user(entry,True,db)
-        db.commit()
+        user=await register_user(entry,True,db)
+        await db.commit()
         data = {
             "user": {
                 "first_name": user.first_name ,
@@ -112,7 +117,7 @@ async def create_user_with_google(entry: schemas.User, db: Session = Depends(get
         new_token = oauth2.create_access_token(data=data)
     except Exception as e:
         print(e)
-        db.rollback()
+        await db.rollback()
        
         return schemas.UserOut(
             status=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -149,15 +154,15 @@ def get_current_user(db: Session = Depends(get_db), current_user=Depends(oauth2.
     return get_user_data(current_user.id, db)
 
 @router.get('/', response_model=schemas.UsersOut)
-def get_users(db: Session = Depends(get_db), current_user=Depends(oauth2.get_current_user), page_size: int = 10, page_number: int = 1, name_substr: Optional[str] = None):
-    query = db.query(models.User)
+async def get_users(db: AsyncSession = Depends(get_read_db), current_user=Depends(oauth2.get_current_user), page_size: int = 10, page_number: int = 1, name_substr: Optional[str] = None):
+    query = select(models.User)
     if name_substr:
-        query = query.filter(
+        query = query.where(
             func.CONCAT(models.User.first_name, " ", models.User.last_name).contains(name_substr))
 
-    total_records = query.count()
+    total_records = await db.scalar(select(func.count()).select_from(query.subquery()))
     total_pages = utils.div_ceil(total_records, page_size)
-    users = query.limit(page_size).offset((page_number-1)*page_size).all()
+    users = (await db.scalars(query.limit(page_size).offset((page_number-1)*page_size))).all()
     return schemas.UsersOut(
         total_pages=total_pages,
         total_records=total_records,
@@ -188,6 +193,7 @@ def update_user(id: int, user: schemas.EditUser, db: Session = Depends(get_db),
         user_fields.pop('email',None)
         user_to_update.update(user_fields)
         db.commit()
+        from_thread.run(user_cache.invalidate, id)
         db.refresh(db_user)
         data = {
             "user": {
@@ -50,6 +50,15 @@ class Token(OurBaseModelOut):
 
 class TokenData(OurBaseModel):
     id: Optional[int] = None
+    jti: Optional[str] = None
+
+class CurrentUser(OurBaseModel):
+    id: int
+    email: EmailStr
+    first_name: str
+    last_name: str
+    confirmed: bool
+    active: bool
 
 class ResetCode(OurBaseModel):
     email: EmailStr
@@ -117,6 +126,14 @@ class taskIn(OurBaseModel):
     tag: Optional[Tag] = None
     state: Optional[State] = None
 
+class taskBulkUpdate(OurBaseModel):
+    id: int
+    title: Optional[str] = None
+    description: Optional[str] = None
+    due_date: Optional[datetime] = None
+    tag: Optional[Tag] = None
+    state: Optional[State] = None
+
 class taskOut(OurBaseModelOut):
     id: Optional[int] = None
     title: Optional[str] = None
@@ -130,6 +147,13 @@ class taskOut(OurBaseModelOut):
     
 class tasksOut(PagedResponse):
     list: Optional[List[taskOut]] = None
+    next_cursor: Optional[str] = None
+
+class taskChangesOut(OurBaseModelOut):
+    tasks: Optional[List[taskOut]] = None
+    deleted: Optional[List[int]] = None
+    since: Optional[int] = None
+    next_cursor: Optional[str] = None
 
 class Logout(OurBaseModelOut):
     pass
@@ -0,0 +1,93 @@
+import threading
+from typing import Optional
+from urllib.parse import urlencode
+from redis import asyncio as redis
+from cachetools import TTLCache
+from .config import settings
+
+class TaskPageCache:
+    """Serialized GET /task/ pages keyed by user id and task version, so a task write makes them stale without deleting anything"""
+    prefix = "todo:tasks:"
+
+    def __init__(self, max_size: int, ttl: int, redis_client=None):
+        self.memory = TTLCache(maxsize=max_size, ttl=ttl) if max_size else None
+        self.redis = redis_client
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.memory_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def count(self, counter: str):
+        with self.lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    @staticmethod
+    def key(user_id: int, version: int, params: dict) -> str:
+        """The same key whatever the order of the parameters and whether the defaults were sent"""
+        query = urlencode(sorted((name, str(value)) for name, value in params.items() if value is not None))
+        return f"{user_id}:{version}:{query}"
+
+    async def get(self, key: str) -> Optional[bytes]:
+        if self.memory is not None:
+            with self.lock:
+                body = self.memory.get(key)
+            if body is not None:
+                self.count("memory_hits")
+                return body
+
+        if self.redis:
+            try:
+                body = await self.redis.get(f"{self.prefix}{key}")
+            except Exception:
+                self.count("errors")
+                body = None
+            if body is not None:
+                self.count("redis_hits")
+                self.set_memory(key, body)
+                return body
+
+        self.count("misses")
+        return None
+
+    def set_memory(self, key: str, body: bytes):
+        if self.memory is not None:
+            with self.lock:
+                self.memory[key] = body
+
+    async def set(self, key: str, body: bytes):
+        self.set_memory(key, body)
+        if self.redis:
+            try:
+                await self.redis.set(f"{self.prefix}{key}", body, ex=self.ttl)
+            except Exception:
+                self.count("errors")
+
+    async def clear(self):
+        if self.memory is not None:
+            with self.lock:
+                self.memory.clear()
+        if self.redis:
+            async for key in self.redis.scan_iter(f"{self.prefix}*"):
+                await self.redis.delete(key)
+
+    def stats(self):
+        lookups = self.memory_hits + self.redis_hits + self.misses
+        return {
+            "tiers": [tier for tier, enabled in (("memory", self.memory is not None), ("redis", self.redis)) if enabled],
+            "memory_hits": self.memory_hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.memory_hits + self.redis_hits) / lookups, 4) if lookups else 0,
+            "errors": self.errors,
+        }
+
+def create_task_page_cache():
+    redis_client = redis.Redis.from_url(settings.redis_url, socket_timeout=0.1) if settings.task_page_cache_redis else None
+    return TaskPageCache(settings.task_page_cache_max_size, settings.task_page_cache_ttl_seconds, redis_client)
+
+task_page_cache = create_task_page_cache()
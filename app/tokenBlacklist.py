@@ -0,0 +1,106 @@
+import hashlib
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from jose import jwt
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from . import models
+from .config import settings
+
+def token_digest(token: str, jti: Optional[str] = None) -> bytes:
+    """sha256 of the jti, tokens minted before the jti claim fall back to the whole token"""
+    return hashlib.sha256((jti or token).encode()).digest()
+
+def blacklist_entry(token: str):
+    """Row revoking an already verified token until it expires"""
+    claims = jwt.get_unverified_claims(token)
+    return models.JWTblacklist(
+        jti_digest=token_digest(token, claims.get("jti")),
+        expired_on=datetime.fromtimestamp(claims["exp"], timezone.utc),
+    )
+
+def timestamp(expired_on: datetime) -> float:
+    """expired_on is naive UTC when read back from the database"""
+    if expired_on.tzinfo is None:
+        expired_on = expired_on.replace(tzinfo=timezone.utc)
+    return expired_on.timestamp()
+
+class TokenBlacklist:
+    """Per-process set of revoked token digests so get_current_user never queries JWT_blacklist.
+    The set follows the table by created_on, so revocations from other workers show up within refresh_seconds,
+    and tokens are forgotten once they expire since jwt.decode rejects them anyway.
+    A row can commit after a newer one is already loaded, so each refresh reads back commit_skew_seconds
+    before the newest created_on seen, and the live rows are all reloaded every reload_seconds."""
+    def __init__(self, refresh_seconds: float, commit_skew_seconds: float = 5, reload_seconds: float = 300):
+        self.refresh_seconds = refresh_seconds
+        self.commit_skew_seconds = commit_skew_seconds
+        self.reload_seconds = reload_seconds
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self.lock:
+            self.revoked = {}
+            self.last_created_on: Optional[datetime] = None
+            self.next_refresh = 0.0
+            self.next_reload = 0.0
+            self.refreshes = 0
+            self.reloads = 0
+            self.rejections = 0
+
+    def add(self, digest: bytes, expired_on: datetime):
+        with self.lock:
+            self.revoked[digest] = timestamp(expired_on)
+
+    def is_revoked(self, digest: bytes) -> bool:
+        if digest not in self.revoked:
+            return False
+        with self.lock:
+            self.rejections += 1
+        return True
+
+    async def refresh(self, db: AsyncSession):
+        """Load the recent rows, or every live row when a reload is due, at most once every refresh_seconds"""
+        now = time.monotonic()
+        if now < self.next_refresh:
+            return
+        self.next_refresh = now + self.refresh_seconds
+
+        query = select(models.JWTblacklist.jti_digest, models.JWTblacklist.expired_on, models.JWTblacklist.created_on)
+        reload = now >= self.next_reload
+        if reload:
+            self.next_reload = now + self.reload_seconds
+        if reload or self.last_created_on is None:
+            query = query.where(models.JWTblacklist.expired_on > datetime.now(timezone.utc))
+        else:
+            watermark = self.last_created_on - timedelta(seconds=self.commit_skew_seconds)
+            query = query.where(models.JWTblacklist.created_on > watermark)
+        rows = (await db.execute(query)).all()
+
+        wall_clock = time.time()
+        with self.lock:
+            for digest, expired_on, created_on in rows:
+                self.revoked[digest] = timestamp(expired_on)
+                if self.last_created_on is None or created_on > self.last_created_on:
+                    self.last_created_on = created_on
+            self.revoked = {digest: exp for digest, exp in self.revoked.items() if exp > wall_clock}
+            self.refreshes += 1
+            if reload:
+                self.reloads += 1
+
+    def stats(self):
+        return {
+            "revoked": len(self.revoked),
+            "last_created_on": self.last_created_on.isoformat() if self.last_created_on else None,
+            "refreshes": self.refreshes,
+            "reloads": self.reloads,
+            "rejections": self.rejections,
+        }
+
+token_blacklist = TokenBlacklist(
+    settings.token_blacklist_refresh_seconds,
+    settings.token_blacklist_commit_skew_seconds,
+    settings.token_blacklist_reload_seconds,
+)
@@ -0,0 +1,128 @@
+import json
+import threading
+from typing import Optional
+from redis import asyncio as redis
+from cachetools import TTLCache
+from .config import settings
+
+class MemoryBackend:
+    """Per-process LRU cache whose entries expire after ttl seconds"""
+    def __init__(self, max_size: int, ttl: int):
+        self.cache = TTLCache(maxsize=max_size, ttl=ttl)
+        self.lock = threading.Lock()
+
+    async def get(self, user_id: int):
+        with self.lock:
+            return self.cache.get(user_id)
+
+    async def set(self, user_id: int, user: dict):
+        with self.lock:
+            self.cache[user_id] = user
+
+    async def delete(self, user_id: int):
+        with self.lock:
+            self.cache.pop(user_id, None)
+
+    async def clear(self):
+        with self.lock:
+            self.cache.clear()
+
+class RedisBackend:
+    """Cache shared by every worker, entries expire after ttl seconds"""
+    prefix = "todo:user:"
+
+    def __init__(self, url: str, ttl: int):
+        self.client = redis.Redis.from_url(url, socket_timeout=0.1)
+        self.ttl = ttl
+
+    async def get(self, user_id: int):
+        raw = await self.client.get(f"{self.prefix}{user_id}")
+        return json.loads(raw) if raw else None
+
+    async def set(self, user_id: int, user: dict):
+        await self.client.set(f"{self.prefix}{user_id}", json.dumps(user), ex=self.ttl)
+
+    async def delete(self, user_id: int):
+        await self.client.delete(f"{self.prefix}{user_id}")
+
+    async def clear(self):
+        async for key in self.client.scan_iter(f"{self.prefix}*"):
+            await self.client.delete(key)
+
+class UserCache:
+    """Caches the authenticated user by id so get_current_user can skip the users query"""
+    def __init__(self, backend=None):
+        self.backend = backend
+        self.lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.errors = 0
+
+    def count(self, counter: str):
+        with self.lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    async def get(self, user_id: int) -> Optional[dict]:
+        user = None
+        if self.backend:
+            try:
+                user = await self.backend.get(user_id)
+            except Exception:
+                self.count("errors")
+        self.count("hits" if user else "misses")
+        return user
+
+    async def set(self, user_id: int, user: dict):
+        if not self.backend:
+            return
+        try:
+            await self.backend.set(user_id, user)
+        except Exception:
+            self.count("errors")
+
+    async def invalidate(self, user_id: int):
+        self.count("invalidations")
+        if not self.backend:
+            return
+        try:
+            await self.backend.delete(user_id)
+        except Exception:
+            self.count("errors")
+
+    def invalidate_on_commit(self, db, user_id: int):
+        """Invalidate the user once the caller's transaction commits, see invalidate_committed.
+        Invalidating earlier lets a concurrent request cache the row as it was before the commit."""
+        db.info.setdefault("invalidated_users", set()).add(user_id)
+
+    async def invalidate_committed(self, db):
+        """Invalidate the users changed by the transaction the caller just committed"""
+        for user_id in db.info.pop("invalidated_users", ()):
+            await self.invalidate(user_id)
+
+    async def clear(self):
+        if self.backend:
+            await self.backend.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__ if self.backend else None,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0,
+            "invalidations": self.invalidations,
+            "errors": self.errors,
+        }
+
+def create_user_cache():
+    if settings.user_cache_backend == "redis":
+        return UserCache(RedisBackend(settings.redis_url, settings.user_cache_ttl_seconds))
+    if settings.user_cache_backend == "memory":
+        return UserCache(MemoryBackend(settings.user_cache_max_size, settings.user_cache_ttl_seconds))
+    return UserCache()
+
+user_cache = create_user_cache()
@@ -1,9 +1,18 @@
 from decimal import Decimal
 from passlib.context import CryptContext
+import base64
+import json
 import re
 from datetime import datetime
+from .config import settings
 
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+pwd_context = CryptContext(
+    schemes=["argon2"],
+    deprecated="auto",
+    argon2__rounds=settings.password_hash_time_cost,
+    argon2__memory_cost=settings.password_hash_memory_cost,
+    argon2__parallelism=settings.password_hash_parallelism,
+)
 
 def hash_password(password: str):
     return pwd_context.hash(password)
@@ -78,6 +87,28 @@ def serialize_datetime(obj):
         return obj.isoformat()
     raise TypeError("Type not serializable")
 
+def encode_cursor(values: dict):
+    raw = json.dumps(values, default=serialize_datetime, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str):
+    try:
+        padding = "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(cursor + padding))
+        return values if isinstance(values, dict) else None
+    except Exception:
+        return None
+
+def weak_etag(*parts):
+    return 'W/"' + ".".join(str(part) for part in parts) + '"'
+
+def etag_matches(if_none_match: str, etag: str):
+    """Weak comparison of an If-None-Match header with an ETag"""
+    if not if_none_match:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag.removeprefix("W/") in tags
+
 def isEmptyLine(vals: list):
     isEmpty = True
     for val in vals:
@@ -1,8 +1,10 @@
 import pytest
 from fastapi import status
-from app import models, enums
+from app import models, enums, oauth2
+from app.tokenBlacklist import TokenBlacklist, token_blacklist, blacklist_entry
 from datetime import datetime, timedelta, timezone
 import uuid
+from sqlalchemy.orm import Session
 from unittest.mock import patch, AsyncMock
 
 
@@ -82,7 +84,7 @@ class TestResetPasswordEndpoint:
         db_session.refresh(code)
         return code
     
-    @patch("app.routers.auth.hash_password")
+    @patch("app.routers.auth.password_hasher.hash", new_callable=AsyncMock)
     def test_reset_password_success(self, mock_hash, client, db_session, test_user, reset_code):
         """Test successful password reset"""
         mock_hash.return_value = "hashed_new_password"
@@ -291,16 +293,106 @@ class TestLogoutEndpoint:
         assert data["status"] == status.HTTP_200_OK
         assert data["message"] == "Logout successfully"
         
+        entry = blacklist_entry(token)
         blacklisted = db_session.query(models.JWTblacklist).filter(
-            models.JWTblacklist.token == token
+            models.JWTblacklist.jti_digest == entry.jti_digest
         ).first()
         assert blacklisted is not None
+        assert blacklisted.expired_on == entry.expired_on.replace(tzinfo=None)
+
+    def test_logged_out_token_is_rejected(self, unauthenticated_client, db_session, test_user):
+        """Test a token can't be used after logout"""
+        login_response = unauthenticated_client.post(
+            "/login",
+            data={
+                "username": test_user.email,
+                "password": "Abc123"
+            }
+        )
+        headers = {"Authorization": f"Bearer {login_response.json()['access_token']}"}
+
+        assert unauthenticated_client.get("/task/", headers=headers).status_code == 200
+        assert unauthenticated_client.get("/logout", headers=headers).status_code == 200
+
+        response = unauthenticated_client.get("/task/", headers=headers)
+        assert response.status_code == 401
+
+    def test_token_revoked_by_another_worker_is_rejected(self, unauthenticated_client, db_session, test_user):
+        """Test a token blacklisted outside this process is rejected once the blacklist refreshes"""
+        login_response = unauthenticated_client.post(
+            "/login",
+            data={
+                "username": test_user.email,
+                "password": "Abc123"
+            }
+        )
+        token = login_response.json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        assert unauthenticated_client.get("/task/", headers=headers).status_code == 200
+
+        db_session.add(blacklist_entry(token))
+        db_session.commit()
+
+        token_blacklist.next_refresh = 0
+        response = unauthenticated_client.get("/task/", headers=headers)
+        assert response.status_code == 401
+
+
+
+def revoke(db_session, created_on=None):
+    """Commit a blacklist row, optionally stamped as if it had been inserted at created_on"""
+    entry = blacklist_entry(oauth2.create_access_token({"user": {"id": 1}}))
+    if created_on is not None:
+        entry.created_on = created_on
+    db_session.add(entry)
+    db_session.commit()
+    return entry
+
+
+@pytest.mark.asyncio
+async def test_blacklist_row_committed_out_of_order_is_loaded(db_session, test_engine, async_db_session):
+    blacklist = TokenBlacklist(refresh_seconds=0, commit_skew_seconds=5, reload_seconds=3600)
+    await blacklist.refresh(async_db_session)
+
+    with Session(test_engine) as slow:
+        late = blacklist_entry(oauth2.create_access_token({"user": {"id": 1}}))
+        digest = late.jti_digest
+        slow.add(late)
+        slow.flush()
+        revoke(db_session)
+        await async_db_session.commit()
+        await blacklist.refresh(async_db_session)
+        assert not blacklist.is_revoked(digest)
+        slow.commit()
+
+    await async_db_session.commit()
+    await blacklist.refresh(async_db_session)
+
+    assert blacklist.is_revoked(digest)
+    assert blacklist.stats()["reloads"] == 1
+
+
+@pytest.mark.asyncio
+async def test_blacklist_reload_catches_rows_older_than_the_skew(db_session, async_db_session):
+    blacklist = TokenBlacklist(refresh_seconds=0, commit_skew_seconds=5, reload_seconds=3600)
+    revoke(db_session)
+    await blacklist.refresh(async_db_session)
+
+    late = revoke(db_session, blacklist.last_created_on - timedelta(seconds=60))
+    await async_db_session.commit()
+    await blacklist.refresh(async_db_session)
+    assert not blacklist.is_revoked(late.jti_digest)
+
+    await async_db_session.commit()
+    blacklist.next_reload = 0
+    await blacklist.refresh(async_db_session)
+    assert blacklist.is_revoked(late.jti_digest)
 
 
 class TestForgotPasswordEndpoint:
     """Test cases for POST /forgotPassword"""
     
-    @patch('app.routers.resetCode.send_email', new_callable=AsyncMock)
+    @patch('app.routers.emailUtil.send_email', new_callable=AsyncMock)
     def test_forgot_password_success(self, mock_send_email, client, db_session, test_user):
         """Test successful forgot password request"""
         response = client.post(
@@ -320,8 +412,13 @@ class TestForgotPasswordEndpoint:
         ).first()
         assert reset_code is not None
         assert reset_code.status == enums.CodeStatus.Pending
-        
-        mock_send_email.assert_called_once()
+
+        queued = db_session.query(models.EmailOutbox).one()
+        assert queued.recipients == [test_user.email]
+        assert queued.template == enums.EmailTemplate.ResetPassword
+        assert queued.code == reset_code.reset_code
+        assert queued.status == enums.EmailStatus.Pending
+        mock_send_email.assert_not_called()
     
     def test_forgot_password_invalid_email(self, client, db_session):
         """Test forgot password with non-existent email"""
@@ -2,10 +2,14 @@
 from datetime import datetime, timezone
 import pytest
 from unittest.mock import MagicMock, patch
-from fastapi import status
+from fastapi import HTTPException, status
 from app.enums.codeStatus import CodeStatus
 from app.routers import auth
-from app import models, schemas
+from app import models, schemas, oauth2
+from app.routers.confirmationCode import confirm_account
+from app.routers.resetCode import reset_password
+from app.userCache import MemoryBackend, UserCache
+from app.tokenBlacklist import TokenBlacklist, blacklist_entry, token_digest
 from unittest.mock import AsyncMock
 
 class DummyUser:
@@ -20,14 +24,14 @@ class DummyUser:
 
 @pytest.mark.asyncio
 async def test_login_invalid_email():
-    mock_db = MagicMock()
-    mock_db.query.return_value.filter.return_value.first.return_value = None
+    mock_db = AsyncMock()
+    mock_db.scalar.return_value = None
 
     creds = MagicMock()
     creds.username = "wrong@mail.com"
     creds.password = "123"
 
-    result = auth.login_user(creds, mock_db)
+    result = await auth.login_user(creds, mock_db)
 
     assert result.status == status.HTTP_403_FORBIDDEN
     assert result.message == "Invalid Credentials"
@@ -37,14 +41,14 @@ async def test_login_invalid_email():
 async def test_login_not_confirmed():
     user = DummyUser("test@mail.com", confirmed=False)
 
-    mock_db = MagicMock()
-    mock_db.query.return_value.filter.return_value.first.return_value = user
+    mock_db = AsyncMock()
+    mock_db.scalar.return_value = user
 
     creds = MagicMock()
     creds.username = "test@mail.com"
     creds.password = "123"
 
-    result = auth.login_user(creds, mock_db)
+    result = await auth.login_user(creds, mock_db)
 
     assert result.status == status.HTTP_403_FORBIDDEN
     assert "not been verified" in result.message
@@ -54,21 +58,22 @@ async def test_login_not_confirmed():
 async def test_login_success():
     user = DummyUser("test@mail.com", confirmed=True)
 
-    mock_db = MagicMock()
-    mock_db.query.return_value.filter.return_value.first.return_value = user
+    mock_db = AsyncMock()
+    mock_db.scalar.return_value = user
 
     creds = MagicMock()
     creds.username = "test@mail.com"
     creds.password = "123"
 
     with patch("app.routers.auth.oauth2.create_access_token", return_value="jwt123"):
-        result = auth.login_user(creds, mock_db)
+        result = await auth.login_user(creds, mock_db)
 
     assert result.status == status.HTTP_200_OK
     assert result.access_token == "jwt123"
 
 
-def test_reset_password_code_not_found():
+@pytest.mark.asyncio
+async def test_reset_password_code_not_found():
     mock_db = MagicMock()    
     auth.get_reset_password_code = MagicMock(return_value=None)
     req = schemas.ResetPassword(
@@ -77,30 +82,32 @@ def test_reset_password_code_not_found():
         status= CodeStatus.Pending
     )
 
-    result = auth.resetPassword(req, mock_db)
+    result = await auth.resetPassword(req, mock_db)
 
     assert result.status == status.HTTP_400_BAD_REQUEST
     assert "Reset link does not exist" in result.message
 
-def test_reset_password_code_not_found():
-    mock_db = MagicMock()
-    mock_db.query.return_value.filter.return_value.first.return_value = None
+@pytest.mark.asyncio
+async def test_reset_password_code_not_found():
+    mock_db = AsyncMock()
+    mock_db.scalar.return_value = None
 
     req = schemas.ResetPassword(reset_password_token="bad", new_password="a", confirm_new_password="a")
 
-    result = auth.resetPassword(req, mock_db)
+    result = await auth.resetPassword(req, mock_db)
 
     assert result.status == status.HTTP_400_BAD_REQUEST
     assert "does not exist" in result.message
 
 
-def test_reset_password_mismatch():
+@pytest.mark.asyncio
+async def test_reset_password_mismatch():
     reset_code = MagicMock()
     reset_code.status = CodeStatus.Pending
     reset_code.created_on = datetime.now(timezone.utc)
 
-    mock_db = MagicMock()
-    mock_db.query.return_value.filter.return_value.first.return_value = reset_code
+    mock_db = AsyncMock()
+    mock_db.scalar.return_value = reset_code
 
     req = schemas.ResetPassword(
         reset_password_token="123",
@@ -108,17 +115,197 @@ def test_reset_password_mismatch():
         confirm_new_password="xyz"
     )
 
-    result = auth.resetPassword(req, mock_db)
+    result = await auth.resetPassword(req, mock_db)
     assert result.status == status.HTTP_400_BAD_REQUEST
     assert "match" in result.message
 
-def test_confirm_account_invalid_code():
-    mock_db = MagicMock()
-    mock_db.query.return_value.filter.return_value.first.return_value = None
+@pytest.mark.asyncio
+async def test_confirm_account_invalid_code():
+    mock_db = AsyncMock()
+    mock_db.scalar.return_value = None
 
     req = schemas.ConfirmAccount(code="bad")
 
-    result = auth.confirmAccount(req, mock_db)
+    result = await auth.confirmAccount(req, mock_db)
 
     assert result.status == status.HTTP_400_BAD_REQUEST
     assert "does not exist" in result.message
+
+
+@pytest.fixture
+def memory_user_cache():
+    cache = UserCache(MemoryBackend(max_size=10, ttl=60))
+    with patch("app.oauth2.user_cache", cache), \
+         patch("app.routers.confirmationCode.user_cache", cache), \
+         patch("app.routers.resetCode.user_cache", cache), \
+         patch("app.routers.auth.user_cache", cache):
+        yield cache
+
+
+def get_token(user_id=1):
+    return oauth2.create_access_token({"user": {"id": user_id}})
+
+
+def mock_auth_db(revoked_rows=()):
+    """AsyncMock session whose execute returns the JWT_blacklist rows for the blacklist refresh"""
+    mock_db = AsyncMock()
+    mock_db.execute.return_value = MagicMock()
+    mock_db.execute.return_value.all.return_value = list(revoked_rows)
+    return mock_db
+
+
+@pytest.mark.asyncio
+async def test_get_current_user_cache_hit_skips_db(memory_user_cache):
+    user = DummyUser("test@mail.com")
+    user.active = True
+    mock_db = mock_auth_db()
+    mock_db.scalar.return_value = user
+
+    first = await oauth2.get_current_user(get_token(), mock_db)
+    second = await oauth2.get_current_user(get_token(), mock_db)
+
+    assert first == second
+    assert second.id == 1 and second.email == "test@mail.com"
+    assert mock_db.scalar.call_count == 1
+    stats = memory_user_cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+
+
+@pytest.mark.asyncio
+async def test_get_current_user_does_not_cache_unconfirmed(memory_user_cache):
+    mock_db = mock_auth_db()
+    mock_db.scalar.return_value = None
+
+    for _ in range(2):
+        with pytest.raises(HTTPException):
+            await oauth2.get_current_user(get_token(), mock_db)
+
+    assert mock_db.scalar.call_count == 2
+    assert await memory_user_cache.get(1) is None
+
+
+@pytest.mark.asyncio
+async def test_reset_password_invalidates_cached_user(memory_user_cache):
+    user = DummyUser("test@mail.com")
+    user.active = True
+    await memory_user_cache.set(1, schemas.CurrentUser.model_validate(user).model_dump())
+    mock_db = AsyncMock(info={})
+    mock_db.scalar.return_value = user
+
+    await reset_password("test@mail.com", "newhash", mock_db)
+    assert await memory_user_cache.get(1) is not None
+
+    await memory_user_cache.invalidate_committed(mock_db)
+    assert await memory_user_cache.get(1) is None
+    assert memory_user_cache.stats()["invalidations"] == 1
+
+
+@pytest.mark.asyncio
+async def test_confirm_account_invalidates_cached_user(memory_user_cache):
+    user = DummyUser("test@mail.com")
+    user.active = True
+    await memory_user_cache.set(1, schemas.CurrentUser.model_validate(user).model_dump())
+    mock_db = AsyncMock(info={})
+    mock_db.scalar.return_value = user
+
+    await confirm_account("test@mail.com", mock_db)
+    assert await memory_user_cache.get(1) is not None
+
+    await memory_user_cache.invalidate_committed(mock_db)
+    assert await memory_user_cache.get(1) is None
+
+
+@pytest.mark.asyncio
+async def test_user_cache_backend_errors_count_as_misses():
+    backend = AsyncMock()
+    backend.get.side_effect = ConnectionError("redis down")
+    cache = UserCache(backend)
+
+    assert await cache.get(1) is None
+    stats = cache.stats()
+    assert stats["errors"] == 1
+    assert stats["misses"] == 1
+
+
+@pytest.mark.asyncio
+async def test_token_blacklist_refreshes_incrementally():
+    blacklist = TokenBlacklist(refresh_seconds=60)
+    revoked, other = blacklist_entry(get_token(1)), blacklist_entry(get_token(2))
+    created_on = datetime.now(timezone.utc)
+    mock_db = mock_auth_db([(revoked.jti_digest, revoked.expired_on, created_on)])
+
+    await blacklist.refresh(mock_db)
+    await blacklist.refresh(mock_db)
+
+    assert mock_db.execute.call_count == 1
+    assert blacklist.last_created_on == created_on
+    assert blacklist.is_revoked(revoked.jti_digest)
+    assert not blacklist.is_revoked(other.jti_digest)
+
+
+@pytest.mark.asyncio
+async def test_token_blacklist_forgets_expired_tokens():
+    blacklist = TokenBlacklist(refresh_seconds=0)
+    with patch("app.oauth2.ACCESS_TOKEN_EXPIRE_MINUTES", -1):
+        expired = blacklist_entry(get_token())
+    blacklist.add(expired.jti_digest, expired.expired_on)
+    mock_db = mock_auth_db()
+
+    await blacklist.refresh(mock_db)
+
+    assert blacklist.stats()["revoked"] == 0
+
+
+def test_access_tokens_are_blacklisted_by_jti_until_they_expire():
+    token = get_token()
+    claims = oauth2.jwt.get_unverified_claims(token)
+
+    entry = blacklist_entry(token)
+
+    assert entry.jti_digest == token_digest(token, claims["jti"])
+    assert len(entry.jti_digest) == 32
+    assert entry.expired_on == datetime.fromtimestamp(claims["exp"], timezone.utc)
+    assert blacklist_entry(get_token()).jti_digest != entry.jti_digest
+
+
+class TestCachedUserAfterCommit:
+    """Test a user cached between the change and its commit is not served once the change commits"""
+
+    @pytest.fixture
+    def unconfirmed_user(self, db_session):
+        user = models.User(email="new@example.com", first_name="New", last_name="User", password="hash", confirmed=False)
+        db_session.add(user)
+        db_session.add(models.ConfirmationCode(email=user.email, code="confirm-code", user=user, status=CodeStatus.Pending))
+        db_session.add(models.ResetCode(email=user.email, reset_code="reset-code", status=CodeStatus.Pending))
+        db_session.commit()
+        return user
+
+    async def cache_concurrently(self, cache, user_id, async_session_factory):
+        """What a concurrent get_current_user caches before the change commits"""
+        async with async_session_factory() as db:
+            user = await db.get(models.User, user_id)
+            await cache.set(user_id, schemas.CurrentUser.model_validate(user).model_dump())
+
+    @pytest.mark.asyncio
+    async def test_confirm_account(self, memory_user_cache, unconfirmed_user, async_session_factory):
+        async with async_session_factory() as db:
+            confirm_code = AsyncMock(side_effect=lambda code, db: self.cache_concurrently(memory_user_cache, unconfirmed_user.id, async_session_factory))
+            with patch("app.routers.auth.disable_confirmation_code", confirm_code):
+                response = await auth.confirmAccount(schemas.ConfirmAccount(code="confirm-code"), db)
+
+        assert response.status == 200
+        assert await memory_user_cache.get(unconfirmed_user.id) is None
+
+    @pytest.mark.asyncio
+    async def test_reset_password(self, memory_user_cache, unconfirmed_user, async_session_factory):
+        async with async_session_factory() as db:
+            disable_code = AsyncMock(side_effect=lambda code, db: self.cache_concurrently(memory_user_cache, unconfirmed_user.id, async_session_factory))
+            with patch("app.routers.auth.disable_reset_code", disable_code), \
+                 patch("app.routers.auth.password_hasher.hash", AsyncMock(return_value="new hash")):
+                response = await auth.resetPassword(schemas.ResetPassword(
+                    reset_password_token="reset-code", new_password="Password123", confirm_new_password="Password123"
+                ), db)
+
+        assert response.status == 200
+        assert await memory_user_cache.get(unconfirmed_user.id) is None
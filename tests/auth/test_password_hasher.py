@@ -0,0 +1,105 @@
+import asyncio
+import os
+import threading
+import time
+import pytest
+from unittest.mock import patch
+
+from app import utils
+from app.passwordHasher import PasswordHasher
+
+
+@pytest.fixture
+def process_hasher(monkeypatch):
+    """Two hashing processes with cheap argon2 costs, the spawned workers read them from the environment"""
+    monkeypatch.setenv("PASSWORD_HASH_TIME_COST", "1")
+    monkeypatch.setenv("PASSWORD_HASH_MEMORY_COST", "1024")
+    monkeypatch.setenv("PASSWORD_HASH_PARALLELISM", "1")
+    hasher = PasswordHasher(workers=2, max_concurrency=4)
+    yield hasher
+    hasher.shutdown()
+
+
+async def max_loop_lag(coroutine):
+    """Longest the event loop went without running a 1ms ticker while the coroutine ran"""
+    lags = []
+
+    async def ticker():
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(0.001)
+            lags.append(time.perf_counter() - started)
+
+    ticking = asyncio.create_task(ticker())
+    await asyncio.sleep(0)
+    result = await coroutine
+    ticking.cancel()
+    return result, max(lags)
+
+
+@pytest.mark.asyncio
+async def test_hash_and_verify_in_worker_processes(process_hasher):
+    hashed = await process_hasher.hash("Password123")
+
+    assert hashed.startswith("$argon2id$v=19$m=1024,t=1,p=1$")
+    assert await process_hasher.verify("Password123", hashed)
+    assert not await process_hasher.verify("wrong", hashed)
+    assert utils.verify("Password123", hashed)
+
+
+@pytest.mark.asyncio
+async def test_hashing_does_not_block_the_event_loop():
+    started = time.perf_counter()
+    utils.hash_password("Password123")
+    hash_duration = time.perf_counter() - started
+
+    hasher = PasswordHasher(workers=1, max_concurrency=4)
+    try:
+        await hasher.hash("warm up")
+        hashed, lag = await max_loop_lag(asyncio.gather(*(hasher.hash(f"Password{i}") for i in range(3))))
+    finally:
+        hasher.shutdown()
+
+    assert len(hashed) == 3
+    assert lag < hash_duration / 2
+
+
+@pytest.mark.asyncio
+async def test_concurrency_limit_queues_callers():
+    running, peak = 0, 0
+    lock = threading.Lock()
+
+    def slow_hash(password):
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        time.sleep(0.02)
+        with lock:
+            running -= 1
+        return password
+
+    hasher = PasswordHasher(workers=0, max_concurrency=2)
+    with patch("app.passwordHasher.utils.hash_password", slow_hash):
+        results = await asyncio.gather(*(hasher.hash(str(i)) for i in range(6)))
+
+    assert results == [str(i) for i in range(6)]
+    assert peak == 2
+
+
+@pytest.mark.asyncio
+async def test_signups_per_second_per_core():
+    """Hashes/second with the configured argon2 costs, one worker process per core"""
+    workers = os.cpu_count() or 1
+    hasher = PasswordHasher(workers=workers, max_concurrency=32)
+    try:
+        await asyncio.gather(*(hasher.hash("warm up") for _ in range(workers)))
+        count = 4 * workers
+        started = time.perf_counter()
+        hashed = await asyncio.gather(*(hasher.hash(f"Password{i}") for i in range(count)))
+        rate = count / (time.perf_counter() - started)
+    finally:
+        hasher.shutdown()
+
+    print(f"\n{rate:.1f} signups/s with {workers} workers, {rate / workers:.1f} signups/s per core")
+    assert len(set(hashed)) == count
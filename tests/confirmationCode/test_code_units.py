@@ -1,5 +1,6 @@
 import pytest
 from fastapi import status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.routers.confirmationCode import (
@@ -13,7 +14,7 @@ from app import models, enums, schemas
 import pytest
 from fastapi import status
 from sqlalchemy.orm import Session
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
 
 from app import models, enums, schemas, utils
 from app.routers.auth import (
@@ -28,7 +29,8 @@ from app.routers.resetCode import forgot_password
 
 
 @pytest.mark.parametrize("code_value", ["abc123", "xyz789"])
-def test_get_confirmation_code_success(db_session: Session, code_value):
+@pytest.mark.asyncio
+async def test_get_confirmation_code_success(db_session: Session, async_db_session: AsyncSession, code_value):
     user = models.User(
         id=1,
         first_name="a",
@@ -48,19 +50,21 @@ def test_get_confirmation_code_success(db_session: Session, code_value):
     db_session.add(code)
     db_session.commit()
 
-    result = get_confirmation_code(code_value, db_session)
+    result = await get_confirmation_code(code_value, async_db_session)
 
     assert result is not None
     assert result.code == code_value
     assert result.status == enums.CodeStatus.Pending
 
 
-def test_get_confirmation_code_not_found(db_session: Session):
-    result = get_confirmation_code("unknown", db_session)
+@pytest.mark.asyncio
+async def test_get_confirmation_code_not_found(db_session: Session, async_db_session: AsyncSession):
+    result = await get_confirmation_code("unknown", async_db_session)
     assert result is None
 
 
-def test_confirm_account_success(db_session: Session):
+@pytest.mark.asyncio
+async def test_confirm_account_success(db_session: Session, async_db_session: AsyncSession):
     user = models.User(
         first_name="Mariem",
         last_name="Charef",
@@ -71,21 +75,24 @@ def test_confirm_account_success(db_session: Session):
     db_session.add(user)
     db_session.commit()
 
-    response = confirm_account("user@example.com", db_session)
+    response = await confirm_account("user@example.com", async_db_session)
+    await async_db_session.commit()
 
     db_session.refresh(user)
     assert response is None
     assert user.confirmed is True
 
 
-def test_confirm_account_user_not_found(db_session: Session):
-    result = confirm_account("missing@example.com", db_session)
+@pytest.mark.asyncio
+async def test_confirm_account_user_not_found(db_session: Session, async_db_session: AsyncSession):
+    result = await confirm_account("missing@example.com", async_db_session)
 
     assert result.status == status.HTTP_404_NOT_FOUND
     assert result.message == "User with this email does not exist"
 
 
-def test_disable_confirmation_code_success(db_session: Session):
+@pytest.mark.asyncio
+async def test_disable_confirmation_code_success(db_session: Session, async_db_session: AsyncSession):
     user = models.User(
         id=1,
         first_name="Mariem",
@@ -106,35 +113,39 @@ def test_disable_confirmation_code_success(db_session: Session):
     db_session.add(code)
     db_session.commit()
 
-    response = disable_confirmation_code("valid-code", db_session)
+    response = await disable_confirmation_code("valid-code", async_db_session)
+    await async_db_session.commit()
     db_session.refresh(code)
     assert response is None
     assert code.status == enums.CodeStatus.Used
 
 
-def test_disable_confirmation_code_not_found(db_session: Session):
-    result = disable_confirmation_code("does-not-exist", db_session)
+@pytest.mark.asyncio
+async def test_disable_confirmation_code_not_found(db_session: Session, async_db_session: AsyncSession):
+    result = await disable_confirmation_code("does-not-exist", async_db_session)
 
     assert result.status == status.HTTP_404_NOT_FOUND
     assert result.message == "Confirmation code does not exist"
 
 
-def test_add_confirmation_code_success(db_session: Session):
+@pytest.mark.asyncio
+async def test_add_confirmation_code_success(db_session: Session, async_db_session: AsyncSession):
     schema_code = schemas.ConfirmationCode(
         email="test@example.com",
         code="newcode123",
         status=enums.CodeStatus.Pending,
         user_id=1
     )
-    result = add_confirmation_code(schema_code, db_session)
+    result = await add_confirmation_code(schema_code, async_db_session)
 
     assert result.id is not None
     assert result.code == "newcode123"
     assert result.status == enums.CodeStatus.Pending
 
 
-def test_add_reset_code_success(db_session: Session):
-    result = add_reset_code("user@example.com", db_session)
+@pytest.mark.asyncio
+async def test_add_reset_code_success(db_session: Session, async_db_session: AsyncSession):
+    result = await add_reset_code("user@example.com", async_db_session)
 
     assert result.email == "user@example.com"
     assert result.status == enums.CodeStatus.Pending
@@ -142,7 +153,8 @@ def test_add_reset_code_success(db_session: Session):
     assert isinstance(result.reset_code, str)
 
 
-def test_get_reset_password_code_success(db_session: Session):
+@pytest.mark.asyncio
+async def test_get_reset_password_code_success(db_session: Session, async_db_session: AsyncSession):
     code = models.ResetCode(
         email="a@a.com",
         reset_code="token123",
@@ -151,19 +163,21 @@ def test_get_reset_password_code_success(db_session: Session):
     db_session.add(code)
     db_session.commit()
 
-    result = get_reset_password_code("token123", db_session)
+    result = await get_reset_password_code("token123", async_db_session)
 
     assert result is not None
     assert result.reset_code == "token123"
     assert result.status == enums.CodeStatus.Pending
 
 
-def test_get_reset_password_code_not_found(db_session: Session):
-    result = get_reset_password_code("unknown", db_session)
+@pytest.mark.asyncio
+async def test_get_reset_password_code_not_found(db_session: Session, async_db_session: AsyncSession):
+    result = await get_reset_password_code("unknown", async_db_session)
     assert result is None
 
 
-def test_reset_password_success(db_session: Session):
+@pytest.mark.asyncio
+async def test_reset_password_success(db_session: Session, async_db_session: AsyncSession):
     user = models.User(
         first_name="Mariem",
         last_name="Charef",
@@ -175,19 +189,22 @@ def test_reset_password_success(db_session: Session):
     db_session.commit()
 
     new_pw = "newhashed"
-    reset_password("user@example.com", new_pw, db_session)
+    await reset_password("user@example.com", new_pw, async_db_session)
+    await async_db_session.commit()
     db_session.refresh(user)
 
     assert user.password == new_pw
 
 
-def test_reset_password_user_not_found(db_session: Session):
-    response = reset_password("missing@example.com", "hash", db_session)
+@pytest.mark.asyncio
+async def test_reset_password_user_not_found(db_session: Session, async_db_session: AsyncSession):
+    response = await reset_password("missing@example.com", "hash", async_db_session)
 
     assert response.status == status.HTTP_404_NOT_FOUND
     assert response.message == "No user with this email"
 
-def test_disable_reset_code_success(db_session: Session):
+@pytest.mark.asyncio
+async def test_disable_reset_code_success(db_session: Session, async_db_session: AsyncSession):
     code = models.ResetCode(
         email="u@u.com",
         reset_code="tokenXYZ",
@@ -196,13 +213,15 @@ def test_disable_reset_code_success(db_session: Session):
     db_session.add(code)
     db_session.commit()
 
-    disable_reset_code("tokenXYZ", db_session)
+    await disable_reset_code("tokenXYZ", async_db_session)
+    await async_db_session.commit()
     db_session.refresh(code)
 
     assert code.status == enums.CodeStatus.Used
 
-def test_disable_reset_code_not_found(db_session: Session):
-    result = disable_reset_code("doesNotExist", db_session)
+@pytest.mark.asyncio
+async def test_disable_reset_code_not_found(db_session: Session, async_db_session: AsyncSession):
+    result = await disable_reset_code("doesNotExist", async_db_session)
     query = db_session.query(models.ResetCode).filter(
         models.ResetCode.reset_code == "doesNotExist"
     ).all()
@@ -210,7 +229,7 @@ def test_disable_reset_code_not_found(db_session: Session):
 
 
 @pytest.mark.asyncio
-async def test_forgot_password_success(db_session: Session):
+async def test_forgot_password_success(db_session: Session, async_db_session: AsyncSession):
     user = models.User(
         first_name="Mariem",
         last_name="C",
@@ -223,35 +242,37 @@ async def test_forgot_password_success(db_session: Session):
     input_data = schemas.ForgotPassword(email="user@example.com")
 
     with patch("app.routers.emailUtil.send_email", new_callable=MagicMock):
-        response = await forgot_password(input_data, db_session)
+        response = await forgot_password(input_data, async_db_session)
     assert response.status == status.HTTP_200_OK
     assert response.message == "email sent!"
 
 
 @pytest.mark.asyncio
-async def test_forgot_password_user_not_found(db_session: Session):
+async def test_forgot_password_user_not_found(db_session: Session, async_db_session: AsyncSession):
     input_data = schemas.ForgotPassword(email="missing@example.com")
 
-    response = await forgot_password(input_data, db_session)
+    response = await forgot_password(input_data, async_db_session)
 
     assert response.status == status.HTTP_404_NOT_FOUND
     assert response.message == "No account with this email"
 
 
-def test_resetPassword_reset_code_not_found(db_session: Session):
+@pytest.mark.asyncio
+async def test_resetPassword_reset_code_not_found(db_session: Session, async_db_session: AsyncSession):
     req = schemas.ResetPassword(
         reset_password_token="bad",
         new_password="123",
         confirm_new_password="123"
     )
 
-    result = resetPassword(req, db_session)
+    result = await resetPassword(req, async_db_session)
 
     assert result.status == status.HTTP_400_BAD_REQUEST
     assert "does not exist" in result.message
 
 
-def test_resetPassword_code_already_used(db_session: Session):
+@pytest.mark.asyncio
+async def test_resetPassword_code_already_used(db_session: Session, async_db_session: AsyncSession):
     code = models.ResetCode(
         email="user@example.com",
         reset_code="usedtoken",
@@ -266,13 +287,14 @@ def test_resetPassword_code_already_used(db_session: Session):
         confirm_new_password="a"
     )
 
-    result = resetPassword(req, db_session)
+    result = await resetPassword(req, async_db_session)
 
     assert result.status == status.HTTP_400_BAD_REQUEST
     assert result.message == "Code Already used"
 
 
-def test_resetPassword_passwords_do_not_match(db_session: Session):
+@pytest.mark.asyncio
+async def test_resetPassword_passwords_do_not_match(db_session: Session, async_db_session: AsyncSession):
     code = models.ResetCode(
         email="user@example.com",
         reset_code="token",
@@ -287,13 +309,14 @@ def test_resetPassword_passwords_do_not_match(db_session: Session):
         confirm_new_password="456"
     )
 
-    result = resetPassword(req, db_session)
+    result = await resetPassword(req, async_db_session)
 
     assert result.status == status.HTTP_400_BAD_REQUEST
     assert result.message == "Passwords do not match"
 
 
-def test_resetPassword_success(db_session: Session):
+@pytest.mark.asyncio
+async def test_resetPassword_success(db_session: Session, async_db_session: AsyncSession):
     user = models.User(
         first_name="a",
         last_name="b",
@@ -311,14 +334,14 @@ def test_resetPassword_success(db_session: Session):
     db_session.add(code)
     db_session.commit()
 
-    with patch("app.routers.auth.hash_password", return_value="newhashed"):
+    with patch("app.routers.auth.password_hasher.hash", new_callable=AsyncMock, return_value="newhashed"):
         req = schemas.ResetPassword(
             reset_password_token="tokenOK",
             new_password="abc",
             confirm_new_password="abc"
         )
 
-        result = resetPassword(req, db_session)
+        result = await resetPassword(req, async_db_session)
 
     assert result.status == status.HTTP_200_OK
     assert result.message == "Password reset successfully"
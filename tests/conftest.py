@@ -1,14 +1,24 @@
+import asyncio
 from app.config import settings
 import pytest
+import pytest_asyncio
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine, event, quoted_name, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.pool import NullPool
 from app.main import app
-from app.database import Base, get_db
+from app.database import Base, get_db, get_async_db, get_read_db
 from app.oauth2 import get_current_user
+from app.userCache import user_cache
+from app.taskPageCache import task_page_cache
+from app.tokenBlacklist import token_blacklist
+from app.errorSink import error_sink
+from app.passwordHasher import password_hasher
 from app import models, utils
 
 TEST_SQLALCHEMY_DATABASE_URL = f'postgresql://{settings.database_username}:{settings.database_password}@{settings.database_hostname}/{settings.test_database_name}'
+TEST_ASYNC_SQLALCHEMY_DATABASE_URL = f'postgresql+asyncpg://{settings.database_username}:{settings.database_password}@{settings.database_hostname}/{settings.test_database_name}'
 TEST_DATABASE_URL = f'postgresql://{settings.database_username}:{settings.database_password}@{settings.database_hostname}/postgres'
 
 
@@ -40,6 +50,20 @@ def create_test_database():
         conn.execute(text(f'DROP DATABASE IF EXISTS {dbname}'))
 
 
+@pytest.fixture(scope="session", autouse=True)
+def disable_background_workers():
+    """
+    The app's workers use the app database, tests run them explicitly against the test database.
+    Passwords are hashed in threads, every TestClient would otherwise spawn and stop the hashing processes.
+    """
+    intervals = settings.purge_interval_seconds, settings.email_worker_interval_seconds, settings.error_flush_interval_seconds
+    settings.purge_interval_seconds = settings.email_worker_interval_seconds = settings.error_flush_interval_seconds = 0
+    hash_workers, password_hasher.workers = password_hasher.workers, 0
+    yield
+    settings.purge_interval_seconds, settings.email_worker_interval_seconds, settings.error_flush_interval_seconds = intervals
+    password_hasher.workers = hash_workers
+
+
 @pytest.fixture(scope="session")
 def test_engine():
     """Create test database engine and tables"""
@@ -52,33 +76,54 @@ def test_engine():
     Base.metadata.drop_all(bind=_engine)
 
 
+@pytest.fixture(scope="session")
+def test_async_engine(test_engine):
+    """
+    Create the async engine used by the app's async sessions.
+    Every TestClient runs its own event loop, so connections are not pooled across tests.
+    """
+    return create_async_engine(TEST_ASYNC_SQLALCHEMY_DATABASE_URL, poolclass=NullPool)
+
+
 @pytest.fixture
 def db_session(test_engine):
     """
-    Create a transactional database session for each test.
-    All changes are rolled back after the test.
+    Create a database session for each test.
+    The async endpoints use their own connections, so the data is committed
+    and every table is truncated after the test.
     """
-    connection = test_engine.connect()
-    transaction = connection.begin()
-
-    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=connection)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
     session = SessionLocal()
 
-    nested = connection.begin_nested()
-
-    @event.listens_for(session, "after_transaction_end")
-    def restart_savepoint(sess, trans):
-        """Automatically restart savepoint after each commit"""
-        if trans.nested and not trans._parent.nested:
-            session.expire_all()
-            connection.begin_nested()
+    @event.listens_for(session, "do_orm_execute")
+    def read_fresh_rows(orm_execute_state):
+        """Reload the rows the endpoints may have changed since the session loaded them"""
+        if orm_execute_state.is_select:
+            orm_execute_state.update_execution_options(populate_existing=True)
 
     try:
         yield session
     finally:
         session.close()
-        transaction.rollback()
-        connection.close()
+        with test_engine.begin() as connection:
+            tables = ", ".join(connection.dialect.identifier_preparer.format_table(table) for table in Base.metadata.sorted_tables)
+            connection.execute(text(f"TRUNCATE {tables} RESTART IDENTITY CASCADE"))
+        asyncio.run(user_cache.clear())
+        asyncio.run(task_page_cache.clear())
+        token_blacklist.clear()
+        error_sink.clear()
+
+
+@pytest.fixture
+def async_session_factory(test_async_engine, db_session):
+    return async_sessionmaker(autoflush=False, expire_on_commit=False, bind=test_async_engine, class_=AsyncSession)
+
+
+@pytest_asyncio.fixture
+async def async_db_session(async_session_factory):
+    """Create an async session for calling the async helpers directly"""
+    async with async_session_factory() as session:
+        yield session
 
 
 @pytest.fixture
@@ -99,7 +144,7 @@ def test_user(db_session):
 
 
 @pytest.fixture
-def client(db_session, test_user):
+def client(db_session, async_session_factory, test_user):
     """
     Create a test client with database session and authentication overrides.
     This fixture combines both the database session and authentication.
@@ -109,11 +154,17 @@ def client(db_session, test_user):
             yield db_session
         finally:
             pass
+
+    async def override_get_async_db():
+        async with async_session_factory() as session:
+            yield session
     
     def override_get_current_user():
         return test_user
     
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    app.dependency_overrides[get_read_db] = override_get_async_db
     app.dependency_overrides[get_current_user] = override_get_current_user
     
     with TestClient(app) as test_client:
@@ -123,7 +174,7 @@ def client(db_session, test_user):
 
 
 @pytest.fixture
-def unauthenticated_client(db_session):
+def unauthenticated_client(db_session, async_session_factory):
     """
     Create a test client without authentication override.
     Useful for testing endpoints that don't require authentication.
@@ -133,8 +184,14 @@ def unauthenticated_client(db_session):
             yield db_session
         finally:
             pass
+
+    async def override_get_async_db():
+        async with async_session_factory() as session:
+            yield session
     
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    app.dependency_overrides[get_read_db] = override_get_async_db
     
     with TestClient(app) as test_client:
         yield test_client
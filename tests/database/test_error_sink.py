@@ -0,0 +1,152 @@
+import logging
+import pytest
+from functools import partial
+from unittest.mock import AsyncMock, MagicMock, patch
+from sqlalchemy.exc import IntegrityError, OperationalError, TimeoutError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app import database, models
+from app.config import settings
+from app.poolMetrics import PoolMetrics
+from app.errorSink import ErrorSink, error_sink, flush_errors, fingerprint
+from app.periodic import run_periodically
+
+
+def raised(error):
+    """The error with a traceback, as the handlers catch it"""
+    try:
+        raise error
+    except Exception as e:
+        return e
+
+
+def duplicate_email(email):
+    return raised(IntegrityError(
+        "INSERT INTO users (email) VALUES (%(email)s)",
+        {"email": email},
+        Exception(f'duplicate key value violates unique constraint "users_email_key"\nDETAIL: Key (email)=({email}) already exists.'),
+    ))
+
+
+def test_fingerprint_ignores_values_and_parameters():
+    assert fingerprint(duplicate_email("a@example.com")) == fingerprint(duplicate_email("b@example.com"))
+    assert fingerprint(raised(ValueError("task 12 not found"))) == fingerprint(raised(ValueError("task 345 not found")))
+
+    assert fingerprint(raised(ValueError("task 12 not found"))) != fingerprint(raised(KeyError("task 12 not found")))
+    assert fingerprint(duplicate_email("a@example.com")) != fingerprint(raised(OperationalError("SELECT 1", {}, Exception("server closed the connection"))))
+
+
+def test_record_counts_duplicates():
+    sink = ErrorSink(max_pending=10)
+
+    for i in range(3):
+        sink.record(raised(ValueError(f"task {i} not found")))
+    sink.record(raised(KeyError("state")))
+
+    counts = sorted(entry["count"] for entry in sink.pending.values())
+    assert counts == [1, 3]
+
+
+def test_record_drops_new_errors_when_full(caplog):
+    sink = ErrorSink(max_pending=1)
+    sink.record(raised(ValueError("first")))
+
+    with caplog.at_level(logging.ERROR, logger="app.errorSink"):
+        sink.record(raised(KeyError("second")))
+    sink.record(raised(ValueError("first")))
+
+    assert [entry["count"] for entry in sink.pending.values()] == [2]
+    assert sink.stats() == {"pending": 1, "dropped": 1}
+    assert "not stored: 'second'" in caplog.text
+
+
+def test_failing_request_leaves_the_database_alone(client, db_session):
+    with patch("app.routers.task.update_task_stats", AsyncMock(side_effect=raised(OperationalError("UPDATE task_stats", {}, Exception("too many connections"))))):
+        for _ in range(2):
+            assert client.post("/task/", json={"title": "Task"}).json()["status"] == 400
+
+    assert db_session.query(models.Error).count() == 0
+    assert [entry["count"] for entry in error_sink.pending.values()] == [2]
+
+
+@pytest.mark.asyncio
+async def test_flush_upserts_by_fingerprint(async_db_session, db_session):
+    sink = ErrorSink(max_pending=10)
+    sink.record(duplicate_email("a@example.com"))
+    sink.record(duplicate_email("b@example.com"))
+    assert await sink.flush(async_db_session) == 1
+
+    sink.record(duplicate_email("c@example.com"))
+    stored = db_session.query(models.Error).one()
+    created_on, last_seen = stored.created_on, stored.last_seen
+    assert await sink.flush(async_db_session) == 1
+    assert await sink.flush(async_db_session) == 0
+
+    error = db_session.query(models.Error).one()
+    assert error.count == 3
+    assert "a@example.com" in error.error
+    assert error.created_on == created_on
+    assert error.last_seen > last_seen
+
+
+@pytest.mark.asyncio
+async def test_flush_logs_the_errors_when_the_database_is_down(caplog):
+    sink = ErrorSink(max_pending=10)
+    sink.record(raised(ValueError("task 1 not found")))
+    sink.record(raised(ValueError("task 2 not found")))
+    db = MagicMock(execute=AsyncMock(side_effect=OperationalError("INSERT INTO errors", {}, Exception("connection refused"))), rollback=AsyncMock())
+
+    with caplog.at_level(logging.ERROR, logger="app.errorSink"):
+        assert await sink.flush(db) == 0
+
+    db.rollback.assert_awaited_once()
+    assert "could not store 1 errors" in caplog.text
+    assert "task 1 not found (x2" in caplog.text
+    assert sink.pending == {}
+
+
+@pytest.mark.asyncio
+async def test_flusher_stores_the_recorded_errors(async_session_factory, db_session):
+    sleep = AsyncMock()
+    error_sink.record(raised(ValueError("task 1 not found")))
+
+    await run_periodically(5, partial(flush_errors, async_session_factory), sleep=sleep, runs=1)
+
+    sleep.assert_awaited_once_with(5)
+    assert [error.error for error in db_session.query(models.Error)] == ["task 1 not found"]
+
+
+@pytest.mark.asyncio
+async def test_failing_run_is_recorded_and_the_next_one_still_happens():
+    sleep = AsyncMock()
+    run = AsyncMock(side_effect=[raised(ValueError("task 1 not found")), None])
+
+    await run_periodically(5, run, sleep=sleep, runs=2)
+
+    assert run.await_count == 2
+    assert [entry["error"] for entry in error_sink.pending.values()] == ["task 1 not found"]
+
+
+@pytest.mark.asyncio
+async def test_errors_are_stored_while_the_request_pool_is_exhausted(test_async_engine, db_session):
+    requests_engine = database.build_async_engine(test_async_engine.url, PoolMetrics(), pool_size=1, max_overflow=0, pool_timeout=0.1)
+    errors_engine = database.build_async_engine(test_async_engine.url, PoolMetrics(), pool_size=1, max_overflow=0, pool_timeout=0.1)
+    error_sink.clear()
+    error_sink.record(raised(ValueError("too many connections")))
+
+    async with requests_engine.connect():
+        with pytest.raises(TimeoutError):
+            async with requests_engine.connect():
+                pass
+        await flush_errors(async_sessionmaker(bind=errors_engine, class_=AsyncSession))
+
+    await requests_engine.dispose()
+    await errors_engine.dispose()
+    assert [error.error for error in db_session.query(models.Error)] == ["too many connections"]
+
+
+def test_error_flusher_has_its_own_single_connection_pool():
+    assert database.ErrorSessionLocal.kw["bind"] is database.error_engine
+    assert database.error_engine is not database.async_engine
+    assert database.error_engine.pool.size() == 1
+    assert database.error_engine.pool.timeout() == settings.error_flush_timeout_seconds
@@ -0,0 +1,85 @@
+import pytest
+from fastapi import status
+from sqlalchemy import create_engine, exc, text
+from sqlalchemy.pool import QueuePool
+
+from app.config import settings
+from app.database import engine, async_engine
+from app.poolMetrics import PoolMetrics, metered_pool, pool_status
+
+
+@pytest.fixture
+def small_pool(test_engine):
+    """An engine with a single connection and no overflow"""
+    metrics = PoolMetrics()
+    _engine = create_engine(
+        test_engine.url,
+        poolclass=metered_pool(QueuePool, metrics),
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.1,
+    )
+    yield _engine, metrics
+    _engine.dispose()
+
+
+def test_engines_use_pool_settings():
+    for _engine in (engine, async_engine):
+        assert _engine.pool.size() == settings.database_pool_size
+        assert _engine.pool.timeout() == settings.database_pool_timeout
+
+
+def test_checkouts_are_counted(small_pool):
+    _engine, metrics = small_pool
+
+    for _ in range(3):
+        with _engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+
+    stats = metrics.stats()
+    assert stats["checkouts"] == 3
+    assert stats["timeouts"] == 0
+    assert stats["wait_seconds_buckets"]["+Inf"] == 3
+
+
+def test_exhausted_pool_records_timeouts(small_pool):
+    _engine, metrics = small_pool
+
+    with _engine.connect():
+        status_while_busy = pool_status(_engine, metrics)
+        with pytest.raises(exc.TimeoutError):
+            _engine.connect()
+
+    stats = pool_status(_engine, metrics)
+    assert status_while_busy["checked_out"] == 1
+    assert status_while_busy["overflow"] == 0
+    assert stats["checked_out"] == 0
+    assert stats["checked_in"] == 1
+    assert stats["timeouts"] == 1
+    assert stats["wait_seconds_buckets"]["0.1"] == 1
+    assert stats["wait_seconds_buckets"]["+Inf"] == 2
+
+
+def test_pool_survives_dispose(small_pool):
+    _engine, metrics = small_pool
+
+    _engine.dispose()
+    with _engine.connect():
+        pass
+
+    assert metrics.stats()["checkouts"] == 1
+
+
+def test_metrics_endpoint(client):
+    data = client.get("/metrics/").json()
+
+    assert data["status"] == status.HTTP_200_OK
+    for pool in data["data"]["database"].values():
+        assert {"size", "checked_in", "checked_out", "overflow", "checkouts", "timeouts"} <= pool.keys()
+    assert {"hits", "misses"} <= data["data"]["user_cache"].keys()
+
+
+def test_metrics_endpoint_requires_authentication(unauthenticated_client):
+    response = unauthenticated_client.get("/metrics/")
+
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
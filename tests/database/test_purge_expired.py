@@ -0,0 +1,115 @@
+from datetime import datetime, timedelta, timezone
+import pytest
+from functools import partial
+from unittest.mock import AsyncMock, patch
+
+from app import cli, enums, models
+from app.config import settings
+from app.maintenance import purge_expired, run_purge
+from app.periodic import run_periodically
+from app.tokenBlacklist import token_digest
+
+NOW = datetime(2030, 1, 1, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def aged_rows(db_session):
+    """One expired and one live row in each purged table, with ages relative to NOW"""
+    token_lifetime = timedelta(minutes=settings.access_token_expire_min)
+    codes_lifetime = timedelta(days=settings.confirmation_code_retention_days)
+    errors_lifetime = timedelta(days=settings.error_retention_days)
+    emails_lifetime = timedelta(days=settings.email_outbox_retention_days)
+    for age, suffix in ((timedelta(seconds=1), "expired"), (-timedelta(seconds=1), "live")):
+        db_session.add_all([
+            models.JWTblacklist(jti_digest=token_digest(f"token-{suffix}"), expired_on=NOW - age),
+            models.ResetCode(email="user@example.com", reset_code=f"reset-{suffix}", status=enums.CodeStatus.Pending, created_on=NOW - token_lifetime - age),
+            models.ConfirmationCode(email="user@example.com", code=f"confirm-{suffix}", status=enums.CodeStatus.Pending, created_on=NOW - codes_lifetime - age),
+            models.Error(error=f"error-{suffix}", last_seen=NOW - errors_lifetime - age),
+            models.EmailOutbox(subject=f"email-{suffix}", recipients=["user@example.com"], template=enums.EmailTemplate.ConfirmAccount, status=enums.EmailStatus.Sent, created_on=NOW - emails_lifetime - age),
+        ])
+    # pending emails are kept whatever their age
+    db_session.add(models.EmailOutbox(subject="email-pending", recipients=["user@example.com"], template=enums.EmailTemplate.ConfirmAccount, created_on=NOW - timedelta(days=365)))
+    db_session.commit()
+
+
+def remaining(db_session):
+    return (
+        [row.jti_digest for row in db_session.query(models.JWTblacklist)],
+        [row.reset_code for row in db_session.query(models.ResetCode)],
+        [row.code for row in db_session.query(models.ConfirmationCode)],
+        [row.error for row in db_session.query(models.Error)],
+        sorted(row.subject for row in db_session.query(models.EmailOutbox)),
+    )
+
+
+@pytest.mark.asyncio
+async def test_purge_expired_deletes_only_expired_rows(async_db_session, db_session, aged_rows):
+    purged = await purge_expired(async_db_session, NOW)
+
+    assert purged == {"JWT_blacklist": 1, "reset_codes": 1, "confirmation_codes": 1, "errors": 1, "email_outbox": 1, "task_tombstones": 0}
+    assert remaining(db_session) == ([token_digest("token-live")], ["reset-live"], ["confirm-live"], ["error-live"], ["email-live", "email-pending"])
+
+
+@pytest.mark.asyncio
+async def test_blacklist_rows_without_expired_on_are_purged_after_a_token_lifetime(async_db_session, db_session):
+    token_lifetime = timedelta(minutes=settings.access_token_expire_min)
+    for age, suffix in ((timedelta(seconds=1), "expired"), (-timedelta(seconds=1), "live")):
+        db_session.add(models.JWTblacklist(jti_digest=token_digest(f"token-{suffix}"), created_on=NOW - token_lifetime - age))
+    db_session.commit()
+
+    purged = await purge_expired(async_db_session, NOW)
+
+    assert purged["JWT_blacklist"] == 1
+    assert [row.jti_digest for row in db_session.query(models.JWTblacklist)] == [token_digest("token-live")]
+
+
+@pytest.mark.asyncio
+async def test_purge_expired_deletes_in_batches(async_db_session, db_session):
+    db_session.add_all(models.Error(error=f"error {i}", last_seen=NOW - timedelta(days=365)) for i in range(5))
+    db_session.commit()
+
+    with patch.object(async_db_session, "commit", wraps=async_db_session.commit) as commit:
+        purged = await purge_expired(async_db_session, NOW, batch_size=2)
+
+    assert purged["errors"] == 5
+    # 3 batches for the errors, 1 empty batch for each other table
+    assert commit.call_count == 8
+    assert db_session.query(models.Error).count() == 0
+
+
+@pytest.mark.asyncio
+async def test_purge_scheduler_runs_on_the_fake_clock(async_session_factory, db_session, aged_rows):
+    sleep = AsyncMock()
+    clock = iter([NOW - timedelta(days=365), NOW])
+
+    await run_periodically(60, partial(run_purge, async_session_factory, clock=lambda: next(clock)), sleep=sleep, runs=2)
+
+    assert sleep.await_count == 2
+    sleep.assert_awaited_with(60)
+    assert remaining(db_session) == ([token_digest("token-live")], ["reset-live"], ["confirm-live"], ["error-live"], ["email-live", "email-pending"])
+
+
+@pytest.mark.asyncio
+async def test_purged_tombstones_raise_the_purged_seq(async_db_session, db_session, test_user):
+    tombstones_lifetime = timedelta(days=settings.tombstone_retention_days)
+    db_session.add(models.TaskVersion(user_id=test_user.id, version=5))
+    db_session.add_all([
+        models.TaskTombstone(task_id=1, user_id=test_user.id, change_seq=2, deleted_on=NOW - tombstones_lifetime - timedelta(days=1)),
+        models.TaskTombstone(task_id=2, user_id=test_user.id, change_seq=3, deleted_on=NOW - tombstones_lifetime - timedelta(seconds=1)),
+        models.TaskTombstone(task_id=3, user_id=test_user.id, change_seq=5, deleted_on=NOW - tombstones_lifetime + timedelta(seconds=1)),
+    ])
+    db_session.commit()
+
+    purged = await purge_expired(async_db_session, NOW, batch_size=1)
+
+    assert purged["task_tombstones"] == 2
+    assert [tombstone.task_id for tombstone in db_session.query(models.TaskTombstone)] == [3]
+    assert db_session.get(models.TaskVersion, test_user.id).tombstones_purged_seq == 3
+
+
+def test_cli_reports_rows_purged(capsys):
+    with patch("app.cli.purge", AsyncMock(return_value={"JWT_blacklist": 3, "errors": 0})) as purge:
+        cli.main(["purge-expired", "--batch-size", "50"])
+
+    purge.assert_awaited_once_with(50)
+    assert capsys.readouterr().out.splitlines() == ["JWT_blacklist: 3 rows purged", "errors: 0 rows purged"]
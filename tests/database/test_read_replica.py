@@ -0,0 +1,152 @@
+import time
+import pytest
+from unittest.mock import MagicMock
+from fastapi import status
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+
+from app.config import settings
+from app.database import LAST_WRITE_COOKIE, LAST_WRITE_HEADER, get_read_db, wrote_recently
+from app.main import app
+from app import models
+
+
+def make_request(headers=None, cookies=None):
+    request = MagicMock()
+    request.headers = headers or {}
+    request.cookies = cookies or {}
+    return request
+
+
+@pytest.mark.parametrize("header, cookie, expected", [
+    (None, None, False),
+    (0, None, True),
+    (None, 0, True),
+    (None, -settings.read_your_writes_seconds - 1, False),
+    ("not a time", None, False),
+])
+def test_wrote_recently(header, cookie, expected):
+    """header and cookie are seconds from now"""
+    def last_write(value):
+        return value if isinstance(value, str) else str(time.time() + value)
+
+    headers = {} if header is None else {LAST_WRITE_HEADER: last_write(header)}
+    cookies = {} if cookie is None else {LAST_WRITE_COOKIE: last_write(cookie)}
+    assert wrote_recently(make_request(headers, cookies)) is expected
+
+
+class TestReadReplicaRouting:
+    """Test GET endpoints read from the replica, unless the client has just written"""
+
+    @pytest.fixture
+    def replica(self, client, test_async_engine, async_session_factory, monkeypatch):
+        """A read only stand-in for the replica, on the test database"""
+        replica_engine = create_async_engine(
+            test_async_engine.url,
+            poolclass=NullPool,
+            connect_args={"server_settings": {"default_transaction_read_only": "on"}},
+        )
+        statements = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(replica_engine.sync_engine, "before_cursor_execute", capture)
+        monkeypatch.setattr("app.database.AsyncSessionLocal", async_session_factory)
+        monkeypatch.setattr("app.database.AsyncReadSessionLocal", async_sessionmaker(
+            autoflush=False, expire_on_commit=False, bind=replica_engine, class_=AsyncSession
+        ))
+        app.dependency_overrides.pop(get_read_db)
+        yield statements
+        event.remove(replica_engine.sync_engine, "before_cursor_execute", capture)
+
+    @pytest.mark.parametrize("url", ["/task/", "/task/stats/summary", "/users/"])
+    def test_reads_go_to_replica(self, client, replica, url):
+        data = client.get(url).json()
+
+        assert data["status"] == status.HTTP_200_OK
+        assert replica
+
+    def test_get_task_reads_from_replica(self, client, db_session, test_user, replica):
+        task = models.Task(title="Replicated", user_id=test_user.id)
+        db_session.add(task)
+        db_session.commit()
+
+        data = client.get(f"/task/{task.id}").json()
+
+        assert data["title"] == "Replicated"
+        assert replica
+
+    def test_reads_stick_to_primary_after_a_write(self, client, replica):
+        response = client.post("/task/", json={"title": "Fresh task"})
+        assert LAST_WRITE_HEADER in response.headers
+        assert LAST_WRITE_COOKIE in response.cookies
+
+        data = client.get("/task/").json()
+
+        assert [task["title"] for task in data["list"]] == ["Fresh task"]
+        assert not replica
+
+    def test_write_header_sticks_to_primary(self, client, replica):
+        last_write = client.post("/task/", json={"title": "Fresh task"}).headers[LAST_WRITE_HEADER]
+        client.cookies.clear()
+
+        client.get("/task/", headers={LAST_WRITE_HEADER: last_write})
+        assert not replica
+
+        client.get("/task/")
+        assert replica
+
+
+class TestLaggingReplica:
+    """Test GET /task/changes never pages past what a lagging replica has replayed"""
+
+    @pytest.fixture
+    def lagging_replica(self, client, test_engine, test_async_engine, async_session_factory, monkeypatch):
+        """A replica stand-in that keeps seeing the database as it was when the fixture started"""
+        holder = test_engine.connect().execution_options(isolation_level="REPEATABLE READ")
+        holder.begin()
+        snapshot = holder.scalar(text("SELECT pg_export_snapshot()"))
+        replica_engine = create_async_engine(
+            test_async_engine.url,
+            poolclass=NullPool,
+            execution_options={"isolation_level": "REPEATABLE READ"},
+        )
+        class ReplicaSession(Session):
+            pass
+
+        replica_sessions = async_sessionmaker(
+            autoflush=False, expire_on_commit=False, bind=replica_engine, class_=AsyncSession, sync_session_class=ReplicaSession
+        )
+        statements = []
+
+        @event.listens_for(ReplicaSession, "after_begin")
+        def read_the_snapshot(session, transaction, connection):
+            connection.exec_driver_sql(f"SET TRANSACTION SNAPSHOT '{snapshot}'")
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(replica_engine.sync_engine, "before_cursor_execute", capture)
+        monkeypatch.setattr("app.database.AsyncSessionLocal", async_session_factory)
+        monkeypatch.setattr("app.database.AsyncReadSessionLocal", replica_sessions)
+        app.dependency_overrides.pop(get_read_db)
+        yield statements
+        event.remove(replica_engine.sync_engine, "before_cursor_execute", capture)
+        holder.rollback()
+        holder.close()
+
+    def test_changes_fall_back_to_the_primary_when_the_replica_lags(self, client, lagging_replica):
+        created = client.post("/task/bulk", json=[{"title": f"Task {i}"} for i in range(4)]).json()["list"]
+        first_page = client.get("/task/changes", params={"page_size": 2}).json()
+        assert not any("task_versions" in statement for statement in lagging_replica)
+
+        client.cookies.clear()
+        last_page = client.get("/task/changes", params={"cursor": first_page["next_cursor"], "page_size": 2}).json()
+
+        assert [task["id"] for task in first_page["tasks"] + last_page["tasks"]] == [task["id"] for task in created]
+        assert last_page["next_cursor"] is None
+        assert last_page["since"] == 1
+        assert any("task_versions" in statement for statement in lagging_replica)
@@ -0,0 +1,117 @@
+import asyncio
+import re
+import threading
+import pytest
+from pydantic import ValidationError
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import NullPool
+
+from app.config import Settings, settings
+from app.database import TRANSACTION_POOLING, build_engine, build_async_engine
+from app.poolMetrics import PoolMetrics
+
+
+class CountingProxy:
+    """A TCP proxy counting the client connections opened through it.
+    Each one gets a server connection of its own, it does not multiplex transactions like PgBouncer."""
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self.open_connections = 0
+        self.total_connections = 0
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+
+    async def pipe(self, reader, writer):
+        try:
+            while data := await reader.read(65536):
+                writer.write(data)
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def handle(self, client_reader, client_writer):
+        self.open_connections += 1
+        self.total_connections += 1
+        server_reader, server_writer = await asyncio.open_connection(self.host, self.port)
+        await asyncio.gather(
+            self.pipe(client_reader, server_writer),
+            self.pipe(server_reader, client_writer),
+        )
+        self.open_connections -= 1
+
+    def start(self):
+        self.thread.start()
+        self.server = asyncio.run_coroutine_threadsafe(
+            asyncio.start_server(self.handle, "127.0.0.1", 0), self.loop
+        ).result()
+        return self.server.sockets[0].getsockname()[1]
+
+    def wait_until_closed(self, timeout: float = 2):
+        """Wait for the proxied connections to close, their teardown runs on the proxy thread"""
+        for _ in range(int(timeout / 0.01)):
+            if not self.open_connections:
+                break
+            threading.Event().wait(0.01)
+        return self.open_connections
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.server.close)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+
+
+@pytest.fixture
+def proxy(test_engine):
+    _proxy = CountingProxy(settings.database_hostname, int(settings.database_port))
+    port = _proxy.start()
+    url = make_url(test_engine.url).set(host="127.0.0.1", port=port)
+    yield _proxy, url
+    _proxy.stop()
+
+
+def test_transaction_pooling_uses_a_null_pool(proxy):
+    _proxy, url = proxy
+    _engine = build_engine(url, PoolMetrics(), TRANSACTION_POOLING)
+
+    for _ in range(3):
+        with _engine.connect() as connection:
+            assert connection.execute(text("SELECT 1")).scalar() == 1
+
+    assert isinstance(_engine.pool, NullPool)
+    assert _proxy.total_connections == 3
+    assert _proxy.wait_until_closed() == 0
+
+
+@pytest.mark.asyncio
+async def test_transaction_pooling_disables_the_statement_caches(proxy):
+    _proxy, url = proxy
+    metrics = PoolMetrics()
+    _engine = build_async_engine(url.set(drivername="postgresql+asyncpg"), metrics, TRANSACTION_POOLING)
+
+    async def run_transaction(value: int):
+        async with _engine.connect() as connection:
+            # with the statement caches off, asyncpg names every prepared statement uniquely
+            first = (await connection.execute(text("SELECT CAST(:value AS INTEGER)"), {"value": value})).scalar()
+            second = (await connection.execute(text("SELECT CAST(:value AS INTEGER)"), {"value": value})).scalar()
+            names = (await connection.execute(text("SELECT name FROM pg_prepared_statements"))).scalars().all()
+            return first, second, names
+
+    results = await asyncio.gather(*[run_transaction(value) for value in range(20)])
+
+    for value, (first, second, names) in enumerate(results):
+        assert first == second == value
+        assert all(re.fullmatch(r"__asyncpg_[0-9a-f-]{36}__", name) for name in names)
+    assert isinstance(_engine.pool, NullPool)
+    assert all(names for _, _, names in results)
+    assert metrics.stats()["checkouts"] == _proxy.total_connections == 20
+    assert _proxy.wait_until_closed() == 0
+    await _engine.dispose()
+
+
+def test_unknown_pooling_mode_is_rejected():
+    with pytest.raises(ValidationError):
+        Settings(database_pooling_mode="statement")
@@ -0,0 +1,155 @@
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+import pytest
+from functools import partial
+from unittest.mock import AsyncMock, patch
+
+from app import enums, models
+from app.config import settings
+from app.emailOutbox import deliver_emails, drain_outbox
+from app.periodic import run_periodically
+from app.routers import emailUtil
+from app.routers.emailUtil import queue_email
+
+NOW = datetime(2030, 1, 1, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def mailer():
+    """Records the messages handed to the mail client, set error to fail every send"""
+    mailer = SimpleNamespace(sent=[], error=None)
+
+    async def send_messages(messages):
+        mailer.sent.extend(messages)
+        return [mailer.error] * len(messages)
+
+    with patch.object(emailUtil.mail_client, "send_messages", send_messages):
+        yield mailer
+
+
+@pytest.fixture
+def queued_email(db_session):
+    email = models.EmailOutbox(
+        subject="Reset Password",
+        recipients=["user@example.com"],
+        template=enums.EmailTemplate.ResetPassword,
+        email="user@example.com",
+        code="reset-code",
+        next_attempt_on=NOW,
+    )
+    db_session.add(email)
+    db_session.commit()
+    return email
+
+
+def reload(db_session, email):
+    db_session.expire_all()
+    return db_session.get(models.EmailOutbox, email.id)
+
+
+@pytest.mark.asyncio
+async def test_deliver_emails_sends_and_marks_sent(async_db_session, db_session, queued_email, mailer):
+    delivered = await deliver_emails(async_db_session, NOW)
+
+    assert delivered == {"sent": 1, "failed": 0}
+    [message] = mailer.sent
+    assert message.subject == "Reset Password"
+    assert message.recipients == ["user@example.com"]
+    assert "reset-code" in message.body
+    email = reload(db_session, queued_email)
+    assert email.status == enums.EmailStatus.Sent
+    assert email.attempts == 1
+    assert email.sent_on == NOW.replace(tzinfo=None)
+
+
+@pytest.mark.asyncio
+async def test_deliver_emails_skips_emails_not_due(async_db_session, queued_email, mailer):
+    delivered = await deliver_emails(async_db_session, NOW - timedelta(seconds=1))
+
+    assert delivered == {"sent": 0, "failed": 0}
+    assert mailer.sent == []
+
+
+@pytest.mark.asyncio
+async def test_failed_emails_are_retried_with_backoff(async_db_session, db_session, queued_email, mailer):
+    mailer.error = ConnectionError("smtp down")
+    now = NOW
+    for attempt in range(1, settings.email_max_attempts + 1):
+        assert await deliver_emails(async_db_session, now) == {"sent": 0, "failed": 1}
+        email = reload(db_session, queued_email)
+        assert email.attempts == attempt
+        assert email.last_error == "smtp down"
+
+        delay = timedelta(seconds=settings.email_retry_base_seconds * 2 ** (attempt - 1))
+        assert email.next_attempt_on == (now + delay).replace(tzinfo=None)
+        assert await deliver_emails(async_db_session, now + delay - timedelta(seconds=1)) == {"sent": 0, "failed": 0}
+        now += delay
+
+    assert email.status == enums.EmailStatus.Failed
+    assert await deliver_emails(async_db_session, now + timedelta(days=365)) == {"sent": 0, "failed": 0}
+
+
+@pytest.mark.asyncio
+async def test_email_that_fails_to_build_does_not_hold_back_the_batch(async_db_session, db_session, queued_email, mailer):
+    broken = models.EmailOutbox(
+        subject="Broken",
+        recipients=["broken@example.com"],
+        template=enums.EmailTemplate.ResetPassword,
+        email="broken@example.com",
+        code="broken-code",
+        next_attempt_on=NOW,
+    )
+    db_session.add(broken)
+    db_session.commit()
+    build_email = emailUtil.build_email
+
+    def build_or_fail(subject, *args, **kwargs):
+        if subject == "Broken":
+            raise ValueError("template missing")
+        return build_email(subject, *args, **kwargs)
+
+    with patch.object(emailUtil, "build_email", build_or_fail):
+        assert await deliver_emails(async_db_session, NOW) == {"sent": 1, "failed": 1}
+
+    assert [message.subject for message in mailer.sent] == ["Reset Password"]
+    assert reload(db_session, queued_email).status == enums.EmailStatus.Sent
+    broken = reload(db_session, broken)
+    assert broken.status == enums.EmailStatus.Pending
+    assert broken.last_error == "template missing"
+    assert broken.next_attempt_on > NOW.replace(tzinfo=None)
+
+
+@pytest.mark.asyncio
+async def test_email_worker_drains_every_batch(async_session_factory, db_session, mailer):
+    for i in range(5):
+        queue_email("Account Confirmation", [f"user{i}@example.com"], enums.EmailTemplate.ConfirmAccount, f"user{i}@example.com", str(i), db_session)
+    db_session.commit()
+    sleep = AsyncMock()
+
+    with patch.object(settings, "email_batch_size", 2):
+        await run_periodically(5, partial(drain_outbox, async_session_factory), sleep=sleep, runs=1)
+
+    assert len(mailer.sent) == 5
+    sleep.assert_awaited_once_with(5)
+    assert db_session.query(models.EmailOutbox).filter(models.EmailOutbox.status == enums.EmailStatus.Sent).count() == 5
+
+
+def test_create_user_queues_the_confirmation_email(unauthenticated_client, db_session, mailer):
+    response = unauthenticated_client.post(
+        "/users/",
+        json={
+            "email": "new@example.com",
+            "first_name": "New",
+            "last_name": "User",
+            "password": "Password123",
+            "confirm_password": "Password123"
+        }
+    )
+
+    assert response.json()["status"] == 201
+    assert mailer.sent == []
+    code = db_session.query(models.ConfirmationCode).one()
+    queued = db_session.query(models.EmailOutbox).one()
+    assert queued.template == enums.EmailTemplate.ConfirmAccount
+    assert queued.recipients == ["new@example.com"]
+    assert queued.code == code.code
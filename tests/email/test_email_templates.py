@@ -0,0 +1,55 @@
+import pytest
+from unittest.mock import patch
+
+from app import emailTemplates
+from app.emailTemplates import render_email, render_many, static_fragments, templates
+from app.enums import EmailTemplate
+
+
+@pytest.fixture
+def fresh_fragments():
+    static_fragments.cache_clear()
+    yield
+    static_fragments.cache_clear()
+
+
+def full_render(email_template, email, code, subject, msg=""):
+    template = emailTemplates.env.get_template(emailTemplates.file_per_template[email_template])
+    return template.render(name=emailTemplates.recipient_name(email), code=code, subject=subject, message=msg)
+
+
+def test_templates_are_compiled_at_startup():
+    assert set(templates) == {EmailTemplate.ResetPassword, EmailTemplate.ConfirmAccount}
+
+    with patch.object(emailTemplates.env.loader, "get_source", side_effect=AssertionError("template reloaded")):
+        assert "reset_code=abc" in render_many(EmailTemplate.ResetPassword, [("user@example.com", "abc")], "Reset Password")[0]
+
+
+@pytest.mark.parametrize("email_template", [EmailTemplate.ResetPassword, EmailTemplate.ConfirmAccount])
+def test_render_many_matches_a_full_render(fresh_fragments, email_template):
+    recipients = [("user@example.com", "code-1"), ("<b>admin</b>@example.com", 'a"&<code>'), ("", None)]
+
+    html = render_many(email_template, recipients, "Subject")
+
+    assert html == [full_render(email_template, email, code, "Subject") for email, code in recipients]
+    assert "&lt;b&gt;admin&lt;/b&gt;" in html[1]
+
+
+def test_templates_using_fields_in_logic_are_rendered_per_recipient(fresh_fragments):
+    template = emailTemplates.env.from_string("{% if code %}Code: {{ code|upper }}{% else %}No code{% endif %} for {{ name }}")
+
+    with patch.dict(templates, {EmailTemplate.PayslipsMail: template}):
+        assert static_fragments(EmailTemplate.PayslipsMail, "Payslip", "") is None
+        html = render_many(EmailTemplate.PayslipsMail, [("user@example.com", "abc"), ("other@example.com", "")], "Payslip")
+
+    assert html == ["Code: ABC for user", "No code for other"]
+
+
+def test_render_many_matches_rendering_each_email_and_reuses_the_fragments(fresh_fragments):
+    recipients = [(f"user{i}@example.com", f"code-{i}") for i in range(100)]
+
+    html = render_many(EmailTemplate.ConfirmAccount, recipients, "Account Confirmation")
+    assert (static_fragments.cache_info().hits, static_fragments.cache_info().misses) == (0, 1)
+
+    assert html == [render_email(EmailTemplate.ConfirmAccount, email, code, "Account Confirmation") for email, code in recipients]
+    assert (static_fragments.cache_info().hits, static_fragments.cache_info().misses) == (len(recipients), 1)
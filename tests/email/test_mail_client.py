@@ -0,0 +1,230 @@
+import asyncio
+import socket
+import time
+from email import message_from_bytes, policy
+from io import BytesIO
+import aiosmtplib
+import pytest
+from aiosmtpd.controller import Controller
+from fastapi import UploadFile
+from fastapi_mail import ConnectionConfig, FastMail, MessageSchema
+from pydantic import SecretStr
+from starlette.datastructures import Headers
+
+from app.mailClient import MailClient, SMTPPool
+
+
+class RecordingHandler:
+    """Fake SMTP server handler counting sessions and keeping every delivered message"""
+    def __init__(self):
+        self.sessions = 0
+        self.messages = []
+        self.refused = set()
+        self.servers = []
+        self.data_commands = 0
+        self.drop_on_data = False
+        self.handshake_delay = 0
+
+    async def drop_connections(self):
+        for server in self.servers:
+            server.transport.close()
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        self.sessions += 1
+        self.servers.append(server)
+        await asyncio.sleep(self.handshake_delay)
+        session.host_name = hostname
+        return responses
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address in self.refused:
+            return "550 mailbox unavailable"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        self.data_commands += 1
+        if self.drop_on_data:
+            self.drop_on_data = False
+            server.transport.close()
+            return "421 closing connection"
+        self.messages.append(envelope)
+        return "250 Message accepted for delivery"
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def smtp_server():
+    handler = RecordingHandler()
+    controller = Controller(handler, hostname="127.0.0.1", port=free_port())
+    controller.start()
+    yield controller, handler
+    controller.stop()
+
+
+@pytest.fixture
+def mail_config(smtp_server):
+    controller, _ = smtp_server
+    return ConnectionConfig(
+        MAIL_USERNAME="",
+        MAIL_PASSWORD="",
+        MAIL_FROM="noreply@example.com",
+        MAIL_PORT=controller.port,
+        MAIL_SERVER="127.0.0.1",
+        MAIL_STARTTLS=False,
+        MAIL_SSL_TLS=False,
+        USE_CREDENTIALS=False,
+        VALIDATE_CERTS=False,
+    )
+
+
+def make_messages(count, recipient="user{}@example.com"):
+    return [
+        MessageSchema(subject=f"Message {i}", recipients=[recipient.format(i)], body="<p>hello</p>", subtype="html")
+        for i in range(count)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_send_messages_reuses_pooled_connections(smtp_server, mail_config):
+    _, handler = smtp_server
+    client = MailClient(mail_config, pool_size=3)
+
+    errors = await client.send_messages(make_messages(30))
+    errors += await client.send_messages(make_messages(30))
+    await client.close()
+
+    assert errors == [None] * 60
+    assert len(handler.messages) == 60
+    assert client.pool.connections_opened == 3
+    assert handler.sessions == 3
+
+
+@pytest.mark.asyncio
+async def test_sent_message_has_the_headers_body_and_attachments(smtp_server, mail_config):
+    _, handler = smtp_server
+    client = MailClient(mail_config, pool_size=1)
+    attachment = UploadFile(BytesIO(b"report"), filename="report.txt", headers=Headers({"content-type": "text/plain"}))
+
+    await client.send_message(MessageSchema(
+        subject="Report", recipients=["user@example.com"], cc=["copy@example.com"], bcc=["hidden@example.com"],
+        body="<p>hello</p>", subtype="html", attachments=[attachment],
+    ))
+    await client.close()
+
+    [envelope] = handler.messages
+    assert sorted(envelope.rcpt_tos) == ["copy@example.com", "hidden@example.com", "user@example.com"]
+    sent = message_from_bytes(envelope.content, policy=policy.default)
+    assert sent["Subject"] == "Report"
+    assert sent["From"] == "noreply@example.com"
+    assert sent["To"] == "user@example.com"
+    assert sent["Bcc"] is None
+    assert sent.get_body(("html",)).get_content().strip() == "<p>hello</p>"
+    [part] = sent.iter_attachments()
+    assert (part.get_filename(), part.get_content_type(), part.get_content()) == ("report.txt", "text/plain", "report")
+
+
+@pytest.mark.asyncio
+async def test_refused_message_does_not_fail_the_batch(smtp_server, mail_config):
+    _, handler = smtp_server
+    handler.refused.add("user1@example.com")
+    client = MailClient(mail_config, pool_size=1)
+
+    errors = await client.send_messages(make_messages(3))
+    await client.close()
+
+    assert errors[0] is None and errors[2] is None
+    assert errors[1] is not None
+    assert len(handler.messages) == 2
+    assert client.pool.connections_opened == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_login_closes_the_connection(smtp_server, mail_config):
+    controller, _ = smtp_server
+    config = mail_config.model_copy(update={"USE_CREDENTIALS": True, "MAIL_USERNAME": "user", "MAIL_PASSWORD": SecretStr("wrong")})
+    pool = SMTPPool(config, size=1)
+    smtp = aiosmtplib.SMTP(hostname="127.0.0.1", port=controller.port)
+
+    with pytest.raises(aiosmtplib.SMTPException):
+        await pool.open(smtp)
+
+    assert not smtp.is_connected
+    assert pool.connections_opened == 0
+
+
+@pytest.mark.asyncio
+async def test_pool_replaces_closed_connections(smtp_server, mail_config):
+    _, handler = smtp_server
+    client = MailClient(mail_config, pool_size=1)
+    await client.send_message(make_messages(1)[0])
+
+    for smtp in client.pool.idle:
+        smtp.close()
+    await client.send_message(make_messages(1)[0])
+    await client.close()
+
+    assert len(handler.messages) == 2
+    assert client.pool.connections_opened == 2
+
+
+@pytest.mark.asyncio
+async def test_connection_dropped_while_idle_is_replaced_before_sending(smtp_server, mail_config):
+    controller, handler = smtp_server
+    client = MailClient(mail_config, pool_size=1)
+    client.pool.check_after = 0
+    await client.send_message(make_messages(1)[0])
+
+    await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(handler.drop_connections(), controller.loop))
+    errors = await client.send_messages(make_messages(1))
+    await client.close()
+
+    assert errors == [None]
+    assert len(handler.messages) == 2
+    assert client.pool.connections_opened == 2
+
+
+@pytest.mark.asyncio
+async def test_disconnect_during_the_send_is_not_retried(smtp_server, mail_config):
+    _, handler = smtp_server
+    client = MailClient(mail_config, pool_size=1)
+    handler.drop_on_data = True
+
+    [error] = await client.send_messages(make_messages(1))
+    errors = await client.send_messages(make_messages(1))
+    await client.close()
+
+    assert isinstance(error, aiosmtplib.SMTPException)
+    assert errors == [None]
+    assert handler.data_commands == 2
+    assert len(handler.messages) == 1
+
+
+@pytest.mark.asyncio
+async def test_pooled_client_sends_faster_than_a_connection_per_message(smtp_server, mail_config):
+    """Messages per second over the pool against a new FastMail connection for each message,
+    with the few milliseconds a real server takes to greet a new connection"""
+    _, handler = smtp_server
+    handler.handshake_delay = 0.005
+    count = 100
+
+    started = time.perf_counter()
+    for message in make_messages(count):
+        await FastMail(mail_config).send_message(message)
+    unpooled_rate = count / (time.perf_counter() - started)
+
+    client = MailClient(mail_config, pool_size=4)
+    started = time.perf_counter()
+    errors = await client.send_messages(make_messages(count))
+    pooled_rate = count / (time.perf_counter() - started)
+    await client.close()
+
+    print(f"\nunpooled: {unpooled_rate:.0f} messages/s, pooled: {pooled_rate:.0f} messages/s")
+    assert errors == [None] * count
+    assert len(handler.messages) == 2 * count
+    assert pooled_rate > unpooled_rate
@@ -1,12 +1,29 @@
+import json
+import re
 import pytest
 from fastapi import status
 from app import models, enums
+from app.routers.taskStats import rebuild_task_stats
+from sqlalchemy import event, text
 from datetime import datetime, timedelta
 
 from app.enums.state import State
 from app.enums.tag import Tag
 
 
+@pytest.fixture
+def statements(test_async_engine):
+    """Capture the SQL statements the endpoints send to the database"""
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        captured.append(statement)
+
+    event.listen(test_async_engine.sync_engine, "before_cursor_execute", capture)
+    yield captured
+    event.remove(test_async_engine.sync_engine, "before_cursor_execute", capture)
+
+
 class TestCreateTask:
     """Test cases for POST /task/"""
     
@@ -163,6 +180,104 @@ class TestGetAllTasks:
         assert data["status"] == status.HTTP_400_BAD_REQUEST
         assert "Invalid tag" in data["message"]
 
+    @pytest.mark.parametrize("sort_by", ["created_on", "due_date", "title", "state"])
+    @pytest.mark.parametrize("sort_order", ["asc", "desc"])
+    def test_get_tasks_with_cursor(self, client, db_session, test_user, sample_tasks, sort_by, sort_order):
+        """Test walking every page with the cursor returns each task once, in order"""
+        db_session.add(models.Task(title="No Due Date", state=enums.State.todo, user_id=test_user.id))
+        db_session.commit()
+
+        expected = client.get(f"/task/?page_size=100&sort_by={sort_by}&sort_order={sort_order}").json()
+        expected_ids = [task["id"] for task in expected["list"]]
+
+        seen_ids = []
+        url = f"/task/?page_size=2&sort_by={sort_by}&sort_order={sort_order}&include_total=false"
+        data = client.get(url).json()
+        while True:
+            assert data["status"] == status.HTTP_200_OK
+            assert data["total_records"] is None
+            seen_ids += [task["id"] for task in data["list"]]
+            if not data["next_cursor"]:
+                break
+            data = client.get(f"{url}&cursor={data['next_cursor']}").json()
+
+        assert seen_ids == expected_ids
+        assert len(seen_ids) == len(sample_tasks) + 1
+
+    def test_get_tasks_cursor_sort_mismatch(self, client, db_session, sample_tasks):
+        """Test a cursor cannot be reused with another sort"""
+        data = client.get("/task/?page_size=2&sort_by=title").json()
+
+        response = client.get(f"/task/?page_size=2&sort_by=due_date&cursor={data['next_cursor']}")
+
+        data = response.json()
+        assert data["status"] == status.HTTP_400_BAD_REQUEST
+        assert data["message"] == "Invalid cursor"
+
+    def test_get_tasks_invalid_cursor(self, client, db_session, sample_tasks):
+        """Test a malformed cursor is rejected"""
+        response = client.get("/task/?cursor=not-a-cursor")
+
+        data = response.json()
+        assert data["status"] == status.HTTP_400_BAD_REQUEST
+        assert data["message"] == "Invalid cursor"
+
+    def test_get_tasks_selects_task_columns_only(self, client, db_session, sample_tasks, statements):
+        """Test the list and count queries do not join users"""
+        data = client.get("/task/").json()
+
+        assert len(data["list"]) == len(sample_tasks)
+        task_statements = [s for s in statements if re.search(r"\btasks\b", s)]
+        assert len(task_statements) == 2
+        assert not any("users" in s for s in task_statements)
+
+    def test_get_tasks_prefix_search(self, client, db_session, sample_tasks):
+        """Test prefix search matches the start of words"""
+        response = client.get("/task/?search=urg&search_mode=prefix")
+
+        data = response.json()
+        assert data["status"] == status.HTTP_200_OK
+        assert [task["title"] for task in data["list"]] == ["Urgent Task"]
+
+    def test_get_tasks_fulltext_search(self, client, db_session, sample_tasks):
+        """Test fulltext search matches stemmed words"""
+        response = client.get("/task/?search=descriptions&search_mode=fulltext")
+
+        data = response.json()
+        assert data["status"] == status.HTTP_200_OK
+        assert sorted(task["title"] for task in data["list"]) == ["Task 1", "Task 2", "Task 3"]
+
+    def test_get_tasks_sort_by_relevance(self, client, db_session, test_user, sample_tasks):
+        """Test title matches rank above description matches"""
+        db_session.add(models.Task(title="Important meeting", state=enums.State.todo, user_id=test_user.id))
+        db_session.commit()
+
+        response = client.get("/task/?search=important&search_mode=fulltext&sort_by=relevance")
+
+        data = response.json()
+        assert data["status"] == status.HTTP_200_OK
+        assert [task["title"] for task in data["list"]] == ["Important meeting", "Urgent Task"]
+
+    def test_get_tasks_relevance_with_cursor(self, client, db_session, sample_tasks):
+        """Test paging a relevance-sorted search with the cursor"""
+        url = "/task/?search=task&search_mode=prefix&sort_by=relevance&page_size=1"
+        data = client.get(url).json()
+        titles = []
+        while True:
+            titles += [task["title"] for task in data["list"]]
+            if not data["next_cursor"]:
+                break
+            data = client.get(f"{url}&cursor={data['next_cursor']}").json()
+
+        assert sorted(titles) == ["Task 1", "Task 2", "Task 3", "Urgent Task"]
+
+    def test_get_tasks_relevance_without_search(self, client, db_session, sample_tasks):
+        """Test relevance sorting needs a ranked search"""
+        response = client.get("/task/?sort_by=relevance")
+
+        data = response.json()
+        assert data["status"] == status.HTTP_400_BAD_REQUEST
+
 
 class TestGetTaskById:
     """Test cases for GET /task/{id}"""
@@ -371,6 +486,32 @@ class TestToggleTaskState:
         assert data["state"] == "todo"
 
 
+class TestTaskMutationRoundTrips:
+    """Test each task mutation touches the tasks table with a single statement"""
+
+    @pytest.fixture
+    def sample_task(self, db_session, test_user):
+        task = models.Task(title="Round trip", state=enums.State.todo, tag=enums.Tag.urgent, user_id=test_user.id)
+        db_session.add(task)
+        db_session.commit()
+        db_session.refresh(task)
+        return task
+
+    @pytest.mark.parametrize("method, url, body", [
+        ("PUT", "/task/mark_as_done/{id}", None),
+        ("PUT", "/task/toggle_state/{id}", None),
+        ("PUT", "/task/{id}", {"title": "Renamed"}),
+        ("DELETE", "/task/{id}", None),
+    ])
+    def test_single_statement(self, client, db_session, sample_task, statements, method, url, body):
+        response = client.request(method, url.format(id=sample_task.id), json=body)
+
+        assert response.json()["status"] == status.HTTP_200_OK
+        task_statements = [s for s in statements if re.search(r"\btasks\b", s)]
+        assert len(task_statements) == 1
+        assert "RETURNING" in task_statements[0]
+
+
 class TestUpdateTask:
     """Test cases for PUT /task/{id}"""
     
@@ -458,6 +599,7 @@ class TestTaskStatistics:
         
         for task in tasks:
             db_session.add(task)
+        rebuild_task_stats(test_user.id, db_session)
         db_session.commit()
         return tasks
     
@@ -478,6 +620,77 @@ class TestTaskStatistics:
         assert stats["overdue"] == 1
         assert "completion_rate" in stats
         assert stats["completion_rate"] == round(2/6 * 100, 2) 
+
+    def test_get_statistics_breakdowns(self, client, db_session, test_user):
+        """Test per-tag and due this week counters"""
+        db_session.add_all([
+            models.Task(title="Urgent", state=enums.State.todo, tag=enums.Tag.urgent, user_id=test_user.id,
+                        due_date=datetime.now() - timedelta(days=30)),
+            models.Task(title="Urgent done", state=enums.State.done, tag=enums.Tag.urgent, user_id=test_user.id),
+            models.Task(title="Soon", state=enums.State.doing, tag=enums.Tag.can_wait, user_id=test_user.id,
+                        due_date=datetime.now() + timedelta(minutes=1)),
+            models.Task(title="Later", state=enums.State.todo, tag=enums.Tag.can_wait, user_id=test_user.id,
+                        due_date=datetime.now() + timedelta(days=30)),
+        ])
+        rebuild_task_stats(test_user.id, db_session)
+        db_session.commit()
+
+        response = client.get("/task/stats/summary")
+
+        stats = response.json()["data"]
+        assert stats["total"] == 4
+        assert stats["overdue"] == 1
+        assert stats["due_this_week"] == 1
+        assert stats["tags"]["urgent"] == {"total": 2, "todo": 1, "doing": 0, "done": 1, "overdue": 1}
+        assert stats["tags"]["can_wait"]["total"] == 2
+        assert stats["tags"]["important"]["total"] == 0
+
+    def test_statistics_follow_task_mutations(self, client, db_session, test_user):
+        """Test the counters are maintained by every task handler"""
+        first = client.post("/task/", json={"title": "First", "tag": "urgent"}).json()
+        second = client.post("/task/", json={"title": "Second"}).json()
+        client.put(f"/task/toggle_state/{first['id']}")
+        client.put(f"/task/mark_as_done/{second['id']}")
+        client.put(f"/task/{first['id']}", json={"title": "First", "tag": "important"})
+        third = client.post("/task/", json={"title": "Third", "state": "doing"}).json()
+        client.delete(f"/task/{third['id']}")
+
+        stats = client.get("/task/stats/summary").json()["data"]
+        assert stats["total"] == 2
+        assert stats["todo"] == 0
+        assert stats["doing"] == 1
+        assert stats["done"] == 1
+        assert stats["tags"]["important"]["doing"] == 1
+        assert stats["tags"]["urgent"]["total"] == 0
+        assert stats["tags"]["optional"]["done"] == 1
+
+        counters = sorted(
+            (row.state, row.tag, row.count)
+            for row in db_session.query(models.TaskStats).filter(models.TaskStats.user_id == test_user.id)
+            if row.count
+        )
+        rebuild_task_stats(test_user.id, db_session)
+        rebuilt = sorted(
+            (row.state, row.tag, row.count)
+            for row in db_session.query(models.TaskStats).filter(models.TaskStats.user_id == test_user.id)
+        )
+        assert counters == rebuilt
+
+    def test_rebuild_statistics(self, client, db_session, test_user):
+        """Test rebuilding reconciles counters after rows are written directly"""
+        db_session.add_all([
+            models.Task(title=f"Imported {i}", state=enums.State.todo, user_id=test_user.id)
+            for i in range(3)
+        ])
+        db_session.commit()
+        assert client.get("/task/stats/summary").json()["data"]["total"] == 0
+
+        rebuild_task_stats(test_user.id, db_session)
+        db_session.commit()
+
+        stats = client.get("/task/stats/summary").json()["data"]
+        assert stats["total"] == 3
+        assert stats["tags"]["optional"]["todo"] == 3
     
     def test_get_statistics_empty(self, client, db_session, test_user):
         """Test statistics with no tasks"""
@@ -490,3 +703,357 @@ class TestTaskStatistics:
         stats = data["data"]
         assert stats["total"] == 0
         assert stats["completion_rate"] == 0
+
+
+class TestBulkTasks:
+    """Test cases for POST, PATCH and DELETE /task/bulk"""
+
+    def test_bulk_create(self, client, db_session, test_user, statements):
+        """Test creating many tasks in one INSERT"""
+        tasks = [{"title": f"Imported {i}", "tag": "urgent"} for i in range(50)]
+
+        response = client.post("/task/bulk", json=tasks)
+
+        data = response.json()
+        assert data["status"] == status.HTTP_201_CREATED
+        assert [task["title"] for task in data["list"]] == [task["title"] for task in tasks]
+        assert all(task["status"] == status.HTTP_201_CREATED and task["id"] for task in data["list"])
+        assert all(task["state"] == "todo" for task in data["list"])
+        assert len([s for s in statements if s.startswith("INSERT INTO tasks")]) == 1
+
+        stats = client.get("/task/stats/summary").json()["data"]
+        assert stats["tags"]["urgent"]["todo"] == 50
+
+    def test_bulk_create_limits(self, client, db_session):
+        """Test empty and oversized batches are rejected"""
+        assert client.post("/task/bulk", json=[]).json()["status"] == status.HTTP_400_BAD_REQUEST
+
+        response = client.post("/task/bulk", json=[{"title": "x"}] * 1001)
+        assert response.json()["status"] == status.HTTP_400_BAD_REQUEST
+
+    def test_bulk_update(self, client, db_session, test_user, statements):
+        """Test updating only the sent fields of many tasks in one UPDATE"""
+        created = client.post("/task/bulk", json=[
+            {"title": "First", "description": "Keep me", "tag": "urgent"},
+            {"title": "Second", "description": "Clear me", "due_date": datetime.now().isoformat()},
+        ]).json()["list"]
+        statements.clear()
+
+        response = client.patch("/task/bulk", json=[
+            {"id": created[0]["id"], "state": "done"},
+            {"id": created[1]["id"], "title": "Renamed", "description": None, "due_date": None},
+            {"id": 99999, "title": "Missing"},
+        ])
+
+        data = response.json()
+        assert data["status"] == status.HTTP_200_OK
+        first, second, missing = data["list"]
+        assert first["status"] == status.HTTP_200_OK
+        assert first["state"] == "done"
+        assert first["title"] == "First"
+        assert first["description"] == "Keep me"
+        assert second["title"] == "Renamed"
+        assert second["description"] is None
+        assert second["due_date"] is None
+        assert missing["status"] == status.HTTP_404_NOT_FOUND
+        assert len([s for s in statements if s.startswith("UPDATE tasks")]) == 1
+
+        stats = client.get("/task/stats/summary").json()["data"]
+        assert stats["done"] == 1
+        assert stats["todo"] == 1
+        assert stats["tags"]["urgent"]["done"] == 1
+
+    def test_bulk_update_duplicate_ids(self, client, db_session):
+        """Test a task cannot be updated twice in one batch"""
+        response = client.patch("/task/bulk", json=[{"id": 1, "title": "a"}, {"id": 1, "title": "b"}])
+
+        assert response.json()["status"] == status.HTTP_400_BAD_REQUEST
+
+    def test_bulk_delete(self, client, db_session, test_user):
+        """Test deleting many tasks in one DELETE"""
+        other_user = models.User(
+            email="otheruser@example.com",
+            first_name="Other",
+            last_name="User",
+            password="hashed",
+            confirmed=True
+        )
+        db_session.add(other_user)
+        db_session.commit()
+        other_task = models.Task(title="Not mine", state=enums.State.todo, user_id=other_user.id)
+        db_session.add(other_task)
+        db_session.commit()
+        created = client.post("/task/bulk", json=[{"title": "a"}, {"title": "b"}, {"title": "c"}]).json()["list"]
+
+        ids = [created[0]["id"], created[1]["id"], other_task.id]
+        response = client.request("DELETE", "/task/bulk", json=ids)
+
+        data = response.json()
+        assert data["status"] == status.HTTP_200_OK
+        assert [task["status"] for task in data["list"]] == [
+            status.HTTP_200_OK, status.HTTP_200_OK, status.HTTP_404_NOT_FOUND
+        ]
+        assert db_session.query(models.Task).filter(models.Task.id == other_task.id).first() is not None
+        assert client.get("/task/stats/summary").json()["data"]["total"] == 1
+
+
+
+
+class TestTaskChanges:
+    """Test cases for GET /task/changes"""
+
+    def sync(self, client, since=None, page_size=100):
+        """Follow the pages of a sync, returning the pages and the since to send next time"""
+        params = {"page_size": page_size} if since is None else {"since": since, "page_size": page_size}
+        pages = [client.get("/task/changes", params=params).json()]
+        while pages[-1]["next_cursor"]:
+            assert pages[-1]["since"] is None
+            pages.append(client.get("/task/changes", params={"cursor": pages[-1]["next_cursor"], "page_size": page_size}).json())
+        assert all(page["status"] == status.HTTP_200_OK for page in pages)
+        return pages, pages[-1]["since"]
+
+    def test_first_sync_returns_every_task(self, client, db_session):
+        created = client.post("/task/bulk", json=[{"title": "a"}, {"title": "b"}]).json()["list"]
+        client.delete(f"/task/{created[0]['id']}")
+        client.post("/task/", json={"title": "c"})
+
+        (page,), since = self.sync(client)
+
+        assert [task["title"] for task in page["tasks"]] == ["b", "c"]
+        assert page["deleted"] == []
+        assert since == 3
+
+    def test_changes_since_the_last_sync(self, client, db_session):
+        created = client.post("/task/bulk", json=[{"title": f"Task {i}"} for i in range(4)]).json()["list"]
+        _, since = self.sync(client)
+
+        client.put(f"/task/{created[0]['id']}", json={"title": "Renamed"})
+        client.put(f"/task/mark_as_done/{created[1]['id']}")
+        client.request("DELETE", "/task/bulk", json=[created[2]["id"]])
+        added = client.post("/task/", json={"title": "Added"}).json()
+
+        (page,), next_since = self.sync(client, since)
+
+        assert [(task["id"], task["title"], task["state"]) for task in page["tasks"]] == [
+            (created[0]["id"], "Renamed", "todo"),
+            (created[1]["id"], "Task 1", "done"),
+            (added["id"], "Added", "todo"),
+        ]
+        assert page["deleted"] == [created[2]["id"]]
+        assert next_since == since + 4
+
+        (page,), _ = self.sync(client, next_since)
+        assert page["tasks"] == [] and page["deleted"] == []
+
+    def test_changes_are_paged_by_sequence(self, client, db_session):
+        created = client.post("/task/bulk", json=[{"title": f"Task {i}"} for i in range(5)]).json()["list"]
+        _, since = self.sync(client)
+        client.request("DELETE", "/task/bulk", json=[task["id"] for task in created[:3]])
+        client.patch("/task/bulk", json=[{"id": task["id"], "state": "doing"} for task in created[3:]])
+
+        pages, next_since = self.sync(client, since, page_size=2)
+
+        assert len(pages) == 3
+        assert [task_id for page in pages for task_id in page["deleted"]] == [task["id"] for task in created[:3]]
+        assert [task["id"] for page in pages for task in page["tasks"]] == [task["id"] for task in created[3:]]
+        assert next_since == since + 2
+
+    def test_changes_while_paging_come_back_in_the_next_sync(self, client, db_session):
+        created = client.post("/task/bulk", json=[{"title": f"Task {i}"} for i in range(4)]).json()["list"]
+        first_page = client.get("/task/changes", params={"page_size": 2}).json()
+        assert [task["id"] for task in first_page["tasks"]] == [task["id"] for task in created[:2]]
+
+        client.delete(f"/task/{created[0]['id']}")
+        client.put(f"/task/{created[3]['id']}", json={"title": "Renamed"})
+        last_page = client.get("/task/changes", params={"cursor": first_page["next_cursor"], "page_size": 2}).json()
+
+        assert [task["id"] for task in last_page["tasks"]] == [created[2]["id"]]
+        assert last_page["next_cursor"] is None
+        assert last_page["since"] == 1
+
+        (page,), _ = self.sync(client, last_page["since"])
+        assert page["deleted"] == [created[0]["id"]]
+        assert [(task["id"], task["title"]) for task in page["tasks"]] == [(created[3]["id"], "Renamed")]
+
+    def test_since_before_the_purged_tombstones_needs_a_full_sync(self, client, db_session, test_user):
+        created = client.post("/task/bulk", json=[{"title": f"Task {i}"} for i in range(2)]).json()["list"]
+        client.delete(f"/task/{created[0]['id']}")
+        _, since = self.sync(client)
+        db_session.query(models.TaskTombstone).delete()
+        db_session.query(models.TaskVersion).filter(models.TaskVersion.user_id == test_user.id).update({"tombstones_purged_seq": since})
+        db_session.commit()
+
+        gone = client.get("/task/changes", params={"since": since - 1}).json()
+        assert gone["status"] == status.HTTP_410_GONE
+        assert gone["tasks"] is None
+
+        (page,), _ = self.sync(client, since)
+        assert page["status"] == status.HTTP_200_OK
+        assert page["deleted"] == [] and page["tasks"] == []
+
+    def test_invalid_cursor(self, client, db_session):
+        data = client.get("/task/changes", params={"cursor": "not-a-cursor"}).json()
+
+        assert data["status"] == status.HTTP_400_BAD_REQUEST
+
+    def test_timestamps_are_set_by_the_database(self, client, db_session):
+        first = client.post("/task/", json={"title": "First"}).json()
+        second = client.post("/task/", json={"title": "Second"}).json()
+        updated = client.put(f"/task/{first['id']}", json={"title": "Renamed"}).json()
+
+        assert second["created_on"] > first["created_on"]
+        assert updated["created_on"] == first["created_on"]
+        assert updated["updated_on"] > first["updated_on"]
+
+
+class TestConditionalGets:
+    """Test ETags and 304 responses for GET /task/, /task/{id} and /task/stats/summary"""
+
+    @pytest.fixture
+    def sample_task(self, client, db_session):
+        return client.post("/task/", json={"title": "Cached", "tag": "urgent"}).json()
+
+    def test_unchanged_tasks_are_not_sent_again(self, client, sample_task, statements, monkeypatch):
+        class FrozenDatetime(datetime):
+            """The statistics ETag changes every minute"""
+            @classmethod
+            def now(cls, tz=None):
+                return datetime(2030, 1, 1, 12, 0, 30)
+
+        monkeypatch.setattr("app.routers.task.datetime", FrozenDatetime)
+        for url in ["/task/", f"/task/{sample_task['id']}", "/task/stats/summary"]:
+            response = client.get(url)
+            etag = response.headers["ETag"]
+            assert response.status_code == status.HTTP_200_OK
+            assert response.headers["Cache-Control"] == "private, no-cache"
+            statements.clear()
+
+            response = client.get(url, headers={"If-None-Match": etag})
+
+            assert response.status_code == status.HTTP_304_NOT_MODIFIED
+            assert response.content == b""
+            assert response.headers["ETag"] == etag
+            assert len(statements) == 1
+            assert "task_versions" in statements[0]
+
+    @pytest.mark.parametrize("method, url, body", [
+        ("POST", "/task/", {"title": "New"}),
+        ("POST", "/task/bulk", [{"title": "New"}]),
+        ("PATCH", "/task/bulk", [{"id": "{id}", "title": "Renamed"}]),
+        ("DELETE", "/task/bulk", ["{id}"]),
+        ("PUT", "/task/{id}", {"title": "Renamed"}),
+        ("PUT", "/task/mark_as_done/{id}", None),
+        ("PUT", "/task/toggle_state/{id}", None),
+        ("DELETE", "/task/{id}", None),
+    ])
+    def test_changes_invalidate_the_etag(self, client, sample_task, method, url, body):
+        etag = client.get("/task/").headers["ETag"]
+        body = json.loads(json.dumps(body).replace('"{id}"', str(sample_task["id"])))
+
+        response = client.request(method, url.format(id=sample_task["id"]), json=body)
+        assert response.json()["status"] in (status.HTTP_200_OK, status.HTTP_201_CREATED)
+
+        response = client.get("/task/", headers={"If-None-Match": etag})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["ETag"] != etag
+
+    def test_failed_changes_keep_the_etag(self, client, sample_task):
+        etag = client.get("/task/").headers["ETag"]
+
+        assert client.put("/task/99999", json={"title": "Missing"}).json()["status"] == status.HTTP_404_NOT_FOUND
+
+        assert client.get("/task/", headers={"If-None-Match": etag}).status_code == status.HTTP_304_NOT_MODIFIED
+
+    def test_etags_are_per_user(self, client, db_session, sample_task):
+        other_user = models.User(email="otheruser@example.com", first_name="Other", last_name="User", password="hashed", confirmed=True)
+        db_session.add(other_user)
+        db_session.commit()
+        etag = client.get("/task/").headers["ETag"]
+
+        db_session.add(models.TaskVersion(user_id=other_user.id, version=5))
+        db_session.commit()
+
+        assert client.get("/task/", headers={"If-None-Match": etag}).status_code == status.HTTP_304_NOT_MODIFIED
+
+
+class TestTaskIndexes:
+    """Test the task list and statistics queries are served by the tasks indexes"""
+
+    @pytest.fixture
+    def task_queries(self, test_async_engine):
+        """Capture every SELECT on tasks the endpoints send to the database"""
+        statements = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith("SELECT") and "tasks" in statement:
+                statements.append((statement, parameters))
+
+        event.listen(test_async_engine.sync_engine, "before_cursor_execute", capture)
+        yield statements
+        event.remove(test_async_engine.sync_engine, "before_cursor_execute", capture)
+
+    @pytest.fixture
+    def many_tasks(self, db_session, test_user):
+        """Create the user's tasks among many tasks of another user, then ANALYZE so the planner sees the table as it is"""
+        other_user = models.User(email="other@example.com", first_name="Jane", last_name="Doe", password="hash", confirmed=True)
+        db_session.add(other_user)
+        db_session.flush()
+        db_session.execute(text(
+            "INSERT INTO tasks (title, state, tag, user_id, due_date) "
+            "SELECT 'Other task ' || i, 'todo', 'urgent', :user_id, now() + i * interval '1 hour' "
+            "FROM generate_series(1, 20000) AS i"
+        ), {"user_id": other_user.id})
+        db_session.add_all([
+            models.Task(
+                title=f"Task {i}",
+                state=list(enums.State)[i % 3],
+                tag=list(enums.Tag)[i % 4],
+                user_id=test_user.id,
+                due_date=datetime.now() + timedelta(days=i - 50)
+            )
+            for i in range(200)
+        ])
+        db_session.commit()
+        db_session.execute(text("ANALYZE tasks"))
+        db_session.commit()
+
+    def explain(self, db_session, statement, parameters):
+        """EXPLAIN an asyncpg statement, its $n placeholders are bound through a prepared statement"""
+        cursor = db_session.connection().connection.cursor()
+        cursor.execute("PREPARE task_query AS " + statement)
+        arguments = ", ".join(["%s"] * len(parameters))
+        cursor.execute(f"EXPLAIN EXECUTE task_query({arguments})" if parameters else "EXPLAIN EXECUTE task_query", parameters)
+        plan = "\n".join(row[0] for row in cursor.fetchall())
+        cursor.execute("DEALLOCATE task_query")
+        return plan
+
+    @pytest.mark.parametrize("url", [
+        "/task/",
+        "/task/?state=todo",
+        "/task/?tag=urgent",
+        "/task/?sort_by=due_date&sort_order=asc",
+        "/task/?page_size=5&include_total=false",
+        "/task/?search=task&search_mode=fulltext&sort_by=relevance",
+        "/task/changes",
+        "/task/changes?since=0",
+    ])
+    def test_list_queries_use_indexes(self, client, db_session, many_tasks, task_queries, url):
+        """Test the list endpoint never scans the whole tasks table"""
+        data = client.get(url).json()
+        assert data["status"] == status.HTTP_200_OK
+
+        assert task_queries
+        for statement, parameters in task_queries:
+            plan = self.explain(db_session, statement, parameters)
+            assert "Seq Scan on tasks" not in plan
+            assert "ix_tasks_user_id" in plan
+
+    def test_stats_queries_use_indexes(self, client, db_session, many_tasks, task_queries):
+        """Test the statistics endpoint never scans the whole tasks table"""
+        data = client.get("/task/stats/summary").json()
+        assert data["status"] == status.HTTP_200_OK
+
+        assert task_queries
+        for statement, parameters in task_queries:
+            plan = self.explain(db_session, statement, parameters)
+            assert "Seq Scan on tasks" not in plan
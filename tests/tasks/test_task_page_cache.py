@@ -0,0 +1,131 @@
+import pytest
+from unittest.mock import AsyncMock
+from sqlalchemy import event
+
+from app.taskPageCache import TaskPageCache, task_page_cache
+
+
+@pytest.fixture
+def statements(test_async_engine):
+    """Capture the SQL statements the endpoints send to the database"""
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        captured.append(statement)
+
+    event.listen(test_async_engine.sync_engine, "before_cursor_execute", capture)
+    yield captured
+    event.remove(test_async_engine.sync_engine, "before_cursor_execute", capture)
+
+
+@pytest.fixture(autouse=True)
+def cache_stats():
+    task_page_cache.reset_stats()
+    yield
+    task_page_cache.reset_stats()
+
+
+class FakeRedis:
+    """The few redis commands the cache uses, over a dict"""
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.data[key] = value
+
+    async def scan_iter(self, pattern):
+        for key in [key for key in list(self.data) if key.startswith(pattern.rstrip("*"))]:
+            yield key
+
+    async def delete(self, key):
+        self.data.pop(key, None)
+
+
+def test_key_ignores_parameter_order_and_missing_values():
+    key = TaskPageCache.key(1, 3, {"page_size": 10, "state": None, "sort_by": "created_on"})
+
+    assert key == TaskPageCache.key(1, 3, {"sort_by": "created_on", "page_size": 10})
+    assert key != TaskPageCache.key(1, 4, {"page_size": 10, "sort_by": "created_on"})
+    assert key != TaskPageCache.key(2, 3, {"page_size": 10, "sort_by": "created_on"})
+
+
+@pytest.mark.asyncio
+async def test_redis_hits_fill_the_memory_tier():
+    shared = FakeRedis()
+    writer = TaskPageCache(max_size=10, ttl=60, redis_client=shared)
+    reader = TaskPageCache(max_size=10, ttl=60, redis_client=shared)
+
+    await writer.set("1:3:page_size=10", b"{}")
+
+    assert await reader.get("1:3:page_size=10") == b"{}"
+    assert await reader.get("1:3:page_size=10") == b"{}"
+    assert await reader.get("1:4:page_size=10") is None
+    stats = reader.stats()
+    assert (stats["redis_hits"], stats["memory_hits"], stats["misses"]) == (1, 1, 1)
+    assert stats["tiers"] == ["memory", "redis"]
+
+
+@pytest.mark.asyncio
+async def test_redis_errors_count_as_misses():
+    redis_client = AsyncMock()
+    redis_client.get.side_effect = ConnectionError("redis down")
+    redis_client.set.side_effect = ConnectionError("redis down")
+    cache = TaskPageCache(max_size=0, ttl=60, redis_client=redis_client)
+
+    await cache.set("1:3:", b"{}")
+
+    assert await cache.get("1:3:") is None
+    assert cache.stats()["errors"] == 2
+    assert cache.stats()["misses"] == 1
+
+
+@pytest.mark.asyncio
+async def test_clear_removes_only_the_cached_pages():
+    shared = FakeRedis()
+    shared.data["todo:user:1"] = b"{}"
+    cache = TaskPageCache(max_size=10, ttl=60, redis_client=shared)
+    await cache.set("1:3:", b"{}")
+
+    await cache.clear()
+
+    assert await cache.get("1:3:") is None
+    assert list(shared.data) == ["todo:user:1"]
+
+
+class TestTaskPageCaching:
+    """Test GET /task/ pages are served from the cache until the user's tasks change"""
+
+    @pytest.fixture
+    def tasks(self, client, db_session):
+        return client.post("/task/bulk", json=[{"title": f"Task {i}"} for i in range(3)]).json()["list"]
+
+    def test_repeated_pages_skip_the_task_queries(self, client, tasks, statements):
+        first = client.get("/task/", params={"state": "todo", "page_size": 10})
+        statements.clear()
+
+        second = client.get("/task/", params={"page_number": 1, "page_size": 10, "state": "todo", "sort_order": "desc"})
+
+        assert second.content == first.content
+        assert second.headers["ETag"] == first.headers["ETag"]
+        assert len(statements) == 1
+        assert "task_versions" in statements[0]
+        assert task_page_cache.stats()["memory_hits"] == 1
+
+    def test_changes_are_visible_on_the_next_request(self, client, tasks):
+        assert client.get("/task/").json()["total_records"] == 3
+
+        client.put(f"/task/{tasks[0]['id']}", json={"title": "Renamed"})
+        client.post("/task/", json={"title": "New"})
+
+        data = client.get("/task/").json()
+        assert data["total_records"] == 4
+        assert "Renamed" in [task["title"] for task in data["list"]]
+
+    def test_error_pages_are_not_cached(self, client, tasks):
+        assert client.get("/task/", params={"state": "unknown"}).json()["status"] == 400
+        assert client.get("/task/", params={"state": "unknown"}).json()["status"] == 400
+
+        assert task_page_cache.stats()["memory_hits"] == 0
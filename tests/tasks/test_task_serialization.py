@@ -0,0 +1,75 @@
+import json
+from datetime import datetime, timedelta
+from unittest.mock import patch
+import pytest
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from pydantic import BaseModel
+
+from app import enums, schemas
+from app.routers.task import list_fields, task_list_item
+from app.main import app
+
+def task_rows(count=100):
+    """A page of rows as select(*list_columns) returns them, as dicts"""
+    created_on = datetime(2026, 1, 1)
+    return [
+        {
+            "id": i,
+            "title": f"Task {i}",
+            "description": f"Description of task {i} " * 4,
+            "due_date": created_on + timedelta(days=i),
+            "tag": list(enums.Tag)[i % len(enums.Tag)],
+            "state": list(enums.State)[i % len(enums.State)],
+            "user_id": 1,
+            "created_on": created_on,
+            "updated_on": created_on + timedelta(hours=i),
+        }
+        for i in range(count)
+    ]
+
+
+def page_fields(rows):
+    """The page's fields but the list, in the order get_all writes them"""
+    return dict(message="Tasks retrieved successfully", status=200, page_number=1, page_size=len(rows), total_pages=10, total_records=1000)
+
+
+async def validated_body(rows, response_class):
+    """Validated when built, validated again against the route's response_model, then dumped by response_class"""
+    route = next(route for route in app.routes if getattr(route, "path", None) == "/task/" and "GET" in route.methods)
+    page = schemas.tasksOut(**page_fields(rows), next_cursor=None, list=[schemas.taskOut(**row) for row in rows])
+    content = await serialize_response(field=route.response_field, response_content=page)
+    return response_class(content).body
+
+
+def trusted_body(rows):
+    """The page as get_all returns it"""
+    rows = [tuple(row[field] for field in list_fields) for row in rows]
+    return ORJSONResponse({**page_fields(rows), "list": [task_list_item(row) for row in rows], "next_cursor": None}).body
+
+
+@pytest.mark.asyncio
+async def test_trusted_response_matches_the_validated_response():
+    rows = task_rows()
+
+    assert json.loads(trusted_body(rows)) == json.loads(await validated_body(rows, JSONResponse))
+    assert json.loads(trusted_body(rows)) == json.loads(await validated_body(rows, ORJSONResponse))
+    assert list(json.loads(trusted_body(rows))["list"][0]) == list(schemas.taskOut.model_fields)
+
+
+@pytest.mark.asyncio
+async def test_trusted_response_is_the_validated_response_byte_for_byte():
+    rows = task_rows()
+
+    assert trusted_body(rows) == await validated_body(rows, ORJSONResponse)
+
+
+def test_trusted_response_skips_pydantic_validation():
+    rows = task_rows()
+
+    with patch.object(BaseModel, "__init__", side_effect=AssertionError("validated")) as init, \
+         patch.object(BaseModel, "model_validate", side_effect=AssertionError("validated")) as model_validate:
+        trusted_body(rows)
+
+    init.assert_not_called()
+    model_validate.assert_not_called()
@@ -1,9 +1,9 @@
 import pytest
 from unittest.mock import patch, MagicMock, AsyncMock
-from fastapi import status
+from fastapi import Response, status
 from datetime import datetime, UTC
 from app.routers import task
-from app import schemas, enums
+from app import schemas, enums, utils
 
 @pytest.fixture
 def fake_user():
@@ -12,21 +12,6 @@ def fake_user():
     user.email = "test@example.com"
     return user
 
-class MockQuery:
-    def __init__(self, task):
-        self.task = task
-    def filter(self, *args, **kwargs):
-        return self
-    def first(self):
-        return self.task
-    def update(self, values):
-        for k, v in values.items():
-            setattr(self.task, k, v)
-    def commit(self):
-        return None
-    def refresh(self, task):
-        return None
-        
 @pytest.fixture
 def fake_task(fake_user):
     t = MagicMock()
@@ -40,6 +25,11 @@ def fake_task(fake_user):
     t.updated_on = datetime.now(UTC)
     return t
 
+def fake_request(headers=None):
+    request = MagicMock()
+    request.headers = headers or {}
+    return request
+
 
 @pytest.mark.asyncio
 async def test_add_task_success(fake_user, fake_task):
@@ -49,13 +39,11 @@ async def test_add_task_success(fake_user, fake_task):
         state=fake_task.state.value,
         tag=fake_task.tag.value
     )
-    mock_db = MagicMock()
-    mock_db.add.return_value = None
-    mock_db.commit.return_value = None
-    mock_db.refresh.return_value = None
+    mock_db = AsyncMock()
+    mock_db.add = MagicMock(return_value=None)
 
     with patch('app.routers.task.schemas.taskOut', side_effect=lambda **kwargs: kwargs) as mock_schema:
-        result = task.add(task_data, db=mock_db, current_user=fake_user)
+        result = await task.add(task_data, db=mock_db, current_user=fake_user)
         assert result["status"] == status.HTTP_201_CREATED
         assert "Task added successfully" in result["message"]
         assert result["title"] == fake_task.title
@@ -63,45 +51,72 @@ async def test_add_task_success(fake_user, fake_task):
 
 @pytest.mark.asyncio
 async def test_get_task_success(fake_user, fake_task):
-    mock_db = MagicMock()
-    mock_db.query.return_value.filter.return_value.first.return_value = fake_task
+    mock_db = AsyncMock()
+    mock_db.scalar.side_effect = [3, fake_task]
+    response = Response()
 
     with patch('app.routers.task.schemas.taskOut', side_effect=lambda **kwargs: kwargs) as mock_schema:
-        result = task.get_task(fake_task.id, db=mock_db, current_user=fake_user)
+        result = await task.get_task(fake_task.id, fake_request(), response, db=mock_db, current_user=fake_user)
         assert result["status"] == status.HTTP_200_OK
         assert result["id"] == fake_task.id
         assert result["title"] == fake_task.title
+        assert response.headers["ETag"] == 'W/"1.3"'
+
+@pytest.mark.asyncio
+async def test_get_task_not_modified(fake_user, fake_task):
+    mock_db = AsyncMock()
+    mock_db.scalar.side_effect = [3, fake_task]
+
+    result = await task.get_task(fake_task.id, fake_request({"if-none-match": 'W/"1.3"'}), Response(), db=mock_db, current_user=fake_user)
+
+    assert result.status_code == status.HTTP_304_NOT_MODIFIED
+    assert result.headers["ETag"] == 'W/"1.3"'
+    assert mock_db.scalar.await_count == 1
+
+@pytest.mark.parametrize("if_none_match, matches", [
+    (None, False),
+    ('W/"1.3"', True),
+    ('"1.3"', True),
+    ('W/"1.2", W/"1.3"', True),
+    ("*", True),
+    ('W/"1.2"', False),
+    ('W/"1.30"', False),
+])
+def test_etag_matches(if_none_match, matches):
+    assert utils.etag_matches(if_none_match, utils.weak_etag(1, 3)) == matches
 
 @pytest.mark.asyncio
 async def test_delete_task_success(fake_user, fake_task):
-    mock_db = MagicMock()
-    mock_db.query.return_value.filter.return_value.first.return_value = fake_task
-    mock_db.commit.return_value = None
+    mock_db = AsyncMock()
+    mock_db.execute.return_value = MagicMock()
+    mock_db.execute.return_value.first.return_value = fake_task
 
     with patch('app.routers.task.schemas.taskOut', side_effect=lambda **kwargs: kwargs) as mock_schema:
-        result = task.delete_task(fake_task.id, db=mock_db, current_user=fake_user)
+        result = await task.delete_task(fake_task.id, db=mock_db, current_user=fake_user)
         assert result["status"] == status.HTTP_200_OK
         assert "Task deleted successfully" in result["message"]
 
 @pytest.mark.asyncio
-def test_mark_task_as_done_success(fake_user, fake_task):
-    mock_db = MagicMock()
-    mock_db.query.return_value = MockQuery(fake_task)
+async def test_mark_task_as_done_success(fake_user, fake_task):
+    mock_db = AsyncMock()
+    fake_task.state = enums.State.done
 
-    with patch('app.routers.task.schemas.taskOut', side_effect=lambda **kwargs: kwargs):
-        result = task.mark_task_as_done(fake_task.id, db=mock_db, current_user=fake_user)
+    with patch('app.routers.task.update_task_returning', new_callable=AsyncMock, return_value=(fake_task, enums.State.todo, fake_task.tag)), \
+         patch('app.routers.task.schemas.taskOut', side_effect=lambda **kwargs: kwargs):
+        result = await task.mark_task_as_done(fake_task.id, db=mock_db, current_user=fake_user)
 
     assert result["status"] == status.HTTP_200_OK
     assert result["state"] == enums.State.done
     assert "marked as done" in result["message"]
 
 @pytest.mark.asyncio
-def test_toggle_task_state_success(fake_user, fake_task):
-    mock_db = MagicMock()
-    mock_db.query.return_value = MockQuery(fake_task)
+async def test_toggle_task_state_success(fake_user, fake_task):
+    mock_db = AsyncMock()
+    fake_task.state = enums.State.doing
 
-    with patch('app.routers.task.schemas.taskOut', side_effect=lambda **kwargs: kwargs) as mock_schema:
-        result = task.toggle_task_state(fake_task.id, db=mock_db, current_user=fake_user)
+    with patch('app.routers.task.update_task_returning', new_callable=AsyncMock, return_value=(fake_task, enums.State.todo, fake_task.tag)), \
+         patch('app.routers.task.schemas.taskOut', side_effect=lambda **kwargs: kwargs) as mock_schema:
+        result = await task.toggle_task_state(fake_task.id, db=mock_db, current_user=fake_user)
         assert result["status"] == status.HTTP_200_OK
         print(result)
         assert result["state"] == enums.State.doing
@@ -109,13 +124,29 @@ def test_toggle_task_state_success(fake_user, fake_task):
 
 @pytest.mark.asyncio
 async def test_get_task_stats_success(fake_user):
-    mock_db = MagicMock()
-    mock_db.query.return_value.filter.return_value.count.side_effect = [10, 3, 4, 3, 2]
-
-    result = task.get_task_stats(db=mock_db, current_user=fake_user)
+    counters = MagicMock()
+    counters.all.return_value = [
+        (enums.State.todo, "urgent", 2),
+        (enums.State.todo, "", 1),
+        (enums.State.doing, "urgent", 4),
+        (enums.State.done, "optional", 3),
+    ]
+    due_counts = MagicMock()
+    due_counts.all.return_value = [
+        (enums.Tag.urgent, 2, 3),
+    ]
+    mock_db = AsyncMock()
+    mock_db.scalar.return_value = None
+    mock_db.execute.side_effect = [counters, due_counts]
+
+    result = await task.get_task_stats(fake_request(), Response(), db=mock_db, current_user=fake_user)
     assert result["status"] == status.HTTP_200_OK
     assert result["data"]["total"] == 10
     assert result["data"]["todo"] == 3
     assert result["data"]["doing"] == 4
     assert result["data"]["done"] == 3
     assert result["data"]["overdue"] == 2
+    assert result["data"]["due_this_week"] == 3
+    assert result["data"]["tags"]["urgent"]["total"] == 6
+    assert result["data"]["tags"]["urgent"]["overdue"] == 2
+    assert result["data"]["tags"]["optional"]["done"] == 3
@@ -1,6 +1,7 @@
 import pytest
 from fastapi import status
 from app import models, enums
+from app.tokenBlacklist import blacklist_entry
 from datetime import datetime, timedelta, timezone
 from unittest.mock import patch, AsyncMock
 import uuid
@@ -9,8 +10,7 @@ import uuid
 class TestCompleteUserJourney:
     """Test complete user journey from registration to task management"""
     
-    @patch('app.routers.user.send_email', new_callable=AsyncMock)
-    def test_complete_user_journey(self, mock_send_email, unauthenticated_client, db_session):
+    def test_complete_user_journey(self, unauthenticated_client, db_session):
         """
         Test complete flow:
         1. User registration
@@ -116,10 +116,8 @@ class TestCompleteUserJourney:
 class TestPasswordResetFlow:
     """Test complete password reset flow"""
     
-    @patch('app.routers.resetCode.send_email', new_callable=AsyncMock)
-    @patch('app.routers.auth.hash_password')
-    def test_forgot_password_to_reset_flow(self, mock_hash, mock_send_email, 
-                                           unauthenticated_client, db_session, test_user):
+    @patch('app.routers.auth.password_hasher.hash', new_callable=AsyncMock)
+    def test_forgot_password_to_reset_flow(self, mock_hash, unauthenticated_client, db_session, test_user):
         """Test complete password reset flow"""
         mock_hash.return_value = "new_hashed_password"
         
@@ -241,7 +239,7 @@ class TestAuthenticationEdgeCases:
         assert logout_response.status_code == 200
 
         blacklisted = db_session.query(models.JWTblacklist).filter(
-            models.JWTblacklist.token == token
+            models.JWTblacklist.jti_digest == blacklist_entry(token).jti_digest
         ).first()
         assert blacklisted is not None
     
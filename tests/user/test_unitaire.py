@@ -1,4 +1,6 @@
+import anyio
 import pytest
+from anyio import to_thread
 from unittest.mock import AsyncMock, patch
 from fastapi.testclient import TestClient
 from app import models, oauth2
@@ -71,11 +73,9 @@ class MockQuery:
 
 @pytest.mark.asyncio
 async def test_create_user_success(fake_user_data):
-    mock_db = MagicMock()
-    mock_db.query.return_value.filter.return_value.first.return_value = None
-    mock_db.add.return_value = None
-    mock_db.flush.return_value = None
-    mock_db.commit.return_value = None
+    mock_db = AsyncMock()
+    mock_db.scalar.return_value = None
+    mock_db.add = MagicMock(return_value=None)
 
     fake_user_model = User(
         id=1,
@@ -84,7 +84,7 @@ async def test_create_user_success(fake_user_data):
         confirmed=False
     )
 
-    with patch("app.routers.user.register_user", return_value=fake_user_model), \
+    with patch("app.routers.user.register_user", new_callable=AsyncMock, return_value=fake_user_model), \
          patch("app.routers.user.sendConfirmationMail", new_callable=AsyncMock), \
          patch("app.routers.user.schemas.UserOut", side_effect=lambda **kwargs: kwargs):
 
@@ -96,8 +96,8 @@ async def test_create_user_success(fake_user_data):
 
 @pytest.mark.asyncio
 async def test_create_user_email_exists(fake_user_data):
-    mock_db = MagicMock()
-    mock_db.query.return_value.filter.return_value.first.return_value = fake_user_data
+    mock_db = AsyncMock()
+    mock_db.scalar.return_value = fake_user_data
 
     with patch("app.routers.user.schemas.UserOut", side_effect=lambda **kwargs: kwargs):
         result = await user.create_user(fake_user_data, db=mock_db)
@@ -115,12 +115,15 @@ def test_get_current_user_success(fake_user):
     assert result["status"] == status.HTTP_200_OK
     assert result["id"] == fake_user.id
 
-def test_get_users_list_success(fake_user):
-    mock_db = MagicMock()
-    mock_db.query.return_value = MockQuery(fake_user)
+@pytest.mark.asyncio
+async def test_get_users_list_success(fake_user):
+    mock_db = AsyncMock()
+    mock_db.scalar.return_value = 1
+    mock_db.scalars.return_value = MagicMock()
+    mock_db.scalars.return_value.all.return_value = [fake_user]
 
     with patch("app.routers.user.schemas.UsersOut", side_effect=lambda **kwargs: kwargs):
-        result = user.get_users(db=mock_db, current_user=fake_user)
+        result = await user.get_users(db=mock_db, current_user=fake_user)
 
     assert result["status"] == status.HTTP_200_OK
     print(result)
@@ -140,7 +143,8 @@ def test_update_user_authorized_success(fake_user):
 
     with patch("app.routers.user.oauth2.create_access_token", return_value="token123"), \
          patch("app.routers.user.schemas.UserOut", side_effect=lambda **kwargs: kwargs):
-        result = user.update_user(fake_user.id, edit_data, db=mock_db, current_user=fake_user)
+        # sync endpoints run in a worker thread, where the cache invalidation is sent back to the event loop
+        result = anyio.run(to_thread.run_sync, lambda: user.update_user(fake_user.id, edit_data, db=mock_db, current_user=fake_user))
     print(result)
     assert result["status"] == status.HTTP_200_OK
     assert "User updated successfully" in result["message"]